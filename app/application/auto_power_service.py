@@ -11,7 +11,7 @@ logging = logging.getLogger(__name__)
 
 class AutoPowerService:
 
-    async def handle_power_reading(self, event: PowerReadingEvent):
+    def handle_power_reading(self, event: PowerReadingEvent):
         power = event.power_w
 
         devices = gpio_config_storage.load()
@@ -23,7 +23,7 @@ class AutoPowerService:
                     ok = gpio_controller.set_state(d.device_id, False)
                     if ok:
                         gpio_manager.set_state(d.device_id, False)
-                        gpio_config_storage.update_state(d.device_id, False)
+                        gpio_config_storage.update_state(d.device_id, False, "POWER_MISSING")
             return
 
         for d in devices:
@@ -39,13 +39,13 @@ class AutoPowerService:
                 ok = gpio_controller.set_state(d.device_id, True)
                 if ok:
                     gpio_manager.set_state(d.device_id, True)
-                    gpio_config_storage.update_state(d.device_id, True)
+                    gpio_config_storage.update_state(d.device_id, True, "AUTO_TRIGGER")
                 logging.info(f"AUTO ON device {d.device_id}")
             else:
                 ok = gpio_controller.set_state(d.device_id, False)
                 if ok:
                     gpio_manager.set_state(d.device_id, False)
-                    gpio_config_storage.update_state(d.device_id, False)
+                    gpio_config_storage.update_state(d.device_id, False, "AUTO_TRIGGER")
                 logging.info(f"AUTO OFF device {d.device_id}")
 
 
@@ -1,15 +1,14 @@
 import logging
-from typing import List, Optional
+from typing import Optional
 
 from app.domain.device.enums import DeviceMode
 from app.domain.events.device_events import (DeviceCommandPayload, DeviceCreatedPayload,
                                              DeviceDeletePayload, DeviceUpdatedPayload)
 from app.domain.gpio.entities import GPIODevice
 from app.infrastructure.backend.backend_adapter import backend_adapter
-from app.infrastructure.gpio.gpio_config_storage import gpio_config_storage
+from app.infrastructure.gpio.device_registry import device_registry
 from app.infrastructure.gpio.gpio_controller import gpio_controller
-from app.infrastructure.gpio.gpio_manager import gpio_manager
-from app.infrastructure.gpio.gpio_pin_mapping import pin_mapping
+from app.infrastructure.storage.event_history import event_history
 
 logging = logging.getLogger(__name__)
 
@@ -20,28 +19,21 @@ class GPIOService:
         """
         payload: DeviceCreatedPayload
         """
-        devices: List[GPIODevice] = gpio_config_storage.load()
-
-        pin_number, active_low = pin_mapping.get_pin_config(payload.device_number)
-
-        new_device = GPIODevice(
+        new_device = device_registry.create(
             device_id=payload.device_id,
-            pin_number=pin_number,
+            device_number=payload.device_number,
             mode=DeviceMode(payload.mode),
             power_threshold_kw=payload.threshold_kw,
-            device_number=payload.device_number,
-            active_low=active_low,
+            power_off_threshold_kw=payload.power_off_threshold_kw,
+            min_on_seconds=payload.min_on_seconds,
+            min_off_seconds=payload.min_off_seconds,
+            priority=payload.priority,
+            rated_load_kw=payload.rated_load_kw,
         )
 
-        devices.append(new_device)
-        gpio_config_storage.save(devices)
-
-        gpio_controller.load_from_entities(devices)
-        gpio_manager.load_devices(devices)
-
         logging.info(
             f"[CREATE] device_id={payload.device_id} "
-            f"(device_number={payload.device_number} → pin={pin_number}) "
+            f"(device_number={payload.device_number} → pin={new_device.pin_number}) "
             f"mode={payload.mode}, threshold={payload.threshold_kw}"
         )
 
@@ -50,25 +42,17 @@ class GPIOService:
         payload: DeviceUpdatedPayload
         """
 
-        devices: List[GPIODevice] = gpio_config_storage.load()
-        updated = False
-
-        for device in devices:
-            if device.device_id == payload.device_id:
-                device.mode = DeviceMode(payload.mode)
-                device.power_threshold_kw = payload.threshold_kw
-                updated = True
-                break
+        device = device_registry.update(
+            payload.device_id,
+            DeviceMode(payload.mode),
+            payload.threshold_kw,
+            **payload.sent_settings(),
+        )
 
-        if not updated:
+        if device is None:
             logging.error(f"[UPDATE] device_id={payload.device_id} NOT FOUND")
             return False
 
-        gpio_config_storage.save(devices)
-
-        gpio_controller.load_from_entities(devices)
-        gpio_manager.load_devices(devices)
-
         logging.info(
             f"[UPDATE] device_id={payload.device_id} mode={payload.mode} threshold={payload.threshold_kw}"
         )
@@ -77,20 +61,10 @@ class GPIOService:
     def delete_device(self, payload: DeviceDeletePayload):
         """payload: { device_id }"""
 
-        devices: List[GPIODevice] = gpio_config_storage.load()
-        before = len(devices)
-
-        devices = [d for d in devices if d.device_id != payload.device_id]
-
-        if len(devices) == before:
+        if device_registry.remove(payload.device_id) is None:
             logging.error(f"[DELETE] device_id={payload.device_id} NOT FOUND")
             return False
 
-        gpio_config_storage.save(devices)
-
-        gpio_controller.load_from_entities(devices)
-        gpio_manager.load_devices(devices)
-
         logging.info(f"[DELETE] device_id={payload.device_id} removed")
         return True
 
@@ -102,10 +76,7 @@ class GPIOService:
 
         logging.info(f"[MANUAL] SET_STATE → device_id={payload.device_id}, is_on={payload.is_on}")
 
-        devices: List[GPIODevice] = gpio_config_storage.load()
-        device: Optional[GPIODevice] = next(
-            (d for d in devices if d.device_id == payload.device_id), None
-        )
+        device: Optional[GPIODevice] = device_registry.get(payload.device_id)
 
         if not device:
             logging.error(f"[MANUAL] device_id={payload.device_id} NOT FOUND")
@@ -122,6 +93,7 @@ class GPIOService:
         if not ok:
             return False
 
+        event_history.record(device.device_id, payload.is_on, "DEVICE_COMMAND")
         backend_adapter.log_device_event(
             device_id=device.device_id,
             pin_state=payload.is_on,
@@ -1,9 +1,14 @@
 # app/application/event_service.py
+import asyncio
 import logging
-from typing import Union
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Tuple, Union
 
 from app.application.auto_power_service import auto_power_service
 from app.application.gpio_service import gpio_service
+from app.core.config import settings
+from app.core.event_loop import run_blocking
 from app.domain.events.device_events import (DeviceCommandEvent, DeviceCreatedEvent, DeviceDeletedEvent,
                                              DeviceUpdatedEvent, EventType, PowerReadingEvent)
 
@@ -16,55 +21,195 @@ AnyEvent = Union[
     DeviceCommandEvent,
 ]
 
+# Shard for events that name no device at all.
+GLOBAL_SHARD = "*"
+
+
+class _Job:
+    __slots__ = ("event", "future", "enqueued_at", "keys", "arrived")
+
+    def __init__(self, event, future: asyncio.Future, keys: Tuple[str, ...]):
+        self.event = event
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.keys = keys
+        self.arrived = 0
+
+
+class EventDispatcher:
+    """Per-device queues in front of a blocking event handler.
+
+    Events are routed by `payload.device_id`. Events that act on several
+    devices (POWER_READING's `device_ids`) are queued on every one of those
+    shards and run once all of them have reached it, so they keep their
+    order against DEVICE_UPDATED/DEVICE_COMMAND for the same devices.
+    Events naming no device share the GLOBAL_SHARD queue. Jobs are queued
+    on all their shards at once, so any two jobs meet in the same order on
+    every shard they share and cannot wait on each other.
+
+    Each shard is drained by at most one task, in submission order. The
+    handler runs in a worker thread via run_blocking, at most
+    `concurrency` at a time, so different devices really overlap. Shard
+    workers exit when their queue is empty.
+    """
+
+    def __init__(self, handle: Callable[[Any], Any], concurrency: int):
+        self._handle = handle
+        self.concurrency = max(1, concurrency)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._queues: Dict[str, Deque[_Job]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self.in_flight = 0
+
+    @staticmethod
+    def shard_keys(event) -> Tuple[str, ...]:
+        payload = event.payload
+        device_id = getattr(payload, "device_id", None)
+        if device_id is not None:
+            return (str(device_id),)
+        device_ids = getattr(payload, "device_ids", None)
+        if device_ids:
+            return tuple(str(i) for i in sorted(set(device_ids)))
+        return (GLOBAL_SHARD,)
+
+    def submit(self, event) -> asyncio.Future:
+        """Queue an event; the future resolves to the handler's result."""
+        keys = self.shard_keys(event)
+        job = _Job(event, asyncio.get_running_loop().create_future(), keys)
+
+        for key in keys:
+            queue = self._queues.setdefault(key, deque())
+            queue.append(job)
+
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {"processed": 0, "max_depth": 0, "wait_total": 0.0, "max_wait": 0.0}
+            if len(queue) > stats["max_depth"]:
+                stats["max_depth"] = len(queue)
+
+            if key not in self._workers:
+                self._workers[key] = asyncio.create_task(self._drain(key))
+        return job.future
+
+    async def _drain(self, key: str) -> None:
+        queue = self._queues[key]
+        job = None
+        try:
+            while queue:
+                job = queue.popleft()
+                job.arrived += 1
+                if job.arrived < len(job.keys):
+                    # Another shard runs it; hold this one until it is done.
+                    await asyncio.wait([job.future])
+                elif not job.future.done():
+                    await self._run(job)
+                job = None
+        finally:
+            del self._workers[key]
+            if job is not None:
+                job.future.cancel()
+            while queue:
+                queue.popleft().future.cancel()
+            del self._queues[key]
+
+    async def _run(self, job: _Job) -> None:
+        async with self._slots:
+            wait = time.monotonic() - job.enqueued_at
+            for key in job.keys:
+                stats = self._stats[key]
+                stats["wait_total"] += wait
+                if wait > stats["max_wait"]:
+                    stats["max_wait"] = wait
+
+            self.in_flight += 1
+            try:
+                result = await run_blocking(self._handle, job.event)
+            except Exception as e:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                self.in_flight -= 1
+                for key in job.keys:
+                    self._stats[key]["processed"] += 1
+
+    def get_metrics(self) -> dict:
+        shards = {}
+        for key, stats in self._stats.items():
+            processed = stats["processed"]
+            shards[key] = {
+                "depth": len(self._queues.get(key, ())),
+                "max_depth": stats["max_depth"],
+                "processed": processed,
+                "avg_wait_ms": round(stats["wait_total"] / processed * 1000, 2) if processed else None,
+                "max_wait_ms": round(stats["max_wait"] * 1000, 2),
+            }
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "active_shards": len(self._workers),
+            "shards": shards,
+        }
+
 
 class EventService:
 
-    async def handle_event(self, event: AnyEvent):
+    def __init__(self):
+        self.dispatcher = EventDispatcher(self.handle_event, settings.EVENT_DISPATCH_CONCURRENCY)
+
+    async def dispatch(self, event: AnyEvent):
+        """Handle `event` on its device's shard; see EventDispatcher."""
+        return await self.dispatcher.submit(event)
+
+    def handle_event(self, event: AnyEvent):
 
         logging.info(f"Routing event type={event.event_type}")
 
         match event.event_type:
 
             case EventType.DEVICE_CREATED:
-                return await self._handle_device_created(event)
+                return self._handle_device_created(event)
 
             case EventType.DEVICE_UPDATED:
-                return await self._handle_device_updated(event)
+                return self._handle_device_updated(event)
 
             case EventType.DEVICE_DELETED:
-                return await self._handle_device_deleted(event)
+                return self._handle_device_deleted(event)
             
             case EventType.POWER_READING:
-                return await self._handle_power_reading(event)
+                return self._handle_power_reading(event)
 
             case EventType.DEVICE_COMMAND:
-                return await self._handle_device_command(event)
+                return self._handle_device_command(event)
 
             case _:
                 logging.warning(f"Unknown event type: {event.event_type}")
                 return None
 
-    async def _handle_device_created(self, event: DeviceCreatedEvent):
+    def _handle_device_created(self, event: DeviceCreatedEvent):
         logging.info(f"Creating device -> {event.payload}")
         gpio_service.create_device(event.payload)
         return True
 
-    async def _handle_device_updated(self, event: DeviceUpdatedEvent):
+    def _handle_device_updated(self, event: DeviceUpdatedEvent):
         logging.info(f"Updating device -> {event.payload}")
         gpio_service.update_device(event.payload)
         return True
 
-    async def _handle_device_deleted(self, event: DeviceDeletedEvent):
+    def _handle_device_deleted(self, event: DeviceDeletedEvent):
         logging.info(f"Deleting device -> {event.payload}")
         gpio_service.delete_device(event.payload)
         return True
     
-    async def _handle_power_reading(self, event: PowerReadingEvent):
+    def _handle_power_reading(self, event: PowerReadingEvent):
         logging.info(f"Handling power reading -> {event.payload}")
-        await auto_power_service.handle_power_reading(event.payload)
+        auto_power_service.handle_power_reading(event.payload)
         return True
 
-    async def _handle_device_command(self, event: DeviceCommandEvent):
+    def _handle_device_command(self, event: DeviceCommandEvent):
         logging.info(f"Executing device command -> {event.payload}")
         gpio_service.set_manual_state(event.payload)
         return True
@@ -1,13 +1,14 @@
 # app/application/gpio_service.py
 import logging
 
+from app.domain.device.enums import DeviceMode
 from app.domain.events.device_events import DeviceCreatedPayload
-from app.domain.gpio.entities import GPIODevice
 from app.infrastructure.gpio.gpio_config_storage import gpio_config_storage
 from app.infrastructure.backend.backend_adapter import backend_adapter
+from app.infrastructure.gpio.device_registry import device_registry
 from app.infrastructure.gpio.gpio_controller import gpio_controller
 from app.infrastructure.gpio.gpio_manager import gpio_manager
-from app.infrastructure.gpio.gpio_pin_mapping import pin_mapping
+from app.infrastructure.storage.event_history import event_history
 
 logging = logging.getLogger(__name__)
 
@@ -18,65 +19,48 @@ class GPIOService:
         """
         payload: DeviceCreatedPayload
         """
-        devices = gpio_config_storage.load()
-
-        pin_number, active_low = pin_mapping.get_pin_config(payload.device_number)
-
-        new_device = GPIODevice(
+        device = device_registry.create(
             device_id=payload.device_id,
             device_number=payload.device_number,
-            pin_number=pin_number,
-            mode=payload.mode,
+            mode=DeviceMode(payload.mode),
             power_threshold_kw=payload.threshold_kw,
-            active_low=active_low,
+            power_off_threshold_kw=payload.power_off_threshold_kw,
+            min_on_seconds=payload.min_on_seconds,
+            min_off_seconds=payload.min_off_seconds,
+            priority=payload.priority,
+            rated_load_kw=payload.rated_load_kw,
         )
 
-        devices.append(new_device)
-        gpio_config_storage.save(devices)
-
-        gpio_controller.load_from_entities(devices)
-        gpio_manager.load_devices(devices)
-
         logging.info(
             f"GPIOService: created device {payload.device_id} "
-            f"(device_number={payload.device_number} → pin={pin_number})"
+            f"(device_number={payload.device_number} → pin={device.pin_number})"
         )
 
     # -----------------------------------------------------
     # Aktualizacja istniejącego urządzenia
     # -----------------------------------------------------
     def update_device(self, payload):
-        devices = gpio_config_storage.load()
-        updated = False
-
-        for d in devices:
-            if d.device_id == payload.device_id:
-                d.mode = payload.mode
-                d.power_threshold_kw = payload.threshold_kw
-                updated = True
+        device = device_registry.update(
+            payload.device_id,
+            DeviceMode(payload.mode),
+            payload.threshold_kw,
+            **payload.sent_settings(),
+        )
 
-        if not updated:
+        if device is None:
             logging.error(f"GPIOService: cannot update, device_id={payload.device_id} not found")
             return False
 
-        gpio_config_storage.save(devices)
-
-        gpio_controller.load_from_entities(devices)
-        gpio_manager.load_devices(devices)
-
         logging.info(f"GPIOService: updated device {payload.device_id}")
         return True
 
     def delete_device(self, payload):
-        devices = gpio_config_storage.load()
-        devices = [d for d in devices if d.device_id != payload.device_id]
-
-        gpio_config_storage.save(devices)
-
-        gpio_controller.load_from_entities(devices)
-        gpio_manager.load_devices(devices)
+        if device_registry.remove(payload.device_id) is None:
+            logging.error(f"GPIOService: cannot delete, device_id={payload.device_id} not found")
+            return False
 
         logging.info(f"GPIOService: deleted device {payload.device_id}")
+        return True
         
     # -----------------------------------------------------
     # Manualne sterowanie przekaźnikiem (DEVICE_COMMAND)
@@ -97,7 +81,9 @@ class GPIOService:
 
         gpio_manager.set_state(payload.device_id, payload.is_on)
 
-        gpio_config_storage.update_state(payload.device_id, payload.is_on)
+        gpio_config_storage.update_state(payload.device_id, payload.is_on, "DEVICE_COMMAND")
+
+        event_history.record(payload.device_id, payload.is_on, "DEVICE_COMMAND")
 
         # Report to backend (fire-and-forget)
         backend_adapter.log_device_event(
@@ -1,55 +1,91 @@
+import asyncio
 import logging
-from typing import List
+import time
+from typing import Dict, List, Optional
 
 from app.domain.device.enums import DeviceMode
 from app.domain.events.inverter_events import InverterProductionEvent
+from app.core.config import settings
 from app.domain.gpio.entities import GPIODevice
+from app.domain.gpio.hysteresis import HysteresisSwitch, switch_thresholds
+from app.domain.gpio.surplus_allocator import SurplusAllocator
 from app.infrastructure.backend.backend_adapter import backend_adapter
+from app.infrastructure.gpio.device_registry import device_registry
 from app.infrastructure.gpio.gpio_config_storage import gpio_config_storage
 from app.infrastructure.gpio.gpio_manager import gpio_manager
 from app.infrastructure.gpio.gpio_controller import gpio_controller
 from app.infrastructure.gpio.hardware import GPIO
+from app.infrastructure.storage.event_history import event_history
 
 logging = logging.getLogger(__name__)
 
 
 class PowerReadingService:
 
+    def __init__(self):
+        self.clock = time.monotonic
+        self._switches: Dict[int, HysteresisSwitch] = {}
+        self._dwell_timers: Dict[int, asyncio.TimerHandle] = {}
+        self._last_power: Optional[float] = None
+
+        # AUTO_POWER devices with a rated load share the surplus by priority;
+        # the rest are compared against their own threshold.
+        self.allocator = SurplusAllocator()
+        self._threshold_devices: List[GPIODevice] = []
+        self._registry_version: Optional[int] = None
+
+        self.switches = 0
+        self.deferred = 0
+
     def _get_auto_power_devices(self) -> List[GPIODevice]:
-        return [
-            device
-            for device in gpio_manager.devices.values()
-            if device.mode == DeviceMode.AUTO_POWER
-        ]
+        return device_registry.by_mode(DeviceMode.AUTO_POWER)
+
+    def _refresh_devices(self) -> None:
+        """Rebuild the threshold list and the allocator order when the registry changed."""
+        if self._registry_version == device_registry.version:
+            return
+
+        auto_devices = self._get_auto_power_devices()
+        self._threshold_devices = [d for d in auto_devices if d.rated_load_kw is None]
+        self.allocator.rebuild(d for d in auto_devices if d.rated_load_kw is not None)
+        self._registry_version = device_registry.version
 
     async def handle_inverter_power(self, event: InverterProductionEvent) -> None:
         power = event.payload.active_power
         logging.info(f"Received inverter power = {power} W")
         power_kw = power
+        self._last_power = power
 
         if power is None:
             logging.warning("Active power missing. Forcing all AUTO_POWER devices OFF for safety.")
             for device in self._get_auto_power_devices():
+                self._cancel_dwell_timer(device.device_id)
                 if gpio_controller.set_state(device.device_id, False):
+                    self._switch_for(device.device_id, False)
                     gpio_manager.set_state(device.device_id, False)
-                    gpio_config_storage.update_state(device.device_id, False)
+                    gpio_config_storage.update_state(device.device_id, False, "POWER_MISSING")
+                    event_history.record(device.device_id, False, "POWER_MISSING", power_kw)
                     backend_adapter.log_device_event(
                         device_id=device.device_id,
                         pin_state=False,
                         trigger_reason="POWER_MISSING",
                         power_kw=power_kw,
                     )
+            # Everything is OFF now; the next allocation starts from scratch.
+            self.allocator.reset()
             return
 
-        auto_devices: List[GPIODevice] = self._get_auto_power_devices()
+        self._refresh_devices()
 
-        if not auto_devices:
+        if not self._threshold_devices and not len(self.allocator):
             logging.info("No AUTO_POWER devices. Nothing to do.")
             return
 
-        pin_states = gpio_manager.get_states()
+        self._allocate(power)
+
+        pin_states = gpio_controller.snapshot(d.pin_number for d in self._threshold_devices)
 
-        for device in auto_devices:
+        for device in self._threshold_devices:
             device_id = device.device_id
             pin = device.pin_number
             threshold = device.power_threshold_kw
@@ -65,44 +101,149 @@ class PowerReadingService:
                 )
                 continue
 
-            should_turn_on: bool = power >= threshold
-
             raw = pin_states.get(pin)
             if raw is None:
                 logging.warning(f"Pin state missing for device_id={device_id} pin={pin}. Forcing OFF.")
                 if gpio_controller.set_state(device_id, False):
                     gpio_manager.set_state(device_id, False)
-                    gpio_config_storage.update_state(device_id, False)
+                    gpio_config_storage.update_state(device_id, False, "PIN_STATE_MISSING")
+                    self._switch_for(device_id, False)
                 continue
 
-            current_is_on = gpio_manager.raw_to_is_on(device, raw)
+            self._evaluate(device, power, gpio_manager.raw_to_is_on(device, raw))
 
+    def _allocate(self, power: float) -> None:
+        changes = self.allocator.allocate(power, settings.AUTO_POWER_HYSTERESIS_KW)
+        if changes:
             logging.info(
-                f"[STATE] device_id={device_id} current_is_on={current_is_on}, "
-                f"should_turn_on={should_turn_on}, active_low={device.active_low}"
+                f"Surplus allocation: power={power}, committed={self.allocator.committed_load()}, "
+                f"changes={changes}"
             )
 
-            if current_is_on == should_turn_on:
-                logging.info(
-                    f"Device {device_id} already in correct state. Skipping."
-                )
+        for device_id, target in changes:
+            device = device_registry.get(device_id)
+            if device is None:
                 continue
+            raw = gpio_controller.get_pin_value(device.pin_number)
+            self._evaluate(device, power, gpio_manager.raw_to_is_on(device, raw), target)
+
+    def _switch_for(self, device_id: int, current_is_on: bool) -> HysteresisSwitch:
+        switch = self._switches.get(device_id)
+        if switch is None:
+            switch = self._switches[device_id] = HysteresisSwitch(current_is_on)
+        elif switch.is_on != current_is_on:
+            # Changed outside the hysteresis logic (manual command, external
+            # edge, safety OFF): the new state starts its dwell now.
+            switch.commit(current_is_on, self.clock())
+        return switch
+
+    def _evaluate(
+        self,
+        device: GPIODevice,
+        power: float,
+        current_is_on: bool,
+        allocated: Optional[bool] = None,
+    ) -> None:
+        """Drive one device towards its target, honouring minimum dwell times.
+
+        The target is `allocated` for allocator devices, otherwise the
+        device's own hysteresis thresholds decide.
+        """
+        device_id = device.device_id
+        now = self.clock()
+
+        switch = self._switch_for(device_id, current_is_on)
+        if allocated is None:
+            on_threshold, off_threshold = switch_thresholds(device, settings.AUTO_POWER_HYSTERESIS_KW)
+            should_turn_on = switch.target(power, on_threshold, off_threshold)
+            rule = f"on>={on_threshold}, off<{off_threshold}"
+        else:
+            should_turn_on = allocated
+            rule = f"priority={device.priority}, load={device.rated_load_kw}"
+
+        logging.info(
+            f"[STATE] device_id={device_id} current_is_on={current_is_on}, "
+            f"should_turn_on={should_turn_on}, {rule}, active_low={device.active_low}"
+        )
+
+        if current_is_on == should_turn_on:
+            self._cancel_dwell_timer(device_id)
+            logging.info(
+                f"Device {device_id} already in correct state. Skipping."
+            )
+            return
 
+        min_on = device.min_on_seconds if device.min_on_seconds is not None else settings.AUTO_POWER_MIN_ON_SECONDS
+        min_off = device.min_off_seconds if device.min_off_seconds is not None else settings.AUTO_POWER_MIN_OFF_SECONDS
+        wait = switch.hold_remaining(now, min_on, min_off)
+        if wait > 0:
+            self.deferred += 1
+            self._schedule_dwell_timer(device_id, wait)
             logging.info(
-                f"Changing state for device {device_id}: "
-                f"pin={pin}, from={current_is_on} → to={should_turn_on}"
+                f"Device {device_id}: change to {should_turn_on} held back for {wait:.1f}s (minimum dwell)"
             )
+            return
 
-            ok = gpio_controller.set_state(device_id, should_turn_on)
-            if ok:
-                gpio_manager.set_state(device_id, should_turn_on)
-                gpio_config_storage.update_state(device_id, should_turn_on)
-                backend_adapter.log_device_event(
-                    device_id=device_id,
-                    pin_state=should_turn_on,
-                    trigger_reason="AUTO_TRIGGER",
-                    power_kw=power_kw,
-                )
+        logging.info(
+            f"Changing state for device {device_id}: "
+            f"pin={device.pin_number}, from={current_is_on} → to={should_turn_on}"
+        )
+
+        self._cancel_dwell_timer(device_id)
+        ok = gpio_controller.set_state(device_id, should_turn_on)
+        if ok:
+            switch.commit(should_turn_on, now)
+            self.switches += 1
+            gpio_manager.set_state(device_id, should_turn_on)
+            gpio_config_storage.update_state(device_id, should_turn_on, "AUTO_TRIGGER")
+            event_history.record(device_id, should_turn_on, "AUTO_TRIGGER", power)
+            backend_adapter.log_device_event(
+                device_id=device_id,
+                pin_state=should_turn_on,
+                trigger_reason="AUTO_TRIGGER",
+                power_kw=power,
+            )
+
+    # ---------------------------------------------------------------
+    # Dwell timers
+    # ---------------------------------------------------------------
+    def _schedule_dwell_timer(self, device_id: int, delay: float) -> None:
+        if device_id in self._dwell_timers:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._dwell_timers[device_id] = loop.call_later(delay, self._on_dwell_expired, device_id)
+
+    def _cancel_dwell_timer(self, device_id: int) -> None:
+        handle = self._dwell_timers.pop(device_id, None)
+        if handle is not None:
+            handle.cancel()
+
+    def _on_dwell_expired(self, device_id: int) -> None:
+        """Re-check a held-back change against the latest reading once its dwell time is over."""
+        self._dwell_timers.pop(device_id, None)
+
+        device = device_registry.get(device_id)
+        if device is None or device.mode != DeviceMode.AUTO_POWER or self._last_power is None:
+            return
+
+        allocated = self.allocator.target(device_id)
+        if allocated is None and device.power_threshold_kw is None:
+            return
+
+        raw = gpio_controller.get_pin_value(device.pin_number)
+        self._evaluate(device, self._last_power, gpio_manager.raw_to_is_on(device, raw), allocated)
+
+    def get_metrics(self) -> dict:
+        return {
+            "switches": self.switches,
+            "deferred": self.deferred,
+            "pending_timers": len(self._dwell_timers),
+            "allocated_devices": self.allocator.allocated_count,
+            "committed_load_kw": self.allocator.committed_load(),
+        }
 
 
 power_reading_service = PowerReadingService()
@@ -12,11 +12,71 @@ class Settings(BaseSettings):
     SECRET_KEY: str = Field(..., description="Secret key for secure operations")
 
     NATS_URL: str = Field("nats://localhost:4222", env="NATS_URL")
+    NATS_CODEC: str = Field("auto", env="NATS_CODEC")
+    NATS_COMPRESS_MIN_BYTES: int = Field(1024, env="NATS_COMPRESS_MIN_BYTES")
+    NATS_RECONNECT_WAIT: float = Field(2.0, env="NATS_RECONNECT_WAIT")
+    NATS_RECONNECT_JITTER: float = Field(1.0, env="NATS_RECONNECT_JITTER")
+    NATS_MAX_RECONNECT_ATTEMPTS: int = Field(-1, env="NATS_MAX_RECONNECT_ATTEMPTS")
+    NATS_OUTBOX_MAX_BYTES: int = Field(262144, env="NATS_OUTBOX_MAX_BYTES")
+    NATS_OFFLINE_GRACE: float = Field(60.0, env="NATS_OFFLINE_GRACE")
+    NATS_PUBLISH_MAX_IN_FLIGHT: int = Field(64, env="NATS_PUBLISH_MAX_IN_FLIGHT")
+    NATS_PUBLISH_TIMEOUT: float = Field(2.0, env="NATS_PUBLISH_TIMEOUT")
+    NATS_PUBLISH_RETRIES: int = Field(2, env="NATS_PUBLISH_RETRIES")
+    NATS_EVENTS_PULL: bool = Field(True, env="NATS_EVENTS_PULL")
+    NATS_PULL_BATCH: int = Field(64, env="NATS_PULL_BATCH")
+    NATS_PULL_EXPIRES: float = Field(5.0, env="NATS_PULL_EXPIRES")
+    NATS_MAX_ACK_PENDING: int = Field(256, env="NATS_MAX_ACK_PENDING")
+    NATS_ACK_WAIT: float = Field(30.0, env="NATS_ACK_WAIT")
     HEARTBEAT_INTERVAL: int = Field(30, env="HEARTBEAT_INTERVAL")
+    HEARTBEAT_DELTA_ENABLED: bool = Field(True, env="HEARTBEAT_DELTA_ENABLED")
+    HEARTBEAT_SNAPSHOT_EVERY: int = Field(10, env="HEARTBEAT_SNAPSHOT_EVERY")
+    HEARTBEAT_DELTA_WINDOW_MS: int = Field(250, env="HEARTBEAT_DELTA_WINDOW_MS")
+
+    GPIO_BACKEND: str = Field("auto", env="GPIO_BACKEND")
+    GPIO_CHIP: str = Field("/dev/gpiochip0", env="GPIO_CHIP")
+    GPIO_SIM_LATENCY_MS: float = Field(0.0, env="GPIO_SIM_LATENCY_MS")
+    GPIO_SIM_TRACE_SIZE: int = Field(0, env="GPIO_SIM_TRACE_SIZE")
+    I2C_SIMULATE: bool = Field(False, env="I2C_SIMULATE")
+    GPIO_EDGE_DETECTION: bool = Field(True, env="GPIO_EDGE_DETECTION")
+    GPIO_DEBOUNCE_MS: int = Field(5, env="GPIO_DEBOUNCE_MS")
+    GPIO_POLL_MIN_INTERVAL: float = Field(0.25, env="GPIO_POLL_MIN_INTERVAL")
+    GPIO_POLL_MAX_INTERVAL: float = Field(2.0, env="GPIO_POLL_MAX_INTERVAL")
+    GPIO_SNAPSHOT_TTL: float = Field(0.2, env="GPIO_SNAPSHOT_TTL")
+
+    AUTO_POWER_HYSTERESIS_KW: float = Field(0.0, env="AUTO_POWER_HYSTERESIS_KW")
+    AUTO_POWER_MIN_ON_SECONDS: float = Field(0.0, env="AUTO_POWER_MIN_ON_SECONDS")
+    AUTO_POWER_MIN_OFF_SECONDS: float = Field(0.0, env="AUTO_POWER_MIN_OFF_SECONDS")
 
     LOG_DIR: str = Field("logs", env="LOG_DIR")
     CONFIG_FILE: str = Field("config.json", env="CONFIG_FILE")
+    CONFIG_WRITE_DEBOUNCE: float = Field(1.0, env="CONFIG_WRITE_DEBOUNCE")
+    STATE_JOURNAL_FILE: str = Field("relay_state.journal", env="STATE_JOURNAL_FILE")
+    STATE_SNAPSHOT_FILE: str = Field("relay_state.snapshot", env="STATE_SNAPSHOT_FILE")
+    STATE_JOURNAL_COMPACT_EVERY: int = Field(4096, env="STATE_JOURNAL_COMPACT_EVERY")
+    EVENT_DISPATCH_CONCURRENCY: int = Field(4, env="EVENT_DISPATCH_CONCURRENCY")
+    EVENT_DEDUPE_FILE: str = Field("event_dedupe.lwm", env="EVENT_DEDUPE_FILE")
+    EVENT_DEDUPE_SIZE: int = Field(4096, env="EVENT_DEDUPE_SIZE")
     BACKEND_URL: str | None = Field(None, env="BACKEND_URL")
+    BACKEND_TIMEOUT: float = Field(5.0, env="BACKEND_TIMEOUT")
+    BACKEND_MAX_CONCURRENCY: int = Field(4, env="BACKEND_MAX_CONCURRENCY")
+    BACKEND_QUEUE_SIZE: int = Field(1000, env="BACKEND_QUEUE_SIZE")
+    BACKEND_BATCH_ENABLED: bool = Field(False, env="BACKEND_BATCH_ENABLED")
+    BACKEND_BATCH_MAX_EVENTS: int = Field(100, env="BACKEND_BATCH_MAX_EVENTS")
+    BACKEND_BATCH_MAX_DELAY_MS: int = Field(250, env="BACKEND_BATCH_MAX_DELAY_MS")
+    BACKEND_FLUSH_BATCH: int = Field(50, env="BACKEND_FLUSH_BATCH")
+    BACKEND_WAL_SEGMENT_BYTES: int = Field(256 * 1024, env="BACKEND_WAL_SEGMENT_BYTES")
+    BACKEND_WAL_MAX_BYTES: int = Field(64 * 1024 * 1024, env="BACKEND_WAL_MAX_BYTES")
+    BACKEND_RETRY_INTERVAL: float = Field(30.0, env="BACKEND_RETRY_INTERVAL")
+    BACKEND_CB_FAILURE_THRESHOLD: int = Field(3, env="BACKEND_CB_FAILURE_THRESHOLD")
+    BACKEND_CB_BASE_DELAY: float = Field(5.0, env="BACKEND_CB_BASE_DELAY")
+    BACKEND_CB_MAX_DELAY: float = Field(300.0, env="BACKEND_CB_MAX_DELAY")
+
+    HISTORY_DB_FILE: str = Field("event_history.db", env="HISTORY_DB_FILE")
+    HISTORY_BATCH_SIZE: int = Field(50, env="HISTORY_BATCH_SIZE")
+    HISTORY_FLUSH_INTERVAL: float = Field(2.0, env="HISTORY_FLUSH_INTERVAL")
+    HISTORY_RETENTION_DAYS: int = Field(30, env="HISTORY_RETENTION_DAYS")
+    HISTORY_PRUNE_INTERVAL: float = Field(3600.0, env="HISTORY_PRUNE_INTERVAL")
+    HISTORY_MAX_QUERY_ROWS: int = Field(5000, env="HISTORY_MAX_QUERY_ROWS")
 
     class Config:
         env_file = ".env"
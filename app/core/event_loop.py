@@ -0,0 +1,30 @@
+# app/core/event_loop.py
+import asyncio
+from typing import Any, Callable, Optional
+
+# Loop that started the worker threads; call_on_loop hands work back to it.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any) -> Any:
+    """Run blocking `func(*args)` in a worker thread and await its result."""
+    global _loop
+    _loop = asyncio.get_running_loop()
+    return await asyncio.to_thread(func, *args)
+
+
+def call_on_loop(callback: Callable[..., Any], *args: Any) -> None:
+    """Run `callback(*args)` on the event loop thread.
+
+    asyncio objects (events, queues, timers) are not thread-safe. Code that
+    may run in a run_blocking worker goes through here to touch them. On
+    the loop thread, or when no worker was ever started, the callback runs
+    right away.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        if _loop is not None and not _loop.is_closed():
+            _loop.call_soon_threadsafe(callback, *args)
+            return
+    callback(*args)
@@ -2,21 +2,157 @@
 
 import asyncio
 import logging
+from typing import Dict, Set
 
+from app.core.config import settings
+from app.infrastructure.gpio.gpio_controller import gpio_controller
 from app.infrastructure.gpio.gpio_manager import gpio_manager
 
 logging = logging.getLogger(__name__)
 
 
-async def monitor_gpio_changes() -> None:
-    await asyncio.sleep(2)
+class GPIOChangeMonitor:
+    """Detects pin changes made outside the agent.
 
-    logging.info("GPIO monitor started")
+    Pins whose backend supports edge detection are interrupt driven: the
+    driver callback (called from the GPIO thread) is marshalled onto the
+    event loop, debounced in software and then sampled once. Other pins, and
+    pins the driver still refuses (e.g. outputs on RPi.GPIO), are polled with an interval that backs off while
+    nothing changes and snaps back to the minimum after a change.
+    """
+
+    def __init__(self):
+        self.debounce = settings.GPIO_DEBOUNCE_MS / 1000.0
+        self.poll_min = settings.GPIO_POLL_MIN_INTERVAL
+        self.poll_max = settings.GPIO_POLL_MAX_INTERVAL
+
+        self.edge_pins: Set[int] = set()
+        self.poll_pins: Set[int] = set()
+        self._pending: Dict[int, asyncio.TimerHandle] = {}
+        self._pins_changed = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        self.edges_received = 0
+        self.changes_detected = 0
+        self.polls = 0
+
+    # ---------------------------------------------------------------
+    # Pin registration
+    # ---------------------------------------------------------------
+    def _sync_pins(self) -> None:
+        wanted = set(gpio_manager.pin_to_device)
+
+        for pin in self.edge_pins - wanted:
+            try:
+                gpio_controller.backend.remove_event_detect(pin)
+            except Exception:
+                pass
+        self.edge_pins &= wanted
+
+        self.poll_pins = set()
+        for pin in wanted - self.edge_pins:
+            if (
+                settings.GPIO_EDGE_DETECTION
+                and gpio_controller.backend.edges_supported(pin)
+                and self._register_edge(pin)
+            ):
+                self.edge_pins.add(pin)
+            else:
+                self.poll_pins.add(pin)
+
+        logging.info(f"GPIO monitor: edge pins={sorted(self.edge_pins)}, polled pins={sorted(self.poll_pins)}")
+
+    def _register_edge(self, pin: int) -> bool:
+        try:
+            gpio_controller.backend.add_event_detect(pin, self._on_edge_thread)
+            return True
+        except Exception as e:
+            logging.info(f"GPIO monitor: edge detection unavailable for pin {pin} ({e}); polling instead")
+            return False
+
+    # ---------------------------------------------------------------
+    # Edge path
+    # ---------------------------------------------------------------
+    def _on_edge_thread(self, pin: int) -> None:
+        # Runs in the GPIO driver thread.
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._on_edge, pin)
+
+    def _on_edge(self, pin: int) -> None:
+        self.edges_received += 1
+        handle = self._pending.pop(pin, None)
+        if handle is not None:
+            handle.cancel()
+        self._pending[pin] = self._loop.call_later(self.debounce, self._settled, pin)
+
+    def _settled(self, pin: int) -> None:
+        self._pending.pop(pin, None)
+        self._loop.create_task(self._sample(pin))
 
-    while True:
+    async def _sample(self, pin: int) -> None:
         try:
-            await gpio_manager.detect_changes()
+            if await gpio_manager.handle_pin_sample(pin, gpio_controller.read_pin(pin)):
+                self.changes_detected += 1
         except Exception as e:
-            logging.exception(f"GPIO monitoring error: {e}")
+            logging.exception(f"GPIO monitoring error on pin {pin}: {e}")
+
+    # ---------------------------------------------------------------
+    # Main loop
+    # ---------------------------------------------------------------
+    async def _poll_once(self) -> bool:
+        self.polls += 1
+        changed = False
+        for pin, value in gpio_controller.read_pins(list(self.poll_pins)).items():
+            if await gpio_manager.handle_pin_sample(pin, value):
+                changed = True
+                self.changes_detected += 1
+        return changed
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        gpio_manager.pin_listeners.append(self._pins_changed.set)
+        self._pins_changed.set()
+
+        interval = self.poll_min
+        while True:
+            if self._pins_changed.is_set():
+                self._pins_changed.clear()
+                self._sync_pins()
+
+            if not self.poll_pins:
+                # Pure interrupt mode: sleep until the pin set changes.
+                await self._pins_changed.wait()
+                continue
+
+            try:
+                changed = await self._poll_once()
+            except Exception as e:
+                logging.exception(f"GPIO monitoring error: {e}")
+                changed = False
+
+            interval = self.poll_min if changed else min(interval * 2, self.poll_max)
+
+            try:
+                await asyncio.wait_for(self._pins_changed.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_metrics(self) -> dict:
+        return {
+            "edge_pins": len(self.edge_pins),
+            "poll_pins": len(self.poll_pins),
+            "edges_received": self.edges_received,
+            "changes_detected": self.changes_detected,
+            "polls": self.polls,
+        }
+
+
+gpio_change_monitor = GPIOChangeMonitor()
+
+
+async def monitor_gpio_changes() -> None:
+    await asyncio.sleep(2)
+
+    logging.info("GPIO monitor started")
 
-        await asyncio.sleep(0.5)
+    await gpio_change_monitor.run()
@@ -1,56 +1,239 @@
 import asyncio
+import json
 import logging
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from functools import partial
+from typing import Any, Dict
 
+from app.application.event_service import event_service
 from app.core.config import settings
-from app.core.nats_client import nats_client
+from app.core.inverter_mailbox import inverter_mailbox
+from app.core.jetstream_consumer import events_consumer
+from app.core.nats_client import CONNECTED, JSON, RECONNECTING, nats_client
 from app.domain.events.enums import EventType
+from app.infrastructure.backend.backend_adapter import backend_adapter
 from app.infrastructure.gpio.gpio_manager import gpio_manager
+from app.infrastructure.storage.event_dedupe import event_dedupe
 
 logging = logging.getLogger(__name__)
 
+BEAT = "beat"
+DELTA = "delta"
+SNAPSHOT = "snapshot"
 
-async def send_heartbeat() -> None:
 
-    await asyncio.sleep(1)
+def _compact(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+class HeartbeatPublisher:
+    """Heartbeat protocol with liveness beats, state deltas and full snapshots.
+
+    Every HEARTBEAT_INTERVAL a small "beat" frame carries the current state
+    version. Device changes are sent right away as a "delta" frame (changes
+    within HEARTBEAT_DELTA_WINDOW_MS are coalesced into one), and the full
+    "snapshot" frame (the previous heartbeat payload) goes out on start,
+    every HEARTBEAT_SNAPSHOT_EVERY beats, on request and after a failed
+    publish. Consumers that see a version gap can request a snapshot.
+
+    Frames are submitted without waiting for their JetStream ack, so a
+    burst of deltas is pipelined; the ack is handled when it arrives. A
+    failed ack only schedules a snapshot while NATS is down or within
+    NATS_OFFLINE_GRACE; the safety shutdown is left to the grace check.
+
+    Frames are not buffered while NATS is reconnecting; the safety shutdown
+    only fires once the connection has been down for NATS_OFFLINE_GRACE,
+    and a snapshot is sent as soon as it is back.
+
+    With HEARTBEAT_DELTA_ENABLED=false every beat is a snapshot, as before.
+    """
+
+    def __init__(self):
+        self.subject = f"device_communication.raspberry.{settings.RASPBERRY_UUID}.heartbeat"
+        self.delta_enabled = settings.HEARTBEAT_DELTA_ENABLED
+        self.snapshot_every = max(1, settings.HEARTBEAT_SNAPSHOT_EVERY)
+        self.delta_window = settings.HEARTBEAT_DELTA_WINDOW_MS / 1000.0
+
+        # Static part of every frame, encoded once.
+        self._prefix = (
+            b'{"event_type":' + _compact(EventType.HEARTBEAT.value)
+            + b',"payload":{"uuid":' + _compact(settings.RASPBERRY_UUID)
+            + b',"status":"online"'
+        )
 
-    subject = f"device_communication.raspberry.{settings.RASPBERRY_UUID}.heartbeat"
-    safety_shutdown_triggered = False
+        self._wakeup = asyncio.Event()
+        self._snapshot_due = True
+        self._sent_version = -1
+        self._beats = 0
+        self._safety_shutdown_triggered = False
 
-    while True:
+        self.frames: Dict[str, int] = {BEAT: 0, DELTA: 0, SNAPSHOT: 0}
+        self.bytes_sent: Dict[str, int] = {BEAT: 0, DELTA: 0, SNAPSHOT: 0}
+
+    # ---------------------------------------------------------------
+    # Frames
+    # ---------------------------------------------------------------
+    def _frame(self, kind: str, body: Dict[str, Any]) -> bytes:
+        body = {"kind": kind, "timestamp": int(datetime.now(timezone.utc).timestamp()), **body}
+        if nats_client.codec is JSON:
+            return self._prefix + b"," + _compact(body)[1:] + b"}"
+
+        # Binary codec configured: no byte splicing, encode the whole frame.
+        return nats_client.codec.encode({
+            "event_type": EventType.HEARTBEAT.value,
+            "payload": {"uuid": settings.RASPBERRY_UUID, "status": "online", **body},
+        })
+
+    def build_beat(self) -> bytes:
+        return self._frame(BEAT, {"version": gpio_manager.state_version})
+
+    def build_delta(self) -> bytes:
+        changed, removed = gpio_manager.drain_changes()
+        body = {"base_version": self._sent_version, "version": gpio_manager.state_version, "devices": changed}
+        if removed:
+            body["removed"] = removed
+        return self._frame(DELTA, body)
+
+    def build_snapshot(self) -> bytes:
+        gpio_manager.drain_changes()
+        gpio_states = gpio_manager.get_states()
+        device_status = gpio_manager.get_devices_status()
+        return self._frame(SNAPSHOT, {
+            "version": gpio_manager.state_version,
+            "gpio_count": len(gpio_states),
+            "device_count": len(device_status),
+            "gpio": gpio_states,
+            "devices": device_status,
+            "backend": backend_adapter.get_metrics(),
+            "inverter": inverter_mailbox.get_metrics(),
+            "events": {
+                **events_consumer.get_metrics(),
+                "dedupe": event_dedupe.get_metrics(),
+                "dispatch": event_service.dispatcher.get_metrics(),
+            },
+            "nats": nats_client.get_metrics(),
+            "heartbeat": self.get_metrics(),
+        })
+
+    # ---------------------------------------------------------------
+    # Triggers
+    # ---------------------------------------------------------------
+    def request_snapshot(self) -> None:
+        self._snapshot_due = True
+        self._wakeup.set()
+
+    def _on_state_changed(self) -> None:
+        if self.delta_enabled:
+            self._wakeup.set()
+
+    # ---------------------------------------------------------------
+    # Publishing
+    # ---------------------------------------------------------------
+    async def _send(self, kind: str) -> None:
+        version = gpio_manager.state_version
         try:
-            gpio_states: Dict[int, int] = gpio_manager.get_states()
-            device_status: List[Dict[str, Any]] = gpio_manager.get_devices_status()
-
-            heartbeat_payload = {
-                "uuid": settings.RASPBERRY_UUID,
-                "status": "online",
-                "timestamp": int(datetime.now(timezone.utc).timestamp()),
-                "gpio_count": len(gpio_states),
-                "device_count": len(device_status),
-                "gpio": gpio_states,
-                "devices": device_status,
-            }
-
-            message = {
-                "event_type": EventType.HEARTBEAT.value,
-                "payload": heartbeat_payload,
-            }
-
-            # JETSTREAM — PUBLISH
-            await nats_client.js_publish(subject, message)
-
-            logging.info(
-                f"[HEARTBEAT] subject={subject} | payload: {message}"
-            )
-            safety_shutdown_triggered = False
+            if nats_client.state == RECONNECTING:
+                # Frames are not buffered; a snapshot follows the reconnect.
+                self._snapshot_due = True
+                offline = nats_client.offline_for()
+                if offline < settings.NATS_OFFLINE_GRACE:
+                    logging.info(f"[HEARTBEAT] NATS reconnecting ({offline:.0f}s); skipping {kind}")
+                    return
+                raise ConnectionError(f"NATS offline for {offline:.0f}s")
+
+            if kind == SNAPSHOT:
+                data = self.build_snapshot()
+            elif kind == DELTA:
+                data = self.build_delta()
+            else:
+                data = self.build_beat()
 
+            published = await nats_client.js_publish_bytes_nowait(self.subject, data, nats_client.codec.content_type)
         except Exception as e:
             logging.exception(f"Heartbeat error: {e}")
-            if not safety_shutdown_triggered:
-                logging.warning("Heartbeat failed; triggering safety shutdown (all devices OFF).")
-                gpio_manager.force_all_off(reason="HEARTBEAT_FAILURE")
-                safety_shutdown_triggered = True
+            self._on_failure()
+            return
+
+        # The next delta builds on this frame; if its ack fails, _on_failure
+        # falls back to a snapshot.
+        if kind == SNAPSHOT:
+            self._snapshot_due = False
+        self._sent_version = version
+        published.add_done_callback(partial(self._on_published, kind, version, len(data)))
+
+    def _on_published(self, kind: str, version: int, size: int, published: asyncio.Future) -> None:
+        if published.cancelled() or published.exception() is not None:
+            error = "cancelled" if published.cancelled() else repr(published.exception())
+            logging.error(f"Heartbeat error: {kind} version={version} not acked: {error}")
+            if nats_client.state != CONNECTED or nats_client.offline_for() < settings.NATS_OFFLINE_GRACE:
+                # Acks in flight when the connection drops fail together;
+                # resynchronise, and let the grace period decide on shutdown.
+                self._snapshot_due = True
+                return
+            self._on_failure()
+            return
+
+        self._safety_shutdown_triggered = False
+        self.frames[kind] += 1
+        self.bytes_sent[kind] += size
+        logging.info(f"[HEARTBEAT] subject={self.subject} | {kind} version={version} bytes={size}")
+
+    def _on_failure(self) -> None:
+        # Drained deltas are lost with the frame; resynchronise with a snapshot.
+        self._snapshot_due = True
+        if not self._safety_shutdown_triggered:
+            logging.warning("Heartbeat failed; triggering safety shutdown (all devices OFF).")
+            gpio_manager.force_all_off(reason="HEARTBEAT_FAILURE")
+            self._safety_shutdown_triggered = True
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        gpio_manager.state_listeners.append(self._on_state_changed)
+        nats_client.reconnect_listeners.append(self.request_snapshot)
+        next_beat = loop.time()
+
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, next_beat - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if loop.time() >= next_beat:
+                self._beats += 1
+                if self._snapshot_due or not self.delta_enabled or self._beats % self.snapshot_every == 0:
+                    await self._send(SNAPSHOT)
+                elif gpio_manager.state_version != self._sent_version:
+                    await self._send(DELTA)
+                else:
+                    await self._send(BEAT)
+                next_beat = loop.time() + settings.HEARTBEAT_INTERVAL
+
+            elif self._safety_shutdown_triggered:
+                # Publishing is failing; only the regular beat retries.
+                continue
+
+            elif self._snapshot_due:
+                await self._send(SNAPSHOT)
+
+            elif self.delta_enabled and gpio_manager.state_version != self._sent_version:
+                # Give related changes (e.g. a whole allocation step) a moment to land.
+                await asyncio.sleep(self.delta_window)
+                await self._send(DELTA)
+
+    def get_metrics(self) -> dict:
+        return {
+            "version": gpio_manager.state_version,
+            "frames": dict(self.frames),
+            "bytes_sent": dict(self.bytes_sent),
+        }
+
+
+heartbeat_publisher = HeartbeatPublisher()
+
+
+async def send_heartbeat() -> None:
+
+    await asyncio.sleep(1)
 
-        await asyncio.sleep(settings.HEARTBEAT_INTERVAL)
+    await heartbeat_publisher.run()
@@ -0,0 +1,95 @@
+# app/core/inverter_mailbox.py
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.application.power_reading_service import power_reading_service
+from app.domain.events.inverter_events import InverterProductionEvent
+
+logging = logging.getLogger(__name__)
+
+
+def _reading_time(event: InverterProductionEvent) -> datetime:
+    ts = event.payload.timestamp
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+class InverterReadingMailbox:
+    """Latest-value-wins hand-off between the NATS callback and power processing.
+
+    `post` only keeps the newest reading per inverter: a reading replaces a
+    pending one (coalesced) and readings not newer than the pending or last
+    applied one, by payload timestamp, are dropped. A single consumer task
+    applies whatever is newest when it gets to run, so a slow cycle never
+    replays a backlog of stale readings.
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, InverterProductionEvent] = {}
+        self._applied_at: Dict[int, datetime] = {}
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.received = 0
+        self.processed = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def post(self, event: InverterProductionEvent) -> None:
+        self.received += 1
+        inverter_id = event.payload.inverter_id
+        reading_time = _reading_time(event)
+
+        applied_at = self._applied_at.get(inverter_id)
+        pending = self._pending.get(inverter_id)
+        if (applied_at is not None and reading_time <= applied_at) or (
+            pending is not None and reading_time <= _reading_time(pending)
+        ):
+            self.dropped += 1
+            logging.info(
+                f"InverterReadingMailbox: dropping stale reading for inverter {inverter_id} "
+                f"(timestamp={event.payload.timestamp})"
+            )
+            return
+
+        if pending is not None:
+            self.coalesced += 1
+        self._pending[inverter_id] = event
+        self._ready.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+
+            batch, self._pending = self._pending, {}
+            for inverter_id, event in batch.items():
+                self._applied_at[inverter_id] = _reading_time(event)
+                try:
+                    await power_reading_service.handle_inverter_power(event)
+                except Exception:
+                    logging.exception(f"InverterReadingMailbox: failed to apply reading for inverter {inverter_id}")
+                self.processed += 1
+
+    def get_metrics(self) -> dict:
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "pending": len(self._pending),
+        }
+
+
+inverter_mailbox = InverterReadingMailbox()
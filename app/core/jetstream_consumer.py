@@ -0,0 +1,193 @@
+# app/core/jetstream_consumer.py
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Set
+
+from nats.errors import TimeoutError as NATSTimeoutError
+from nats.js.api import AckPolicy, ConsumerConfig, DeliverPolicy
+
+from app.core.config import settings
+from app.core.nats_client import nats_client
+
+logging = logging.getLogger(__name__)
+
+MessageHandler = Callable[[object], Awaitable[bool]]
+
+
+class JetStreamPullConsumer:
+    """Batched pull consumer for a JetStream subject.
+
+    Messages are fetched up to NATS_PULL_BATCH at a time and each is handed
+    to `handler` in its own task, started in stream order (the handler
+    keeps per-device order itself); it returns True for messages that
+    should be acked. Every message is acked as soon as its own handler
+    finishes, so a slow device does not hold back acks for the rest of its
+    batch. Fetching continues while fewer than NATS_MAX_ACK_PENDING
+    messages are outstanding and pauses until a handler finishes once the
+    limit is reached. Acks are fire-and-forget publishes sent by the
+    client's flusher; messages left unacked are redelivered after
+    NATS_ACK_WAIT.
+    """
+
+    def __init__(self):
+        self.max_ack_pending = max(1, settings.NATS_MAX_ACK_PENDING)
+        self.batch = max(1, min(settings.NATS_PULL_BATCH, self.max_ack_pending))
+        self.expires = settings.NATS_PULL_EXPIRES
+        self.ack_wait = settings.NATS_ACK_WAIT
+
+        self._sub = None
+        self._handler: Optional[MessageHandler] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self._room = asyncio.Event()
+        self.outstanding = 0
+
+        self.fetched = 0
+        self.acked = 0
+        self.unacked = 0
+        self.batches = 0
+        self.empty_polls = 0
+        self.fetch_errors = 0
+        self.ack_errors = 0
+        self.handled = 0
+        self._handling_time = 0.0
+
+    async def start(self, subject: str, handler: MessageHandler) -> None:
+        if self._task is not None:
+            return
+
+        durable = nats_client.durable_name(subject, pull=True)
+        config = ConsumerConfig(
+            durable_name=durable,
+            ack_policy=AckPolicy.EXPLICIT,
+            max_ack_pending=self.max_ack_pending,
+            ack_wait=self.ack_wait,
+            **await self._start_position(subject, durable),
+        )
+        self._sub = await nats_client.pull_subscribe(subject, durable, config)
+        self._handler = handler
+        self._task = asyncio.create_task(self._run())
+        logging.info(
+            f"JetStreamPullConsumer: consuming {subject} (batch={self.batch}, "
+            f"max_ack_pending={self.max_ack_pending}, ack_wait={self.ack_wait}s)"
+        )
+
+    @staticmethod
+    async def _start_position(subject: str, durable: str) -> dict:
+        """Where a newly created pull durable starts reading.
+
+        Only matters when the durable is first created. An agent switching
+        from push to pull picks up right after the push durable's ack floor,
+        so events published during the upgrade, or delivered but never
+        acked, are not skipped. Without a push durable it starts with new
+        events.
+        """
+        if await nats_client.consumer_info(durable) is not None:
+            return {}
+
+        push = await nats_client.consumer_info(nats_client.durable_name(subject))
+        if push is None:
+            return {"deliver_policy": DeliverPolicy.NEW}
+
+        floor = push.ack_floor.stream_seq if push.ack_floor else 0
+        if not floor:
+            # Nothing acked yet: start where the push durable started.
+            return {
+                "deliver_policy": push.config.deliver_policy,
+                "opt_start_seq": push.config.opt_start_seq,
+                "opt_start_time": push.config.opt_start_time,
+            }
+
+        logging.info(f"JetStreamPullConsumer: taking over from push durable at stream sequence {floor + 1}")
+        return {"deliver_policy": DeliverPolicy.BY_START_SEQUENCE, "opt_start_seq": floor + 1}
+
+    async def stop(self) -> None:
+        tasks = list(self._inflight)
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _fetch(self, batch: int) -> List:
+        try:
+            return await self._sub.fetch(batch, timeout=self.expires)
+        except NATSTimeoutError:
+            self.empty_polls += 1
+            return []
+
+    async def _run(self) -> None:
+        while True:
+            room = self.max_ack_pending - self.outstanding
+            if room <= 0:
+                self._room.clear()
+                await self._room.wait()
+                continue
+
+            try:
+                msgs = await self._fetch(min(self.batch, room))
+            except Exception:
+                self.fetch_errors += 1
+                # Expected while the client is reconnecting.
+                if nats_client.is_connected:
+                    logging.exception("JetStreamPullConsumer: fetch failed")
+                await asyncio.sleep(1)
+                continue
+
+            if not msgs:
+                continue
+            self.fetched += len(msgs)
+            self.batches += 1
+            for msg in msgs:
+                self.outstanding += 1
+                task = asyncio.create_task(self._process(msg))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _process(self, msg) -> None:
+        started = time.monotonic()
+        try:
+            try:
+                ok = await self._handler(msg)
+            except Exception:
+                # Unacked messages are redelivered; keep consuming.
+                logging.exception("JetStreamPullConsumer: handler failed")
+                ok = False
+
+            if not ok:
+                self.unacked += 1
+                return
+            try:
+                await msg.ack()
+            except Exception as e:
+                # Already acked, or the connection is gone; the server
+                # redelivers anything that did not get through.
+                logging.warning(f"JetStreamPullConsumer: ack failed: {e!r}")
+                self.ack_errors += 1
+                return
+            self.acked += 1
+        finally:
+            self.handled += 1
+            self._handling_time += time.monotonic() - started
+            self.outstanding -= 1
+            self._room.set()
+
+    def get_metrics(self) -> dict:
+        return {
+            "batch": self.batch,
+            "fetched": self.fetched,
+            "acked": self.acked,
+            "unacked": self.unacked,
+            "batches": self.batches,
+            "empty_polls": self.empty_polls,
+            "fetch_errors": self.fetch_errors,
+            "ack_errors": self.ack_errors,
+            "avg_batch_size": round(self.fetched / self.batches, 1) if self.batches else 0.0,
+            "outstanding": self.outstanding,
+            "avg_handle_ms": round(self._handling_time / self.handled * 1000, 2) if self.handled else 0.0,
+        }
+
+
+events_consumer = JetStreamPullConsumer()
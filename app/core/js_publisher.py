@@ -0,0 +1,126 @@
+# app/core/js_publisher.py
+import asyncio
+import itertools
+import logging
+import time
+from typing import Dict, Optional, Set
+
+from nats.errors import TimeoutError as NATSTimeoutError
+
+logging = logging.getLogger(__name__)
+
+MSG_ID = "Nats-Msg-Id"
+
+
+class JetStreamPublisher:
+    """Pipelined JetStream publishing with a bounded number of acks in flight.
+
+    `submit` only waits for a free slot (at most `max_in_flight` publishes
+    awaiting their ack) and returns a future that resolves to the PubAck,
+    so concurrent publishers share the connection instead of queueing
+    behind each other's round trips.
+
+    Every message gets a Nats-Msg-Id. A publish whose ack times out is sent
+    again with the same id, up to `retries` times; if an earlier copy did
+    reach the stream, the server drops the retry as a duplicate.
+    """
+
+    def __init__(
+        self,
+        client,
+        id_prefix: str,
+        max_in_flight: int = 64,
+        timeout: float = 2.0,
+        retries: int = 2,
+    ):
+        # The NATSClient; its `js` context is read per publish because it
+        # changes when the connection is re-established.
+        self._client = client
+        self._id_prefix = id_prefix
+        self._ids = itertools.count(1)
+        self._slots = asyncio.Semaphore(max(1, max_in_flight))
+        self._tasks: Set[asyncio.Task] = set()
+        self.max_in_flight = max(1, max_in_flight)
+        self.timeout = timeout
+        self.retries = max(0, retries)
+
+        self.submitted = 0
+        self.acked = 0
+        self.failed = 0
+        self.retried = 0
+        self.duplicates = 0
+        self.in_flight = 0
+        self.max_in_flight_seen = 0
+        self.last_latency_ms: Optional[float] = None
+        self.max_latency_ms = 0.0
+        self._latency_total_ms = 0.0
+
+    async def submit(self, subject: str, data: bytes, headers: Optional[Dict[str, str]] = None) -> asyncio.Future:
+        await self._slots.acquire()
+
+        headers = dict(headers or {})
+        headers.setdefault(MSG_ID, f"{self._id_prefix}-{next(self._ids)}")
+
+        self.submitted += 1
+        self.in_flight += 1
+        if self.in_flight > self.max_in_flight_seen:
+            self.max_in_flight_seen = self.in_flight
+
+        task = asyncio.create_task(self._publish(subject, data, headers))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def publish(self, subject: str, data: bytes, headers: Optional[Dict[str, str]] = None):
+        return await (await self.submit(subject, data, headers))
+
+    async def _publish(self, subject: str, data: bytes, headers: Dict[str, str]):
+        started = time.perf_counter()
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    ack = await self._client.js.publish(subject, data, timeout=self.timeout, headers=headers)
+                except NATSTimeoutError:
+                    if attempt == self.retries:
+                        raise
+                    self.retried += 1
+                    logging.warning(f"JetStreamPublisher: ack timeout for {headers[MSG_ID]} on {subject}; retrying")
+                    continue
+
+                if ack.duplicate:
+                    self.duplicates += 1
+                self.acked += 1
+                self._record_latency((time.perf_counter() - started) * 1000.0)
+                return ack
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait for every publish submitted so far to be acked or to fail."""
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+
+    def _record_latency(self, latency_ms: float) -> None:
+        self.last_latency_ms = latency_ms
+        self._latency_total_ms += latency_ms
+        if latency_ms > self.max_latency_ms:
+            self.max_latency_ms = latency_ms
+
+    def get_metrics(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_in_flight_seen": self.max_in_flight_seen,
+            "submitted": self.submitted,
+            "acked": self.acked,
+            "failed": self.failed,
+            "retried": self.retried,
+            "duplicates": self.duplicates,
+            "last_latency_ms": round(self.last_latency_ms, 2) if self.last_latency_ms is not None else None,
+            "avg_latency_ms": round(self._latency_total_ms / self.acked, 2) if self.acked else None,
+            "max_latency_ms": round(self.max_latency_ms, 2),
+        }
@@ -1,25 +1,239 @@
+import asyncio
 import json
 import logging
+import random
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import nats
+from nats.js.errors import NotFoundError
+from pydantic import TypeAdapter
 
 from app.core.config import settings
+from app.core.js_publisher import JetStreamPublisher
+from app.core.outbox import PRIORITY_NORMAL, OutboxEntry, PublishOutbox
 
 logging = logging.getLogger(__name__)
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+CONTENT_TYPE = "Content-Type"
+CONTENT_ENCODING = "Content-Encoding"
+ACCEPT = "Accept"
+ACCEPT_ENCODING = "Accept-Encoding"
+
+CONNECTED = "connected"
+RECONNECTING = "reconnecting"
+CLOSED = "closed"
+
+
+def _chain_future(target: asyncio.Future, source: asyncio.Future) -> None:
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class Codec(ABC):
+    content_type = ""
+
+    @abstractmethod
+    def encode(self, payload: Any) -> bytes:
+        ...
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        ...
+
+
+class JSONCodec(Codec):
+    content_type = "application/json"
+
+    def encode(self, payload: Any) -> bytes:
+        return json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        # json.loads detects UTF-8 bytes itself; no intermediate str copy.
+        return json.loads(data)
+
+
+class MsgPackCodec(Codec):
+    content_type = "application/msgpack"
+
+    def encode(self, payload: Any) -> bytes:
+        return msgpack.packb(payload, default=str)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, strict_map_key=False)
+
+
+class CBORCodec(Codec):
+    content_type = "application/cbor"
+
+    def encode(self, payload: Any) -> bytes:
+        return cbor2.dumps(payload, default=lambda encoder, value: encoder.encode(str(value)))
+
+    def decode(self, data: bytes) -> Any:
+        return cbor2.loads(data)
+
+
+JSON = JSONCodec()
+CODECS: Dict[str, Codec] = {JSON.content_type: JSON}
+if msgpack is not None:
+    CODECS[MsgPackCodec.content_type] = MsgPackCodec()
+if cbor2 is not None:
+    CODECS[CBORCodec.content_type] = CBORCodec()
+
+CODEC_NAMES = {"json": JSONCodec.content_type, "msgpack": MsgPackCodec.content_type, "cbor": CBORCodec.content_type}
+
 
 class NATSClient:
+    """NATS / JetStream connection with a configurable wire codec.
+
+    Outgoing payloads are encoded with `codec` and tagged with a
+    Content-Type header (plus Content-Encoding: deflate when compressed);
+    incoming messages are decoded by their Content-Type, JSON when absent.
+    Published streams have many subscribers, so their codec only changes
+    through NATS_CODEC: with "auto" they stay uncompressed JSON, an explicit
+    codec also enables compression. Replies are negotiated per request, from
+    the requester's Accept / Content-Type and Accept-Encoding /
+    Content-Encoding headers.
+    """
+
     def __init__(self):
         self.nc = None
         self.js = None
+        self.state = CLOSED
+        self.disconnected_at: Optional[float] = None
+        self.disconnects = 0
+        self.reconnects = 0
+        self.drained = 0
+        self.outbox = PublishOutbox(settings.NATS_OUTBOX_MAX_BYTES)
+        self._drain_task: Optional[asyncio.Task] = None
+        self.reconnect_listeners: List[Callable[[], None]] = []
+
+        self.codec_mode = settings.NATS_CODEC.lower()
+        self.compress_min_bytes = settings.NATS_COMPRESS_MIN_BYTES
+        self.codec: Codec = JSON
+        self.compress = self.codec_mode != "auto"
+        if self.codec_mode != "auto":
+            content_type = CODEC_NAMES.get(self.codec_mode)
+            if content_type not in CODECS:
+                raise RuntimeError(f"NATS_CODEC={settings.NATS_CODEC} is unknown or its package is not installed")
+            self.codec = CODECS[content_type]
+
+        self.publisher = JetStreamPublisher(
+            self,
+            id_prefix=f"{settings.RASPBERRY_UUID}-{uuid.uuid4().hex[:8]}",
+            max_in_flight=settings.NATS_PUBLISH_MAX_IN_FLIGHT,
+            timeout=settings.NATS_PUBLISH_TIMEOUT,
+            retries=settings.NATS_PUBLISH_RETRIES,
+        )
+
+    # ---------------------------------------------------------------
+    # Codec
+    # ---------------------------------------------------------------
+    def encode(
+        self, payload: Any, codec: Optional[Codec] = None, compress: Optional[bool] = None
+    ) -> Tuple[bytes, Dict[str, str]]:
+        codec = codec or self.codec
+        return self.frame(codec.encode(payload), codec.content_type, compress)
+
+    def frame(
+        self, data: bytes, content_type: str, compress: Optional[bool] = None
+    ) -> Tuple[bytes, Dict[str, str]]:
+        """Headers for already encoded data, compressing it when it is large enough."""
+        headers = {CONTENT_TYPE: content_type}
+        if compress is None:
+            compress = self.compress
+        if compress and self.compress_min_bytes and len(data) >= self.compress_min_bytes:
+            compressed = zlib.compress(data, 6)
+            if len(compressed) < len(data):
+                data = compressed
+                headers[CONTENT_ENCODING] = "deflate"
+        return data, headers
+
+    def _codec_for(self, content_type: Optional[str]) -> Codec:
+        if not content_type:
+            return JSON
+        codec = CODECS.get(content_type.split(";")[0].strip().lower())
+        if codec is None:
+            raise ValueError(f"Unsupported Content-Type: {content_type}")
+        return codec
+
+    def decode(self, msg) -> Any:
+        """Decode a received message straight from its bytes."""
+        headers = msg.headers or {}
+        data = msg.data
+        if not data:
+            return {}
+        if headers.get(CONTENT_ENCODING) == "deflate":
+            data = zlib.decompress(data)
+        return self._codec_for(headers.get(CONTENT_TYPE)).decode(data)
+
+    def validate(self, msg, adapter: TypeAdapter) -> Any:
+        """Decode and validate in one step; plain JSON is validated straight from the bytes."""
+        headers = msg.headers or {}
+        if not headers.get(CONTENT_ENCODING) and self._codec_for(headers.get(CONTENT_TYPE)) is JSON:
+            return adapter.validate_json(msg.data)
+        return adapter.validate_python(self.decode(msg))
+
+    async def respond(self, msg, payload: Any):
+        """Reply in the requester's codec (JSON for plain requests).
 
+        The reply is compressed only when the request was compressed or
+        lists deflate in Accept-Encoding.
+        """
+        headers = msg.headers or {}
+        try:
+            codec = self._codec_for(headers.get(ACCEPT) or headers.get(CONTENT_TYPE))
+        except ValueError:
+            codec = JSON
+        compress = headers.get(CONTENT_ENCODING) == "deflate" or "deflate" in headers.get(ACCEPT_ENCODING, "")
+        data, reply_headers = self.encode(payload, codec, compress)
+        await self.nc.publish(msg.reply, data, headers=reply_headers)
+
+    # ---------------------------------------------------------------
+    # Connection
+    # ---------------------------------------------------------------
     async def connect(self):
-        logging.info(f"Connecting to NATS: {settings.NATS_URL}")
-        self.nc = await nats.connect(settings.NATS_URL)
+        # Per-agent jitter on the reconnect wait keeps a fleet from
+        # reconnecting in lockstep after a server restart.
+        reconnect_wait = settings.NATS_RECONNECT_WAIT + random.uniform(0, settings.NATS_RECONNECT_JITTER)
+        logging.info(f"Connecting to NATS: {settings.NATS_URL} (reconnect wait {reconnect_wait:.2f}s)")
+        self.nc = await nats.connect(
+            settings.NATS_URL,
+            allow_reconnect=True,
+            reconnect_time_wait=reconnect_wait,
+            max_reconnect_attempts=settings.NATS_MAX_RECONNECT_ATTEMPTS,
+            disconnected_cb=self._on_disconnected,
+            reconnected_cb=self._on_reconnected,
+            closed_cb=self._on_closed,
+            error_cb=self._on_error,
+        )
         self.js = self.nc.jetstream()
+        self.state = CONNECTED
+        self.disconnected_at = None
 
         logging.info("Connected to NATS & JetStream")
 
+        # Checked once per connection; reconnects reuse the connection.
         try:
             await self.js.stream_info("device_communication")
             logging.info("Stream device_communication found.")
@@ -27,20 +241,154 @@ class NATSClient:
             logging.error("Stream device_communication not found!")
             raise RuntimeError("JetStream stream 'device_communication' must be created by backend.")
 
+        self._schedule_drain()
+
     async def ensure_connected(self):
-        if not self.nc or not self.nc.is_connected:
+        # A dropped connection is re-established by the client itself;
+        # only a missing or closed one needs a new connect().
+        if self.nc is None or self.nc.is_closed:
             await self.connect()
 
-    async def js_publish(self, subject: str, payload: dict):
+    @property
+    def is_connected(self) -> bool:
+        return self.state == CONNECTED
+
+    def offline_for(self) -> float:
+        """Seconds since the connection dropped, 0 while connected."""
+        if self.disconnected_at is None:
+            return 0.0
+        return time.monotonic() - self.disconnected_at
+
+    async def _on_disconnected(self):
+        if self.state != CONNECTED:
+            return
+        self.state = RECONNECTING
+        self.disconnected_at = time.monotonic()
+        self.disconnects += 1
+        logging.warning("NATS: connection lost; buffering publishes until reconnected")
+
+    async def _on_reconnected(self):
+        self.state = CONNECTED
+        self.reconnects += 1
+        logging.info(
+            f"NATS: reconnected after {self.offline_for():.1f}s; draining {len(self.outbox)} buffered messages"
+        )
+        self.disconnected_at = None
+        self._schedule_drain()
+        for listener in self.reconnect_listeners:
+            listener()
+
+    async def _on_closed(self):
+        self.state = CLOSED
+        if self.disconnected_at is None:
+            self.disconnected_at = time.monotonic()
+        logging.info("NATS: connection closed")
+
+    async def _on_error(self, e: Exception):
+        logging.warning(f"NATS: {e!r}")
+
+    # ---------------------------------------------------------------
+    # Publishing
+    # ---------------------------------------------------------------
+    def _buffer(
+        self,
+        subject: str,
+        data: bytes,
+        headers: Dict[str, str],
+        jetstream: bool,
+        priority: int,
+        future: Optional[asyncio.Future] = None,
+    ) -> bool:
+        """Keep a publish for later while disconnected or while older ones are queued."""
+        if self.is_connected and not self.outbox:
+            return False
+        self.outbox.put(OutboxEntry(subject, data, headers, jetstream, priority, future))
+        if self.is_connected:
+            self._schedule_drain()
+        return True
+
+    def _schedule_drain(self) -> None:
+        if self.outbox and (self._drain_task is None or self._drain_task.done()):
+            self._drain_task = asyncio.create_task(self._drain_outbox())
+
+    async def _drain_outbox(self) -> None:
+        while self.outbox and self.is_connected:
+            entry = self.outbox.pop()
+            try:
+                if entry.jetstream:
+                    future = await self.publisher.submit(entry.subject, entry.data, entry.headers)
+                    if entry.future is not None:
+                        future.add_done_callback(partial(_chain_future, entry.future))
+                    else:
+                        future.add_done_callback(self._log_publish_failure)
+                else:
+                    await self.nc.publish(entry.subject, entry.data, headers=entry.headers)
+                    if entry.future is not None and not entry.future.done():
+                        entry.future.set_result(None)
+            except Exception:
+                logging.exception(f"NATS: failed to send buffered message for {entry.subject}")
+                self.outbox.requeue(entry)
+                return
+            self.drained += 1
+
+    async def js_publish(self, subject: str, payload: dict, priority: int = PRIORITY_NORMAL):
+        """JetStream publish; returns the PubAck, or None when it was buffered for later."""
         await self.ensure_connected()
 
-        data = json.dumps(payload).encode("utf-8")
-        await self.js.publish(subject, data)
+        data, headers = self.encode(payload)
+        if self._buffer(subject, data, headers, True, priority):
+            return None
+        return await self.publisher.publish(subject, data, headers)
+
+    async def js_publish_nowait(self, subject: str, payload: dict, priority: int = PRIORITY_NORMAL) -> asyncio.Future:
+        """Queue a JetStream publish without waiting for its ack; failures are logged."""
+        await self.ensure_connected()
+
+        data, headers = self.encode(payload)
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(self._log_publish_failure)
+        if not self._buffer(subject, data, headers, True, priority, future):
+            published = await self.publisher.submit(subject, data, headers)
+            published.add_done_callback(partial(_chain_future, future))
+        return future
+
+    async def js_publish_bytes(self, subject: str, data: bytes, content_type: str = JSONCodec.content_type):
+        """JetStream publish of an already encoded payload."""
+        return await (await self.js_publish_bytes_nowait(subject, data, content_type))
+
+    async def js_publish_bytes_nowait(
+        self, subject: str, data: bytes, content_type: str = JSONCodec.content_type
+    ) -> asyncio.Future:
+        """Submit an already encoded payload; the returned future resolves to the PubAck.
 
-    async def publish_raw(self, subject: str, payload: dict):
+        Not buffered while reconnecting, and failures are left to the caller.
+        """
         await self.ensure_connected()
-        data = json.dumps(payload).encode("utf-8")
-        await self.nc.publish(subject, data)
+        data, headers = self.frame(data, content_type)
+        return await self.publisher.submit(subject, data, headers)
+
+    @staticmethod
+    def _log_publish_failure(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logging.error(f"JetStream publish failed: {future.exception()!r}")
+
+    async def publish_raw(self, subject: str, payload: dict, priority: int = PRIORITY_NORMAL):
+        await self.ensure_connected()
+        data, headers = self.encode(payload)
+        if self._buffer(subject, data, headers, False, priority):
+            return
+        await self.nc.publish(subject, data, headers=headers)
+
+    def get_metrics(self) -> dict:
+        return {
+            "state": self.state,
+            "offline_s": round(self.offline_for(), 1),
+            "disconnects": self.disconnects,
+            "reconnects": self.reconnects,
+            "drained": self.drained,
+            "outbox": self.outbox.get_metrics(),
+            "publish": self.publisher.get_metrics(),
+        }
 
     async def subscribe(self, subject: str, handler):
         await self.ensure_connected()
@@ -50,15 +398,43 @@ class NATSClient:
 
         return sub
     
+    @staticmethod
+    def durable_name(subject: str, pull: bool = False) -> str:
+        # Push and pull consumers cannot share a durable.
+        return subject.replace(".", "_") + ("_pull" if pull else "")
+
+    async def consumer_info(self, durable: str, stream: str = "device_communication"):
+        """Info of an existing durable consumer, None when it does not exist yet."""
+        await self.ensure_connected()
+        try:
+            return await self.js.consumer_info(stream, durable)
+        except NotFoundError:
+            return None
+
     async def subscribe_js(self, subject: str, handler):
         await self.ensure_connected()
-        durable = subject.replace(".", "_")
+        durable = self.durable_name(subject)
         return await self.js.subscribe(subject, durable=durable, cb=handler)
 
+    async def pull_subscribe(self, subject: str, durable: str, config=None):
+        """Pull subscription on a durable consumer, created with `config` if missing."""
+        await self.ensure_connected()
+        sub = await self.js.pull_subscribe(subject, durable=durable, config=config)
+        logging.info(f"[NATS] Pull subscription on subject: {subject} (durable={durable})")
+        return sub
+
     async def close(self):
         if self.nc is None:
             return
 
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+
+        try:
+            await self.publisher.flush(timeout=settings.NATS_PUBLISH_TIMEOUT)
+        except Exception:
+            pass
+
         try:
             logging.info("Closing NATS connection...")
             await self.nc.drain()
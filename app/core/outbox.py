@@ -0,0 +1,102 @@
+# app/core/outbox.py
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+logging = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class OutboxEntry:
+    __slots__ = ("subject", "data", "headers", "jetstream", "priority", "future")
+
+    def __init__(
+        self,
+        subject: str,
+        data: bytes,
+        headers: Dict[str, str],
+        jetstream: bool,
+        priority: int = PRIORITY_NORMAL,
+        future: Optional[asyncio.Future] = None,
+    ):
+        self.subject = subject
+        self.data = data
+        self.headers = headers
+        self.jetstream = jetstream
+        self.priority = min(max(priority, PRIORITY_HIGH), PRIORITY_LOW)
+        self.future = future
+
+    @property
+    def size(self) -> int:
+        return len(self.subject) + len(self.data)
+
+
+class PublishOutbox:
+    """Bounded, prioritized buffer for publishes made while NATS is down.
+
+    Entries are drained highest priority first and in submission order
+    within a priority. When `max_bytes` would be exceeded, the oldest
+    entries of the lowest priority not above the new entry's are dropped
+    to make room; if only more important entries are left, the new entry
+    is rejected instead. Dropped entries fail their future, if any.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._queues: List[Deque[OutboxEntry]] = [deque() for _ in range(PRIORITY_LOW + 1)]
+        self.bytes = 0
+        self.buffered = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self._queues)
+
+    def put(self, entry: OutboxEntry) -> bool:
+        while self.bytes + entry.size > self.max_bytes:
+            victims = next(
+                (q for q in reversed(self._queues[entry.priority:]) if q),
+                None,
+            )
+            if victims is None:
+                self._drop(entry)
+                return False
+            victim = victims.popleft()
+            self.bytes -= victim.size
+            self._drop(victim)
+
+        self._queues[entry.priority].append(entry)
+        self.bytes += entry.size
+        self.buffered += 1
+        return True
+
+    def pop(self) -> Optional[OutboxEntry]:
+        for q in self._queues:
+            if q:
+                entry = q.popleft()
+                self.bytes -= entry.size
+                return entry
+        return None
+
+    def requeue(self, entry: OutboxEntry) -> None:
+        """Put back an entry that could not be sent, ahead of its priority."""
+        self._queues[entry.priority].appendleft(entry)
+        self.bytes += entry.size
+
+    def _drop(self, entry: OutboxEntry) -> None:
+        self.dropped += 1
+        logging.warning(f"PublishOutbox: full, dropping message for {entry.subject} ({entry.size} bytes)")
+        if entry.future is not None and not entry.future.done():
+            entry.future.set_exception(RuntimeError(f"Outbox full, message for {entry.subject} dropped"))
+
+    def get_metrics(self) -> dict:
+        return {
+            "pending": len(self),
+            "pending_bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "buffered": self.buffered,
+            "dropped": self.dropped,
+        }
@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import Annotated, Any, Dict, List, Literal, Optional, Tuple, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
 
 from app.domain.events.enums import EventType
 
@@ -14,27 +14,53 @@ class DeviceCreatedPayload(BaseModel):
     device_number: int
     mode: str
     threshold_kw: Optional[float] = None
+    power_off_threshold_kw: Optional[float] = None
+    min_on_seconds: Optional[float] = None
+    min_off_seconds: Optional[float] = None
+    priority: int = 0
+    rated_load_kw: Optional[float] = None
 
 
 class DeviceCreatedEvent(BaseEvent):
+    event_type: Literal[EventType.DEVICE_CREATED.value]
     payload: DeviceCreatedPayload
 
 
+OPTIONAL_DEVICE_SETTINGS = (
+    "power_off_threshold_kw",
+    "min_on_seconds",
+    "min_off_seconds",
+    "priority",
+    "rated_load_kw",
+)
+
+
 class DeviceUpdatedPayload(BaseModel):
     device_id: int
     mode: str
     threshold_kw: Optional[float] = None
+    # Absent means "keep the current value"; an explicit null clears it.
+    power_off_threshold_kw: Optional[float] = None
+    min_on_seconds: Optional[float] = None
+    min_off_seconds: Optional[float] = None
+    priority: Optional[int] = None
+    rated_load_kw: Optional[float] = None
+
+    def sent_settings(self) -> Dict[str, Any]:
+        """Optional settings present in the message, including explicit nulls."""
+        return {name: getattr(self, name) for name in OPTIONAL_DEVICE_SETTINGS if name in self.model_fields_set}
 
 
 class DeviceUpdatedEvent(BaseEvent):
+    event_type: Literal[EventType.DEVICE_UPDATED.value]
     payload: DeviceUpdatedPayload
 
 
 class DeviceDeletePayload(BaseModel):
     device_id: int
 
-class DeviceDeletedEvent(BaseModel):
-    event_type: str
+class DeviceDeletedEvent(BaseEvent):
+    event_type: Literal[EventType.DEVICE_DELETED.value]
     payload: DeviceDeletePayload
 
 
@@ -45,6 +71,7 @@ class PowerReadingPayload(BaseModel):
 
 
 class PowerReadingEvent(BaseEvent):
+    event_type: Literal[EventType.POWER_READING.value]
     payload: PowerReadingPayload
 
 
@@ -55,4 +82,32 @@ class DeviceCommandPayload(BaseModel):
 
 
 class DeviceCommandEvent(BaseEvent):
+    event_type: Literal[EventType.DEVICE_COMMAND.value]
     payload: DeviceCommandPayload
+
+
+# Everything published on the Raspberry events subject, tagged by event_type.
+DeviceEvent = Annotated[
+    Union[DeviceCreatedEvent, DeviceUpdatedEvent, DeviceDeletedEvent, PowerReadingEvent, DeviceCommandEvent],
+    Field(discriminator="event_type"),
+]
+
+# Built once; validating through it skips per-message schema dispatch.
+device_event_adapter: TypeAdapter[DeviceEvent] = TypeAdapter(DeviceEvent)
+
+# Payload class -> (has device_id, has is_on), read from the schema once per class.
+_ACK_FIELDS: Dict[type, Tuple[bool, bool]] = {}
+
+
+def ack_fields(payload: BaseModel) -> Tuple[Optional[int], Optional[bool]]:
+    """device_id and is_on for the backend ACK; None when the payload has no such field.
+
+    A getattr default on a pydantic model pays for an internal
+    AttributeError on every miss, so field presence is looked up per class.
+    """
+    cls = type(payload)
+    fields = _ACK_FIELDS.get(cls)
+    if fields is None:
+        fields = _ACK_FIELDS[cls] = ("device_id" in cls.model_fields, "is_on" in cls.model_fields)
+    has_device_id, has_is_on = fields
+    return (payload.device_id if has_device_id else None), (payload.is_on if has_is_on else None)
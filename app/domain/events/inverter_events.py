@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
+from typing import Literal, Optional
+from pydantic import BaseModel, TypeAdapter
 
 from app.domain.events.enums import EventType
 
@@ -15,5 +15,8 @@ class InverterProductionPayload(BaseModel):
 
 
 class InverterProductionEvent(BaseModel):
-    event_type: EventType
+    event_type: Literal[EventType.POWER_READING.value]
     payload: InverterProductionPayload
+
+
+inverter_event_adapter: TypeAdapter[InverterProductionEvent] = TypeAdapter(InverterProductionEvent)
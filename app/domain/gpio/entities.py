@@ -13,5 +13,10 @@ class GPIODevice(BaseModel):
     pin_number: int
     mode: DeviceMode
     power_threshold_kw: Optional[float]
+    power_off_threshold_kw: Optional[float] = None
+    min_on_seconds: Optional[float] = None
+    min_off_seconds: Optional[float] = None
+    priority: int = 0
+    rated_load_kw: Optional[float] = None
     is_on: Optional[bool] = None
     active_low: bool = True
@@ -0,0 +1,45 @@
+# app/domain/gpio/hysteresis.py
+from typing import Tuple
+
+from app.domain.gpio.entities import GPIODevice
+
+
+def switch_thresholds(device: GPIODevice, default_band: float) -> Tuple[float, float]:
+    """(on_threshold, off_threshold) for an AUTO_POWER device.
+
+    The off threshold defaults to `default_band` below the on threshold and
+    is never above it.
+    """
+    on_threshold = device.power_threshold_kw
+    off_threshold = device.power_off_threshold_kw
+    if off_threshold is None:
+        off_threshold = on_threshold - default_band
+    return on_threshold, min(off_threshold, on_threshold)
+
+
+class HysteresisSwitch:
+    """ON/OFF state machine for one AUTO_POWER device.
+
+    OFF -> ON when power >= on_threshold, ON -> OFF when power < off_threshold,
+    and no transition before the current state has been held for its
+    minimum dwell time (min_on / min_off seconds). Times are monotonic seconds.
+    """
+
+    def __init__(self, is_on: bool, changed_at: float = float("-inf")):
+        self.is_on = is_on
+        self.changed_at = changed_at
+
+    def target(self, power: float, on_threshold: float, off_threshold: float) -> bool:
+        if self.is_on:
+            return power >= off_threshold
+        return power >= on_threshold
+
+    def hold_remaining(self, now: float, min_on: float, min_off: float) -> float:
+        """Seconds until the current state may be left (0 when it may change now)."""
+        dwell = min_on if self.is_on else min_off
+        return max(0.0, dwell - (now - self.changed_at))
+
+    def commit(self, is_on: bool, now: float) -> None:
+        if is_on != self.is_on:
+            self.is_on = is_on
+            self.changed_at = now
@@ -0,0 +1,177 @@
+# app/domain/gpio/surplus_allocator.py
+from math import inf
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.domain.gpio.entities import GPIODevice
+
+
+class SurplusAllocator:
+    """Greedy allocation of surplus power to AUTO_POWER devices by priority.
+
+    Devices with a rated load are kept sorted by (priority, device_id); lower
+    priority values are served first. A reading of `power` walks that order
+    and switches on every device whose rated load still fits in what is
+    left. A device that does not fit is skipped, and lower priorities can
+    still use the remainder.
+
+    Each device's key is its rated load plus the load already committed to
+    devices before it, so an off device fits when key <= power. A lazy
+    segment tree keeps the smallest key of the devices off and the largest
+    of the devices on. A reading jumps straight to the next device whose
+    decision flips and shifts the keys after it by that device's load. A
+    reading costs O((changes + 1) * log n).
+
+    With `band` > 0 a device that is already on is kept while key <= power
+    + band, so it is not dropped on a small dip.
+    """
+
+    def __init__(self):
+        self.order: List[int] = []
+        self.loads: List[float] = []
+        self.position: Dict[int, int] = {}
+        self.on: List[bool] = []
+        self.allocated = False
+        self.allocated_count = 0
+        self.committed = 0.0
+
+        self._size = 1
+        self._min_off: List[float] = [inf, inf]
+        self._max_on: List[float] = [-inf, -inf]
+        self._lazy: List[float] = [0.0, 0.0]
+
+    def rebuild(self, devices: Iterable[GPIODevice]) -> None:
+        """Re-sort after devices were added, removed or re-prioritised (O(n log n))."""
+        entries: List[Tuple[int, int, float]] = sorted(
+            (device.priority, device.device_id, device.rated_load_kw)
+            for device in devices
+            if device.rated_load_kw is not None
+        )
+        self.order = [device_id for _, device_id, _ in entries]
+        self.loads = [load for _, _, load in entries]
+        self.position = {device_id: index for index, device_id in enumerate(self.order)}
+
+        self._size = 1
+        while self._size < len(self.order):
+            self._size *= 2
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the allocation; the next one visits every device."""
+        self.on = [False] * len(self.order)
+        self.allocated = False
+        self.allocated_count = 0
+        self.committed = 0.0
+
+        # Nothing committed yet: every key is the device's own load.
+        self._min_off = [inf] * (2 * self._size)
+        self._max_on = [-inf] * (2 * self._size)
+        self._lazy = [0.0] * (2 * self._size)
+        self._min_off[self._size:self._size + len(self.loads)] = self.loads
+        for node in range(self._size - 1, 0, -1):
+            self._pull(node)
+
+    def __contains__(self, device_id: int) -> bool:
+        return device_id in self.position
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def target(self, device_id: int) -> Optional[bool]:
+        """Allocated state of a device (None if not allocated yet)."""
+        index = self.position.get(device_id)
+        if index is None or not self.allocated:
+            return None
+        return self.on[index]
+
+    # ---------------------------------------------------------------
+    # Segment tree
+    # ---------------------------------------------------------------
+    def _shift(self, node: int, delta: float) -> None:
+        self._min_off[node] += delta
+        self._max_on[node] += delta
+        self._lazy[node] += delta
+
+    def _push(self, node: int) -> None:
+        delta = self._lazy[node]
+        if delta:
+            self._shift(2 * node, delta)
+            self._shift(2 * node + 1, delta)
+            self._lazy[node] = 0.0
+
+    def _pull(self, node: int) -> None:
+        self._min_off[node] = min(self._min_off[2 * node], self._min_off[2 * node + 1])
+        self._max_on[node] = max(self._max_on[2 * node], self._max_on[2 * node + 1])
+
+    def _add(self, start: int, delta: float, node: int = 1, lo: int = 0, hi: int = -1) -> None:
+        """Shift the keys of every device from `start` on by `delta`."""
+        if hi < 0:
+            hi = self._size
+        if hi <= start:
+            return
+        if lo >= start:
+            self._shift(node, delta)
+            return
+        self._push(node)
+        mid = (lo + hi) // 2
+        self._add(start, delta, 2 * node, lo, mid)
+        self._add(start, delta, 2 * node + 1, mid, hi)
+        self._pull(node)
+
+    def _flip(self, index: int) -> None:
+        leaf = self._size + index
+        for shift in range(leaf.bit_length() - 1, 0, -1):
+            self._push(leaf >> shift)
+
+        if self.on[index]:
+            self._min_off[leaf], self._max_on[leaf] = self._max_on[leaf], -inf
+        else:
+            self._min_off[leaf], self._max_on[leaf] = inf, self._min_off[leaf]
+        self.on[index] = not self.on[index]
+
+        leaf //= 2
+        while leaf:
+            self._pull(leaf)
+            leaf //= 2
+
+    def _find(self, start: int, on_at: float, off_above: float, node: int = 1, lo: int = 0, hi: int = -1) -> int:
+        """First index >= start of an off device with key <= on_at or an on device with key > off_above."""
+        if hi < 0:
+            hi = self._size
+        if hi <= start or (self._min_off[node] > on_at and self._max_on[node] <= off_above):
+            return -1
+        if hi - lo == 1:
+            return lo
+        self._push(node)
+        mid = (lo + hi) // 2
+        found = self._find(start, on_at, off_above, 2 * node, lo, mid)
+        if found < 0:
+            found = self._find(start, on_at, off_above, 2 * node + 1, mid, hi)
+        return found
+
+    # ---------------------------------------------------------------
+    # Allocation
+    # ---------------------------------------------------------------
+    def allocate(self, power: float, band: float = 0.0) -> List[Tuple[int, bool]]:
+        """Apply a reading; returns the (device_id, is_on) pairs whose allocation changed."""
+        first = not self.allocated
+        changes: List[Tuple[int, bool]] = []
+        index = self._find(0, power, power + max(band, 0.0))
+
+        while index >= 0:
+            is_on = not self.on[index]
+            load = self.loads[index]
+            self._flip(index)
+            self._add(index + 1, load if is_on else -load)
+            self.allocated_count += 1 if is_on else -1
+            self.committed += load if is_on else -load
+            changes.append((self.order[index], is_on))
+            index = self._find(index + 1, power, power + max(band, 0.0))
+
+        self.allocated = True
+        if first:
+            return [(device_id, self.on[index]) for index, device_id in enumerate(self.order)]
+        return changes
+
+    def committed_load(self) -> float:
+        """Rated load of the devices currently allocated."""
+        return self.committed
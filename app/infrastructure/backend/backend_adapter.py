@@ -1,80 +1,328 @@
 # app/infrastructure/backend/backend_adapter.py
+import asyncio
+import gzip
 import json
 import logging
+import uuid
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
 import httpx
 
 from app.core.config import settings
+from app.core.event_loop import call_on_loop
+from app.infrastructure.backend.circuit_breaker import CircuitBreaker
+from app.infrastructure.backend.event_shipper import EventShipper
+from app.infrastructure.backend.offline_wal import SegmentedWAL
 
 logging = logging.getLogger(__name__)
 
+DEVICE_EVENTS_PATH = "/device-events/"
+DEVICE_EVENTS_BATCH_PATH = "/device-events/batch/"
+
+
+def _is_permanent_rejection(status: int) -> bool:
+    return 400 <= status < 500 and status not in (408, 429)
+
 
 class BackendAdapter:
 
     def __init__(self, base_url: Optional[str]):
         self.base_url = base_url.rstrip("/") if base_url else None
-        self.queue_path = Path(settings.LOG_DIR) / "pending_backend_events.jsonl"
-        try:
-            self.queue_path.parent.mkdir(parents=True, exist_ok=True)
-        except Exception:
-            logging.warning("BackendAdapter: failed to prepare queue directory.")
+        self.legacy_queue_path = Path(settings.LOG_DIR) / "pending_backend_events.jsonl"
+        self.wal = SegmentedWAL(
+            Path(settings.LOG_DIR) / "backend_wal",
+            segment_bytes=settings.BACKEND_WAL_SEGMENT_BYTES,
+            max_bytes=settings.BACKEND_WAL_MAX_BYTES,
+        )
+        self._migrate_legacy_queue()
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._flush_lock = asyncio.Lock()
+        self._batch_supported: Optional[bool] = None
+        self._recovery_task: Optional[asyncio.Task] = None
+        self.bytes_sent = 0
+        self.breaker = CircuitBreaker(
+            "backend",
+            failure_threshold=settings.BACKEND_CB_FAILURE_THRESHOLD,
+            base_delay=settings.BACKEND_CB_BASE_DELAY,
+            max_delay=settings.BACKEND_CB_MAX_DELAY,
+        )
+
+        batching = settings.BACKEND_BATCH_ENABLED
+        self.shipper = EventShipper(
+            self._deliver,
+            max_queue_size=settings.BACKEND_QUEUE_SIZE,
+            concurrency=settings.BACKEND_MAX_CONCURRENCY,
+            max_batch_size=settings.BACKEND_BATCH_MAX_EVENTS if batching else 1,
+            max_batch_delay=settings.BACKEND_BATCH_MAX_DELAY_MS / 1000.0 if batching else 0.0,
+        )
 
     def is_enabled(self) -> bool:
         return bool(self.base_url)
 
+    async def start(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """Open the shared keep-alive client and start the background workers."""
+        if not self.is_enabled():
+            logging.info("BackendAdapter disabled (BACKEND_URL not set). Shipper not started.")
+            return
+
+        if self._client is None:
+            concurrency = settings.BACKEND_MAX_CONCURRENCY
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=settings.BACKEND_TIMEOUT,
+                transport=transport,
+                limits=httpx.Limits(
+                    max_connections=concurrency,
+                    max_keepalive_connections=concurrency,
+                ),
+            )
+
+        await self.shipper.start()
+        if self._recovery_task is None:
+            self._recovery_task = asyncio.create_task(self._recovery_loop())
+        logging.info(f"BackendAdapter: async shipper started for {self.base_url}")
+
+    async def close(self):
+        if self._recovery_task is not None:
+            self._recovery_task.cancel()
+            await asyncio.gather(self._recovery_task, return_exceptions=True)
+            self._recovery_task = None
+
+        await self.shipper.stop()
+
+        # Anything the workers could not deliver in time goes to the offline queue.
+        for payload in self.shipper.drain_pending():
+            self._enqueue(payload)
+
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_metrics(self) -> dict:
+        return {
+            **self.shipper.get_metrics(),
+            "bytes_sent": self.bytes_sent,
+            "batch_supported": self._batch_supported,
+            "offline": self.wal.get_metrics(),
+            "circuit": self.breaker.get_metrics(),
+        }
+
     def _enqueue(self, payload: dict):
         try:
-            with open(self.queue_path, "a") as f:
-                f.write(json.dumps(payload) + "\n")
+            self.wal.append(payload)
             logging.warning(f"BackendAdapter: queued event (offline): {payload}")
         except Exception as exc:
             logging.error(f"BackendAdapter: failed to enqueue offline event: {exc}")
 
-    def _flush_queue(self):
-        if not self.queue_path.exists():
+    def _migrate_legacy_queue(self):
+        """Move events from the old single-file queue into the WAL once."""
+        if not self.legacy_queue_path.exists():
             return
-
         try:
-            with open(self.queue_path, "r") as f:
-                lines = f.readlines()
+            with open(self.legacy_queue_path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        self.wal.append(json.loads(line))
+            self.legacy_queue_path.unlink()
+            logging.info("BackendAdapter: migrated legacy offline queue into WAL.")
         except Exception as exc:
-            logging.error(f"BackendAdapter: failed to read offline queue: {exc}")
-            return
+            logging.error(f"BackendAdapter: failed to migrate legacy offline queue: {exc}")
+
+    def _use_batch(self, count: int) -> bool:
+        return settings.BACKEND_BATCH_ENABLED and self._batch_supported is not False and count > 1
+
+    async def _post(self, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if "idempotency_key" in payload:
+            headers["Idempotency-Key"] = payload["idempotency_key"]
+
+        self.bytes_sent += len(body)
+        resp = await self._client.post(DEVICE_EVENTS_PATH, content=body, headers=headers)
+        resp.raise_for_status()
+
+    async def _post_batch(self, payloads: List[dict]) -> Optional[List[Optional[int]]]:
+        """POST a gzip-compressed batch; returns per-item statuses, or None when batches are unsupported."""
+        body = gzip.compress(json.dumps({"events": payloads}).encode("utf-8"))
+        headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+
+        self.bytes_sent += len(body)
+        resp = await self._client.post(DEVICE_EVENTS_BATCH_PATH, content=body, headers=headers)
+
+        if resp.status_code in (404, 405, 501):
+            self._batch_supported = False
+            logging.warning(
+                f"BackendAdapter: batch endpoint unavailable ({resp.status_code}), falling back to single posts."
+            )
+            return None
+        resp.raise_for_status()
+        self._batch_supported = True
 
-        remaining = []
-        for line in lines:
+        try:
+            body = resp.json()
+        except ValueError:
+            logging.error(f"BackendAdapter: unreadable batch response ({resp.status_code}), events left unconfirmed.")
+            return [None] * len(payloads)
+
+        results = {r.get("idempotency_key"): r for r in body.get("results", [])}
+        statuses: List[Optional[int]] = []
+        for payload in payloads:
+            result = results.get(payload.get("idempotency_key"))
+            if result is None:
+                statuses.append(None)
+            else:
+                statuses.append(int(result.get("status", 200 if result.get("ok") else 500)))
+        return statuses
+
+    async def _send(self, payloads: List[dict]) -> List[Optional[int]]:
+        """Send events through the circuit breaker.
+
+        While the breaker is open nothing touches the network and every event
+        comes back unconfirmed, so callers park it in the WAL at near-zero cost.
+        """
+        allowed, probe = self.breaker.allow_request()
+        if not allowed:
+            return [None] * len(payloads)
+
+        try:
+            statuses = await self._transmit(payloads)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            # No result to record; let the next send probe instead.
+            if probe:
+                self.breaker.release_probe()
+            raise
+
+        # Any non-5xx answer proves the backend is up, even if it rejected some items.
+        if any(status is not None and status < 500 for status in statuses):
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        return statuses
+
+    async def _transmit(self, payloads: List[dict]) -> List[Optional[int]]:
+        """Send events, batched when possible.
+
+        Returns one HTTP status per event; None means the event was not
+        confirmed (backend unreachable, batch failed with a server error, or
+        missing from the batch results).
+        """
+        if self._use_batch(len(payloads)):
             try:
-                payload = json.loads(line)
-                resp = httpx.post(f"{self.base_url}/device-events/", json=payload, timeout=5.0)
-                resp.raise_for_status()
-                logging.info(f"BackendAdapter: flushed queued event {payload}")
-            except Exception as exc:
-                remaining.append(line)
-                logging.warning(f"BackendAdapter: failed to flush queued event, will keep queued. Error: {exc}")
-
-        if remaining:
+                statuses = await self._post_batch(payloads)
+            except httpx.HTTPStatusError as exc:
+                status = exc.response.status_code
+                if not _is_permanent_rejection(status):
+                    return [None] * len(payloads)
+                # A rejected batch says nothing about its items (413, one bad
+                # event, ...): only per-item statuses are final, so send them
+                # one by one below.
+                logging.warning(f"BackendAdapter: batch rejected with {status}, sending {len(payloads)} events singly.")
+                statuses = None
+            except httpx.RequestError as exc:
+                logging.error(f"BackendAdapter: request error while sending batch: {exc}")
+                return [None] * len(payloads)
+            if statuses is not None:
+                return statuses
+
+        statuses = []
+        for idx, payload in enumerate(payloads):
             try:
-                with open(self.queue_path, "w") as f:
-                    f.writelines(remaining)
-            except Exception as exc:
-                logging.error(f"BackendAdapter: failed to rewrite offline queue: {exc}")
-        else:
+                await self._post(payload)
+                statuses.append(200)
+            except httpx.HTTPStatusError as exc:
+                logging.error(f"BackendAdapter: backend responded with error: {exc.response.status_code} {exc.response.text}")
+                statuses.append(exc.response.status_code)
+            except httpx.RequestError as exc:
+                logging.error(f"BackendAdapter: request error while sending device event: {exc}")
+                statuses.extend([None] * (len(payloads) - idx))
+                break
+        return statuses
+
+    def _settle(self, payloads: List[dict], statuses: List[Optional[int]]) -> Tuple[int, List[dict]]:
+        """Split send results into a delivered count and events that must be retried."""
+        delivered = 0
+        retry: List[dict] = []
+        for payload, status in zip(payloads, statuses):
+            if status is not None and 200 <= status < 300:
+                delivered += 1
+            elif status is not None and _is_permanent_rejection(status):
+                # Rejected permanently; retrying would block the queue forever.
+                logging.error(f"BackendAdapter: dropping event rejected with {status}: {payload}")
+            else:
+                retry.append(payload)
+        return delivered, retry
+
+    async def _deliver(self, payloads: List[dict]) -> int:
+        """Worker callback: send events, fall back to the offline queue for failures."""
+        if self._client is None:
+            for payload in payloads:
+                self._enqueue(payload)
+            return 0
+
+        delivered, retry = self._settle(payloads, await self._send(payloads))
+        for payload in retry:
+            self._enqueue(payload)
+
+        if delivered:
+            logging.info(f"BackendAdapter: sent {delivered}/{len(payloads)} device events")
+            # Backend is reachable again, replay anything queued while offline.
+            if self.wal.has_pending() and not self._flush_lock.locked():
+                try:
+                    await self._flush_queue()
+                except Exception:
+                    logging.exception("BackendAdapter: offline queue flush failed")
+
+        return delivered
+
+    async def _recovery_loop(self):
+        """Drain the WAL once the breaker allows a probe, even if no new events arrive."""
+        while True:
+            await asyncio.sleep(self.breaker.seconds_until_retry() or settings.BACKEND_RETRY_INTERVAL)
+            if not self.wal.has_pending() or self._flush_lock.locked():
+                continue
             try:
-                self.queue_path.unlink(missing_ok=True)
+                await self._flush_queue()
             except Exception:
-                pass
+                logging.exception("BackendAdapter: offline queue flush failed")
+
+    async def _flush_queue(self):
+        """Replay the WAL from its cursor; cost is proportional to events actually sent."""
+        async with self._flush_lock:
+            while self.wal.has_pending():
+                batch = self.wal.read(settings.BACKEND_FLUSH_BATCH)
+                if not batch:
+                    return
+
+                payloads = [payload for payload, _ in batch]
+                delivered, retry = self._settle(payloads, await self._send(payloads))
+
+                if len(retry) == len(payloads):
+                    logging.warning(
+                        f"BackendAdapter: flush made no progress (circuit {self.breaker.state.value}), "
+                        f"keeping {len(payloads)} queued."
+                    )
+                    return
+
+                # Only the failed items go back to the tail; the rest of the batch is acknowledged.
+                for payload in retry:
+                    self.wal.append(payload)
+                self.wal.ack(batch[-1][1])
+                logging.info(f"BackendAdapter: flushed {delivered} queued events ({len(retry)} requeued)")
 
     def log_device_event(self, device_id: int, pin_state: bool, trigger_reason: str, power_kw: Optional[float] = None):
-        """Send device state change to backend; non-blocking for agent stability."""
+        """Queue device state change for the backend; returns immediately, never does I/O on the loop."""
         if not self.is_enabled():
             logging.debug("BackendAdapter disabled (BACKEND_URL not set). Skipping device event.")
             return
 
-        url = f"{self.base_url}/device-events/"
         payload = {
+            "idempotency_key": uuid.uuid4().hex,
             "device_id": device_id,
             "pin_state": pin_state,
             "trigger_reason": trigger_reason,
@@ -83,16 +331,12 @@ class BackendAdapter:
         if power_kw is not None:
             payload["power_kw"] = power_kw
 
-        try:
-            self._flush_queue()
-            resp = httpx.post(url, json=payload, timeout=5.0)
-            resp.raise_for_status()
-            logging.info(f"BackendAdapter: sent device event {payload}")
-        except httpx.HTTPStatusError as exc:
-            logging.error(f"BackendAdapter: backend responded with error: {exc.response.status_code} {exc.response.text}")
-            self._enqueue(payload)
-        except httpx.RequestError as exc:
-            logging.error(f"BackendAdapter: request error while sending device event: {exc}")
+        # The shipper queue is an asyncio.Queue; handlers may run in a worker thread.
+        call_on_loop(self._submit, payload)
+
+    def _submit(self, payload: dict):
+        if not self.shipper.submit(payload):
+            logging.warning("BackendAdapter: shipper queue full, spilling event to offline queue.")
             self._enqueue(payload)
 
 
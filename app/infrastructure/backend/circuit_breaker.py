@@ -0,0 +1,126 @@
+# app/infrastructure/backend/circuit_breaker.py
+import logging
+import random
+import time
+from enum import Enum
+from typing import Optional, Tuple
+
+logging = logging.getLogger(__name__)
+
+
+class CircuitState(str, Enum):
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker with jittered exponential backoff.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    rejects requests until the backoff delay expires. It then lets exactly
+    one probe through (half-open); success closes it, failure reopens it
+    with a doubled delay capped at `max_delay`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        base_delay: float = 5.0,
+        max_delay: float = 300.0,
+        jitter: float = 0.5,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self._reopen_count = 0
+        self._opened_at: Optional[float] = None
+        self._retry_at = 0.0
+        self._probe_in_flight = False
+
+        self.transitions = 0
+        self.rejected = 0
+        self.total_open_seconds = 0.0
+
+    def _backoff_delay(self) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** self._reopen_count))
+        return delay * random.uniform(1.0 - self.jitter, 1.0)
+
+    def _transition(self, state: CircuitState) -> None:
+        if state == self.state:
+            return
+
+        now = time.monotonic()
+        if self.state != CircuitState.CLOSED and state == CircuitState.CLOSED and self._opened_at is not None:
+            self.total_open_seconds += now - self._opened_at
+            self._opened_at = None
+        elif self.state == CircuitState.CLOSED:
+            self._opened_at = now
+
+        logging.warning(f"CircuitBreaker[{self.name}]: {self.state.value} → {state.value}")
+        self.state = state
+        self.transitions += 1
+
+    def allow_request(self) -> Tuple[bool, bool]:
+        """(allowed, is_probe); only the probe's caller may release_probe()."""
+        if self.state == CircuitState.CLOSED:
+            return True, False
+
+        if self.state == CircuitState.OPEN and time.monotonic() >= self._retry_at:
+            self._transition(CircuitState.HALF_OPEN)
+
+        if self.state == CircuitState.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True, True
+
+        self.rejected += 1
+        return False, False
+
+    def release_probe(self) -> None:
+        """Let another probe through when the probe ended without a result (e.g. cancelled)."""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self._reopen_count = 0
+        self._transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.consecutive_failures += 1
+
+        if self.state == CircuitState.HALF_OPEN:
+            self._reopen_count += 1
+        elif self.state == CircuitState.CLOSED and self.consecutive_failures < self.failure_threshold:
+            return
+        elif self.state == CircuitState.OPEN:
+            return
+
+        delay = self._backoff_delay()
+        self._retry_at = time.monotonic() + delay
+        self._transition(CircuitState.OPEN)
+        logging.warning(f"CircuitBreaker[{self.name}]: next probe in {delay:.1f}s")
+
+    def seconds_until_retry(self) -> float:
+        if self.state != CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self._retry_at - time.monotonic())
+
+    def get_metrics(self) -> dict:
+        open_for = time.monotonic() - self._opened_at if self._opened_at is not None else 0.0
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.consecutive_failures,
+            "transitions": self.transitions,
+            "rejected": self.rejected,
+            "open_seconds": round(open_for, 1),
+            "total_open_seconds": round(self.total_open_seconds + open_for, 1),
+            "next_probe_in": round(self.seconds_until_retry(), 1),
+        }
@@ -0,0 +1,158 @@
+# app/infrastructure/backend/event_shipper.py
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional
+
+logging = logging.getLogger(__name__)
+
+
+class EventShipper:
+    """Bounded in-memory queue drained by a fixed pool of async workers.
+
+    `submit` never blocks: it either places the payload on the queue in O(1)
+    or returns False so the caller can persist it elsewhere.
+
+    Workers hand `deliver` a list of up to `max_batch_size` payloads, waiting
+    at most `max_batch_delay` seconds for a batch to fill; `deliver` returns
+    how many of them were delivered.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[List[dict]], Awaitable[int]],
+        max_queue_size: int = 1000,
+        concurrency: int = 4,
+        max_batch_size: int = 1,
+        max_batch_delay: float = 0.0,
+    ):
+        self._deliver = deliver
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._concurrency = max(1, concurrency)
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_batch_delay = max(0.0, max_batch_delay)
+        self._workers: List[asyncio.Task] = []
+
+        self.submitted = 0
+        self.rejected = 0
+        self.sent = 0
+        self.failed = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.last_latency_ms: Optional[float] = None
+        self.max_latency_ms = 0.0
+        self._latency_total_ms = 0.0
+
+    def is_running(self) -> bool:
+        return any(not w.done() for w in self._workers)
+
+    def submit(self, payload: dict) -> bool:
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+        self.submitted += 1
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return True
+
+    async def start(self) -> None:
+        if self.is_running():
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"backend-shipper-{i}")
+            for i in range(self._concurrency)
+        ]
+        logging.info(f"EventShipper: started {self._concurrency} workers")
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"EventShipper: stopping with {self._queue.qsize()} events still queued")
+
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def drain_pending(self) -> List[dict]:
+        """Remove and return everything still waiting in the queue."""
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                return pending
+            self._queue.task_done()
+
+    async def _next_batch(self) -> List[dict]:
+        batch = [await self._queue.get()]
+        if self._max_batch_size == 1:
+            return batch
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._max_batch_delay
+        while len(batch) < self._max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self, idx: int) -> None:
+        while True:
+            batch = await self._next_batch()
+            self.in_flight += len(batch)
+            started = time.perf_counter()
+            try:
+                delivered = await self._deliver(batch)
+            except Exception:
+                logging.exception(f"EventShipper[{idx}]: unexpected delivery error")
+                delivered = 0
+            finally:
+                self.in_flight -= len(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+            self.requests += 1
+            self._record_latency((time.perf_counter() - started) * 1000.0)
+            self.sent += delivered
+            self.failed += len(batch) - delivered
+
+    def _record_latency(self, latency_ms: float) -> None:
+        self.last_latency_ms = latency_ms
+        self._latency_total_ms += latency_ms
+        if latency_ms > self.max_latency_ms:
+            self.max_latency_ms = latency_ms
+
+    def get_metrics(self) -> dict:
+        completed = self.requests
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self.in_flight,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "sent": self.sent,
+            "failed": self.failed,
+            "requests": self.requests,
+            "last_latency_ms": round(self.last_latency_ms, 2) if self.last_latency_ms is not None else None,
+            "avg_latency_ms": round(self._latency_total_ms / completed, 2) if completed else None,
+            "max_latency_ms": round(self.max_latency_ms, 2),
+        }
@@ -0,0 +1,207 @@
+# app/infrastructure/backend/offline_wal.py
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+logging = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+CURSOR_FILE = "cursor.json"
+
+# (segment sequence number, byte offset inside that segment)
+Position = Tuple[int, int]
+
+
+class SegmentedWAL:
+    """Append-only, segmented on-disk queue of JSON events.
+
+    Events are appended to the newest ("head") segment; once it reaches
+    `segment_bytes` a new segment is started. A persisted read cursor marks
+    how far the backend has acknowledged, so reading resumes exactly where
+    it stopped and fully acknowledged segments are deleted as a whole.
+    When the directory exceeds `max_bytes` the oldest segments are evicted.
+    """
+
+    def __init__(self, directory: Path, segment_bytes: int, max_bytes: int):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._sizes: Dict[int, int] = {}
+        for path in self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"):
+            try:
+                seq = int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            self._sizes[seq] = path.stat().st_size
+
+        self._cursor: Position = self._load_cursor()
+        self.evicted_events = 0
+        self.evicted_segments = 0
+
+        if not self._sizes:
+            self._head_seq = self._cursor[0]
+            self._sizes[self._head_seq] = 0
+        else:
+            self._head_seq = max(self._sizes)
+            if not self._ends_with_newline(self._head_seq):
+                # Torn write from a crash: never append after a partial line.
+                self._roll()
+
+        if self._cursor[0] not in self._sizes:
+            self._cursor = (min(self._sizes), 0)
+
+    # ---------------------------------------------------------------
+    # Paths / cursor
+    # ---------------------------------------------------------------
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"{SEGMENT_PREFIX}{seq:010d}{SEGMENT_SUFFIX}"
+
+    def _load_cursor(self) -> Position:
+        path = self.directory / CURSOR_FILE
+        if not path.exists():
+            return (min(self._sizes) if self._sizes else 0, 0)
+        try:
+            data = json.loads(path.read_text())
+            return int(data["segment"]), int(data["offset"])
+        except Exception as exc:
+            logging.error(f"SegmentedWAL: corrupt cursor file, restarting from oldest segment: {exc}")
+            return (min(self._sizes) if self._sizes else 0, 0)
+
+    def _store_cursor(self) -> None:
+        path = self.directory / CURSOR_FILE
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"segment": self._cursor[0], "offset": self._cursor[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _ends_with_newline(self, seq: int) -> bool:
+        size = self._sizes.get(seq, 0)
+        if size == 0:
+            return True
+        with open(self._segment_path(seq), "rb") as f:
+            f.seek(size - 1)
+            return f.read(1) == b"\n"
+
+    def _roll(self) -> None:
+        self._head_seq += 1
+        self._sizes[self._head_seq] = 0
+
+    # ---------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------
+    def total_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def has_pending(self) -> bool:
+        seq, offset = self._cursor
+        return seq < self._head_seq or offset < self._sizes.get(self._head_seq, 0)
+
+    def append(self, payload: dict) -> None:
+        line = (json.dumps(payload) + "\n").encode("utf-8")
+
+        if self._sizes[self._head_seq] and self._sizes[self._head_seq] + len(line) > self.segment_bytes:
+            self._roll()
+
+        with open(self._segment_path(self._head_seq), "ab") as f:
+            f.write(line)
+        self._sizes[self._head_seq] += len(line)
+
+        self._enforce_cap()
+
+    def read(self, limit: int) -> List[Tuple[dict, Position]]:
+        """Return up to `limit` events after the cursor with the position following each one."""
+        items: List[Tuple[dict, Position]] = []
+        seq, offset = self._cursor
+
+        while len(items) < limit and seq <= self._head_seq:
+            size = self._sizes.get(seq)
+            if size is None or offset >= size:
+                if seq == self._head_seq:
+                    break
+                seq, offset = self._next_segment(seq), 0
+                continue
+
+            with open(self._segment_path(seq), "rb") as f:
+                f.seek(offset)
+                while len(items) < limit:
+                    line = f.readline()
+                    if not line or not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    try:
+                        items.append((json.loads(line), (seq, offset)))
+                    except json.JSONDecodeError:
+                        logging.error(f"SegmentedWAL: skipping corrupt record in segment {seq}")
+
+            if offset < size and len(items) < limit:
+                # Partial tail line in a sealed segment: nothing more readable there.
+                offset = size
+
+        return items
+
+    def ack(self, position: Position) -> None:
+        """Advance the cursor to `position` and delete every segment fully behind it."""
+        seq, offset = position
+        if seq != self._head_seq and offset >= self._sizes.get(seq, 0):
+            seq, offset = self._next_segment(seq), 0
+
+        self._cursor = (seq, offset)
+        for old in [s for s in self._sizes if s < seq]:
+            self._delete_segment(old)
+        self._store_cursor()
+
+    def get_metrics(self) -> dict:
+        return {
+            "segments": len(self._sizes),
+            "bytes": self.total_bytes(),
+            "evicted_segments": self.evicted_segments,
+            "evicted_events": self.evicted_events,
+        }
+
+    # ---------------------------------------------------------------
+    # Internals
+    # ---------------------------------------------------------------
+    def _next_segment(self, seq: int) -> int:
+        later = [s for s in self._sizes if s > seq]
+        return min(later) if later else self._head_seq
+
+    def _delete_segment(self, seq: int) -> None:
+        self._sizes.pop(seq, None)
+        try:
+            self._segment_path(seq).unlink(missing_ok=True)
+        except Exception as exc:
+            logging.error(f"SegmentedWAL: failed to delete segment {seq}: {exc}")
+
+    def _count_records(self, seq: int, from_offset: int) -> int:
+        try:
+            with open(self._segment_path(seq), "rb") as f:
+                f.seek(from_offset)
+                return sum(1 for _ in f)
+        except Exception:
+            return 0
+
+    def _enforce_cap(self) -> None:
+        while self.total_bytes() > self.max_bytes and len(self._sizes) > 1:
+            oldest = min(self._sizes)
+            if oldest == self._head_seq:
+                break
+
+            unread_from = self._cursor[1] if self._cursor[0] == oldest else 0
+            if self._cursor[0] <= oldest:
+                self.evicted_events += self._count_records(oldest, unread_from)
+                self._cursor = (self._next_segment(oldest), 0)
+
+            self._delete_segment(oldest)
+            self.evicted_segments += 1
+            self._store_cursor()
+            logging.warning(
+                f"SegmentedWAL: disk cap {self.max_bytes}B exceeded, evicted oldest segment {oldest}"
+            )
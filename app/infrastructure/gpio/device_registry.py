@@ -0,0 +1,201 @@
+# app/infrastructure/gpio/device_registry.py
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from app.domain.device.enums import DeviceMode
+from app.domain.gpio.entities import GPIODevice
+from app.infrastructure.gpio.gpio_config_storage import gpio_config_storage
+from app.infrastructure.gpio.gpio_controller import gpio_controller
+from app.infrastructure.gpio.gpio_manager import gpio_manager
+from app.infrastructure.gpio.gpio_pin_mapping import pin_mapping
+
+logging = logging.getLogger(__name__)
+
+# Default for optional update fields that were not sent: keep the current value.
+UNSET: Any = object()
+
+
+class DeviceRegistry:
+    """Single source of truth for configured devices.
+
+    Keeps indexes by device_id, pin and mode, and applies create / update /
+    delete as O(1) deltas that are pushed to storage, controller and manager
+    individually instead of reloading and rebuilding everything.
+
+    Deltas arrive from event handler threads: index changes and queries
+    hold `_lock`; storage, controller and manager guard themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_id: Dict[int, GPIODevice] = {}
+        self._by_pin: Dict[int, int] = {}
+        self._by_number: Dict[int, int] = {}
+        self._by_mode: Dict[DeviceMode, Set[int]] = {mode: set() for mode in DeviceMode}
+        # Bumped on every delta so consumers can cache derived structures.
+        self.version = 0
+
+    def _reset(self) -> None:
+        self._by_id.clear()
+        self._by_pin.clear()
+        self._by_number.clear()
+        for ids in self._by_mode.values():
+            ids.clear()
+
+    # ---------------------------------------------------------------
+    # Index maintenance
+    # ---------------------------------------------------------------
+    def _index(self, device: GPIODevice) -> None:
+        self._by_id[device.device_id] = device
+        self._by_pin[device.pin_number] = device.device_id
+        self._by_number[device.device_number] = device.device_id
+        self._by_mode[DeviceMode(device.mode)].add(device.device_id)
+
+    def _unindex(self, device: GPIODevice) -> None:
+        self._by_id.pop(device.device_id, None)
+        self._by_pin.pop(device.pin_number, None)
+        self._by_number.pop(device.device_number, None)
+        self._by_mode[DeviceMode(device.mode)].discard(device.device_id)
+
+    # ---------------------------------------------------------------
+    # Queries
+    # ---------------------------------------------------------------
+    def get(self, device_id: int) -> Optional[GPIODevice]:
+        return self._by_id.get(device_id)
+
+    def get_by_pin(self, pin: int) -> Optional[GPIODevice]:
+        device_id = self._by_pin.get(pin)
+        return self._by_id.get(device_id) if device_id is not None else None
+
+    def by_mode(self, mode: DeviceMode) -> List[GPIODevice]:
+        with self._lock:
+            return [self._by_id[device_id] for device_id in self._by_mode[mode]]
+
+    def all(self) -> List[GPIODevice]:
+        with self._lock:
+            return list(self._by_id.values())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    # ---------------------------------------------------------------
+    # Full load (startup only)
+    # ---------------------------------------------------------------
+    def load(self, devices: List[GPIODevice]) -> None:
+        with self._lock:
+            self._reset()
+            for device in devices:
+                self._index(device)
+
+        gpio_controller.load_from_entities(devices)
+        gpio_controller.initialize_pins()
+        gpio_manager.load_devices(devices)
+        self.version += 1
+        logging.info(f"DeviceRegistry: loaded {len(devices)} devices")
+
+    # ---------------------------------------------------------------
+    # Deltas
+    # ---------------------------------------------------------------
+    def create(
+        self,
+        device_id: int,
+        device_number: int,
+        mode: DeviceMode,
+        power_threshold_kw: Optional[float],
+        power_off_threshold_kw: Optional[float] = None,
+        min_on_seconds: Optional[float] = None,
+        min_off_seconds: Optional[float] = None,
+        priority: int = 0,
+        rated_load_kw: Optional[float] = None,
+    ) -> GPIODevice:
+        """Validate against the pin mapping and current devices, then add the device.
+
+        Raises ValueError when the device_id, device_number or resolved pin is
+        already taken, or the device_number has no mapped pin.
+        """
+        pin_number, active_low = pin_mapping.get_pin_config(device_number)
+        device = GPIODevice(
+            device_id=device_id,
+            device_number=device_number,
+            pin_number=pin_number,
+            mode=DeviceMode(mode),
+            power_threshold_kw=power_threshold_kw,
+            active_low=active_low,
+            power_off_threshold_kw=power_off_threshold_kw,
+            min_on_seconds=min_on_seconds,
+            min_off_seconds=min_off_seconds,
+            priority=priority,
+            rated_load_kw=rated_load_kw,
+        )
+
+        with self._lock:
+            if device_id in self._by_id:
+                raise ValueError(f"device_id {device_id} is already registered")
+            if device_number in self._by_number:
+                raise ValueError(
+                    f"device_number {device_number} is already used by device_id {self._by_number[device_number]}"
+                )
+            if pin_number in self._by_pin:
+                raise ValueError(f"pin {pin_number} is already used by device_id {self._by_pin[pin_number]}")
+
+            self._index(device)
+            self.version += 1
+
+        gpio_config_storage.update_device(device)
+        gpio_controller.add_device(device)
+        gpio_manager.add_device(device)
+        return device
+
+    def update(
+        self,
+        device_id: int,
+        mode: DeviceMode,
+        power_threshold_kw: Optional[float],
+        power_off_threshold_kw: Optional[float] = UNSET,
+        min_on_seconds: Optional[float] = UNSET,
+        min_off_seconds: Optional[float] = UNSET,
+        priority: Optional[int] = UNSET,
+        rated_load_kw: Optional[float] = UNSET,
+    ) -> Optional[GPIODevice]:
+        """Apply an update; UNSET fields keep their value, None resets them to the default."""
+        with self._lock:
+            device = self._by_id.get(device_id)
+            if device is None:
+                return None
+
+            self._by_mode[DeviceMode(device.mode)].discard(device_id)
+            device.mode = DeviceMode(mode)
+            device.power_threshold_kw = power_threshold_kw
+            if power_off_threshold_kw is not UNSET:
+                device.power_off_threshold_kw = power_off_threshold_kw
+            if min_on_seconds is not UNSET:
+                device.min_on_seconds = min_on_seconds
+            if min_off_seconds is not UNSET:
+                device.min_off_seconds = min_off_seconds
+            if priority is not UNSET:
+                device.priority = priority if priority is not None else 0
+            if rated_load_kw is not UNSET:
+                device.rated_load_kw = rated_load_kw
+            self._by_mode[device.mode].add(device_id)
+            self.version += 1
+
+        gpio_config_storage.update_device(device)
+        gpio_manager.update_device(device)
+        return device
+
+    def remove(self, device_id: int) -> Optional[GPIODevice]:
+        with self._lock:
+            device = self._by_id.get(device_id)
+            if device is None:
+                return None
+
+            self._unindex(device)
+            self.version += 1
+        gpio_config_storage.remove_device(device_id)
+        gpio_controller.remove_device(device_id)
+        gpio_manager.remove_device(device_id)
+        return device
+
+
+device_registry = DeviceRegistry()
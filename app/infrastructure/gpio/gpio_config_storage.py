@@ -1,85 +1,222 @@
 # app/infrastructure/gpio/gpio_config_storage.py
+import asyncio
+import copy
 import json
+import logging
+import os
+import tempfile
+import threading
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from app.core.config import settings
+from app.core.event_loop import call_on_loop
 from app.domain.gpio.entities import GPIODevice
+from app.infrastructure.storage.state_journal import state_journal
+
+logging = logging.getLogger(__name__)
 
 DEFAULT_CONFIG = {"raspberry_uuid": None, "device_max": 1, "pins": []}
 
 
 class GPIOConfigStorage:
-    CONFIG_PATH = Path(settings.CONFIG_FILE)
+    """config.json backed by an authoritative in-memory copy.
+
+    Reads are served from memory and the file is only re-parsed when its
+    mtime/inode/size changes on disk. Mutations mark the cache dirty and are
+    persisted atomically (temp file + fsync + rename) after `debounce`
+    seconds, so bursts of changes collapse into a single write.
+
+    Runtime relay state (`is_on`) is not part of the config file: it lives
+    in the relay state journal and is overlaid onto devices on load.
+
+    Used from event handler threads too: the cache is guarded by `_lock`
+    (not held during the file write) and the debounce timer lives on the
+    event loop.
+    """
+
+    def __init__(self, path: Optional[Path] = None, debounce: Optional[float] = None):
+        self.CONFIG_PATH = Path(path or settings.CONFIG_FILE)
+        self.debounce = settings.CONFIG_WRITE_DEBOUNCE if debounce is None else debounce
+
+        self._raw: Optional[Dict] = None
+        self._devices: Dict[int, GPIODevice] = {}
+        self._file_sig: Optional[Tuple[int, int, int]] = None
+        self._dirty = False
+        self._generation = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._lock = threading.RLock()
+        # Keeps snapshots from being written out of order.
+        self._write_lock = threading.Lock()
+
+        self.disk_reads = 0
+        self.disk_writes = 0
+
+    # ---------------------------------------------------------------
+    # Cache management
+    # ---------------------------------------------------------------
+    def _stat_signature(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.CONFIG_PATH.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_ino, st.st_size
 
-    def load_raw(self) -> Dict:
+    def _read_file(self) -> Dict:
+        merged = copy.deepcopy(DEFAULT_CONFIG)
         if not self.CONFIG_PATH.exists():
-            return DEFAULT_CONFIG.copy()
+            return merged
 
         try:
             with open(self.CONFIG_PATH, "r") as f:
                 data = json.load(f)
         except json.JSONDecodeError:
-            return DEFAULT_CONFIG.copy()
+            return merged
 
-        merged = DEFAULT_CONFIG.copy()
+        self.disk_reads += 1
         merged.update(data)
         return merged
 
-    def load(self) -> List[GPIODevice]:
-        data = self.load_raw()
+    @staticmethod
+    def _parse_devices(data: Dict) -> Dict[int, GPIODevice]:
         global_active_low = data.get("active_low")  # backward compatibility
 
-        devices: List[GPIODevice] = []
+        devices: Dict[int, GPIODevice] = {}
         for pin_data in data.get("pins", []):
             parsed = pin_data.copy()
             if "active_low" not in parsed and global_active_low is not None:
                 parsed["active_low"] = bool(global_active_low)
 
-            devices.append(GPIODevice(**parsed))
+            device = GPIODevice(**parsed)
+            journaled = state_journal.get_state(device.device_id)
+            if journaled is not None:
+                device.is_on = journaled
+            devices[device.device_id] = device
 
         return devices
 
-    def get_inverter_serial(self) -> str | None:
-        data = self.load_raw()
-        return data.get("inverter_serial")
-    
-    def save(self, devices: List[GPIODevice]):
-
-        raw = self.load_raw()
-        raw["pins"] = [device.model_dump() for device in devices]
-
-        with open(self.CONFIG_PATH, "w") as f:
-            json.dump(raw, f, indent=2)
-
-    def update_device(self, gpio_device: GPIODevice):
+    def _ensure_loaded(self):
+        sig = self._stat_signature()
+        if self._raw is not None and sig == self._file_sig:
+            return
+
+        if self._raw is not None and self._dirty:
+            logging.warning("GPIOConfigStorage: config file changed on disk while local changes are pending; keeping local state.")
+            return
+
+        self._raw = self._read_file()
+        self._devices = self._parse_devices(self._raw)
+        self._file_sig = sig
+
+    def _mark_dirty(self):
+        # Called without `_lock` held: flush takes `_write_lock` first.
+        with self._lock:
+            self._dirty = True
+            self._generation += 1
+
+        if self.debounce <= 0:
+            self.flush()
+            return
+        call_on_loop(self._schedule_flush)
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(self.debounce, self.flush)
+
+    def flush(self):
+        """Persist pending changes now (atomic replace)."""
+        with self._write_lock:
+            with self._lock:
+                if self._flush_handle is not None:
+                    self._flush_handle.cancel()
+                    self._flush_handle = None
+
+                if not self._dirty or self._raw is None:
+                    return
+
+                raw = dict(self._raw)
+                raw["pins"] = [device.model_dump(exclude={"is_on"}) for device in self._devices.values()]
+                generation = self._generation
+
+            directory = self.CONFIG_PATH.parent
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{self.CONFIG_PATH.name}.", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w") as f:
+                        json.dump(raw, f, indent=2)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, self.CONFIG_PATH)
+                except Exception:
+                    Path(tmp_path).unlink(missing_ok=True)
+                    raise
+            except Exception:
+                logging.exception(f"GPIOConfigStorage: failed to persist {self.CONFIG_PATH}")
+                return
+
+            with self._lock:
+                self._raw = raw
+                self._file_sig = self._stat_signature()
+                # Changes made during the write stay dirty; they scheduled another flush.
+                if self._generation == generation:
+                    self._dirty = False
+                self.disk_writes += 1
+
+    # ---------------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------------
+    def load_raw(self) -> Dict:
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._raw)
 
-        devices = self.load()
-        updated = False
+    def load(self) -> List[GPIODevice]:
+        with self._lock:
+            self._ensure_loaded()
+            return [device.model_copy() for device in self._devices.values()]
 
-        for idx, d in enumerate(devices):
-            if d.device_id == gpio_device.device_id:
-                devices[idx] = gpio_device
-                updated = True
-                break
+    def get_inverter_serial(self) -> str | None:
+        with self._lock:
+            self._ensure_loaded()
+            return self._raw.get("inverter_serial")
 
-        if not updated:
-            devices.append(gpio_device)
+    def save(self, devices: List[GPIODevice]):
+        with self._lock:
+            self._ensure_loaded()
+            self._devices = {device.device_id: device.model_copy() for device in devices}
+        self._mark_dirty()
 
-        self.save(devices)
+    def update_device(self, gpio_device: GPIODevice):
+        with self._lock:
+            self._ensure_loaded()
+            self._devices[gpio_device.device_id] = gpio_device.model_copy()
+        self._mark_dirty()
 
     def remove_device(self, device_id: int):
-        devices = [d for d in self.load() if d.device_id != device_id]
-        self.save(devices)
-
-    def update_state(self, device_id: int, is_on: bool):
-        devices = self.load()
-
-        for d in devices:
-            if d.device_id == device_id:
-                d.is_on = is_on
-
-        self.save(devices)
+        with self._lock:
+            self._ensure_loaded()
+            if self._devices.pop(device_id, None) is None:
+                return
+            state_journal.forget(device_id)
+        self._mark_dirty()
+
+    def update_state(self, device_id: int, is_on: bool, reason: str = "UNKNOWN"):
+        """Record a relay transition in the state journal; config.json is not rewritten."""
+        with self._lock:
+            self._ensure_loaded()
+
+            device = self._devices.get(device_id)
+            if device is None or device.is_on == is_on:
+                return
+
+            device.is_on = is_on
+            state_journal.append(device_id, is_on, reason)
 
 
 gpio_config_storage = GPIOConfigStorage()
@@ -1,63 +1,174 @@
 # app/infrastructure/gpio/gpio_controller.py
+import functools
 import logging
+import threading
+import time
+from typing import Dict, Iterable
 
+from app.core.config import settings
 from app.domain.gpio.entities import GPIODevice
-from app.infrastructure.gpio.hardware import GPIO
+from app.infrastructure.gpio.hardware import GPIO, GPIOBackend, create_backend
+from app.infrastructure.gpio.i2c_expander import ExpanderGPIOBackend, RoutedGPIOBackend
 
 logging = logging.getLogger(__name__)
 
 
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class GPIOController:
+    """Pin mapping, shadow registers and hardware access.
+
+    Called from the event loop and from event handler threads; every
+    public method holds `_lock`, so backend calls (and the read-modify-write
+    of expander latches) never interleave.
+    """
 
-    def __init__(self):
+    def __init__(self, backend: GPIOBackend | None = None):
+        self._lock = threading.RLock()
+        self.backend = backend or RoutedGPIOBackend(create_backend(), ExpanderGPIOBackend())
         self.pin_map: dict[str, int] = {}
         self.active_low_map: dict[str, bool] = {}
 
-        try:
-            GPIO.setwarnings(False)
-            GPIO.setmode(GPIO.BCM)
-        except Exception as e:
-            logging.error(f"GPIO init problem: {e}")
+        # Shadow register: last value written to (or observed on) each output pin.
+        self.shadow: Dict[int, int] = {}
+        # Last batched hardware read for pins without a shadow value.
+        self._snapshot: Dict[int, int] = {}
+        self.snapshot_at = 0.0
+        self.hardware_reads = 0
 
+        logging.info(f"GPIOController: using '{self.backend.name}' GPIO backend")
+
+    @_locked
     def initialize_pins(self):
-        for device_id, pin in self.pin_map.items():
-            GPIO.setup(pin, GPIO.OUT)
-            active_low = self.active_low_map.get(device_id, True)
-            try:
-                # Default every pin to OFF on startup for safety.
-                GPIO.output(pin, GPIO.HIGH if active_low else GPIO.LOW)
-                logging.info(f"GPIOController: init device {device_id} (pin {pin}) to OFF (active_low={active_low})")
-            except Exception as e:
-                logging.error(f"GPIOController: Error forcing OFF pin {pin}: {e}")
+        # Default every pin to OFF on startup for safety, configured together
+        # so backends can group them (one libgpiod line request).
+        values = {
+            pin: GPIO.HIGH if self.active_low_map.get(device_id, True) else GPIO.LOW
+            for device_id, pin in self.pin_map.items()
+        }
+        try:
+            self.backend.setup_outputs(values)
+        except Exception as e:
+            logging.error(f"GPIOController: bulk init of pins {sorted(values)} failed ({e}); initializing one by one")
+            for device_id in self.pin_map:
+                self.initialize_pin(device_id)
+            return
+
+        self.shadow.update(values)
+        logging.info(f"GPIOController: init {len(values)} pins to OFF")
+
+    @_locked
+    def initialize_pin(self, device_id: str):
+        pin = self.pin_map[device_id]
+        active_low = self.active_low_map.get(device_id, True)
+        try:
+            # Default every pin to OFF on startup for safety.
+            value = GPIO.HIGH if active_low else GPIO.LOW
+            self.backend.setup_output(pin, value)
+            self.shadow[pin] = value
+            logging.info(f"GPIOController: init device {device_id} (pin {pin}) to OFF (active_low={active_low})")
+        except Exception as e:
+            logging.error(f"GPIOController: Error forcing OFF pin {pin}: {e}")
 
+    @_locked
     def load_from_entities(self, devices: list[GPIODevice]):
         self.pin_map = {str(device.device_id): device.pin_number for device in devices}
         self.active_low_map = {str(device.device_id): bool(device.active_low) for device in devices}
         logging.info(f"GPIOController: loaded pin mapping {self.pin_map} with active_low {self.active_low_map}")
 
+    @_locked
+    def add_device(self, device: GPIODevice):
+        device_id = str(device.device_id)
+        self.pin_map[device_id] = device.pin_number
+        self.active_low_map[device_id] = bool(device.active_low)
+        self.initialize_pin(device_id)
+
+    @_locked
+    def remove_device(self, device_id: int):
+        pin = self.pin_map.pop(str(device_id), None)
+        self.active_low_map.pop(str(device_id), None)
+        if pin is not None:
+            self.shadow.pop(pin, None)
+            self._snapshot.pop(pin, None)
+            self.backend.release(pin)
+
+    @_locked
     def read_pin(self, pin: int) -> int:
+        """Read the pin from hardware, bypassing the shadow register."""
+        self.hardware_reads += 1
         try:
-            return GPIO.input(pin)
+            return self.backend.read(pin)
         except Exception as e:
             logging.exception(f"GPIO read error on pin {pin}")
             return GPIO.HIGH
 
+    @_locked
+    def observe_pin(self, pin: int, value: int):
+        """Record a value seen on hardware (e.g. an external change) in the shadow register."""
+        if pin in self.shadow:
+            self.shadow[pin] = value
+
+    @_locked
+    def snapshot(self, pins: Iterable[int]) -> Dict[int, int]:
+        """Current value of every pin, shared by all consumers.
+
+        Output pins are served from the shadow register. Any other pins are
+        read from hardware in one pass and reused for GPIO_SNAPSHOT_TTL seconds.
+        """
+        pins = list(pins)
+        unknown = [pin for pin in pins if pin not in self.shadow]
+
+        if unknown:
+            now = time.monotonic()
+            stale = now - self.snapshot_at > settings.GPIO_SNAPSHOT_TTL
+            if stale or any(pin not in self._snapshot for pin in unknown):
+                self._snapshot = self.read_pins(unknown)
+                self.snapshot_at = now
+
+        return {pin: self.shadow[pin] if pin in self.shadow else self._snapshot[pin] for pin in pins}
+
+    @_locked
+    def read_pins(self, pins: list[int]) -> Dict[int, int]:
+        """Read several pins in as few hardware operations as the backend allows."""
+        self.hardware_reads += 1
+        try:
+            return self.backend.read_many(pins)
+        except Exception:
+            logging.exception(f"GPIO bulk read error on pins {pins}")
+            return {pin: self.read_pin(pin) for pin in pins}
+
+    def get_pin_value(self, pin: int) -> int:
+        return self.snapshot((pin,))[pin]
+
+    @staticmethod
+    def _level(is_on: bool, active_low: bool) -> int:
+        if active_low:
+            return GPIO.LOW if is_on else GPIO.HIGH
+        return GPIO.HIGH if is_on else GPIO.LOW
+
+    @_locked
     def direct_pin_control(self, gpio_pin: int, is_on: bool, active_low: bool) -> bool:
         try:
-            GPIO.setup(gpio_pin, GPIO.OUT)
+            value = self._level(is_on, active_low)
 
-            if active_low:
-                value = GPIO.LOW if is_on else GPIO.HIGH
+            if gpio_pin in self.shadow:
+                self.backend.write(gpio_pin, value)
             else:
-                value = GPIO.HIGH if is_on else GPIO.LOW
-
-            GPIO.output(gpio_pin, value)
+                self.backend.setup_output(gpio_pin, value)
+            self.shadow[gpio_pin] = value
             return True
 
         except Exception as e:
             logging.exception(f"GPIO direct control error on pin {gpio_pin}")
             return False
 
+    @_locked
     def set_state(self, device_id: int, is_on: bool):
         pin = self.pin_map.get(str(device_id))
         if pin is None:
@@ -68,5 +179,27 @@ class GPIOController:
 
         return self.direct_pin_control(pin, is_on, active_low)
 
+    @_locked
+    def set_states(self, states: Dict[int, bool]) -> bool:
+        """Switch several devices with one bulk write (one I2C transaction per expander chip)."""
+        values: Dict[int, int] = {}
+        for device_id, is_on in states.items():
+            pin = self.pin_map.get(str(device_id))
+            if pin is None:
+                logging.error(f"No pin mapped for device_id={device_id}")
+                return False
+            values[pin] = self._level(is_on, self.active_low_map.get(str(device_id), True))
+
+        try:
+            writes = {pin: value for pin, value in values.items() if pin in self.shadow}
+            for pin in values.keys() - writes.keys():
+                self.backend.setup_output(pin, values[pin])
+            self.backend.write_many(writes)
+            self.shadow.update(values)
+            return True
+        except Exception:
+            logging.exception(f"GPIO bulk control error on pins {list(values)}")
+            return False
+
 
 gpio_controller = GPIOController()
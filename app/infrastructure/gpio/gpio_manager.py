@@ -1,23 +1,65 @@
 import logging
-from typing import Dict, List, Optional
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 from app.core.config import settings
+from app.core.event_loop import call_on_loop
 from app.core.nats_client import nats_client
 from app.domain.gpio.entities import GPIODevice
 from app.infrastructure.backend.backend_adapter import backend_adapter
 from app.infrastructure.gpio.gpio_config_storage import gpio_config_storage
 from app.infrastructure.gpio.gpio_controller import gpio_controller
 from app.infrastructure.gpio.hardware import GPIO
+from app.infrastructure.storage.event_history import event_history
 
 logging = logging.getLogger(__name__)
 
 
 class GPIOManager:
+    """Logical device state and the heartbeat status view.
+
+    Event handlers run in worker threads, so state is guarded by `_lock`
+    and listeners are always called on the event loop.
+    """
 
     def __init__(self):
+        self._lock = threading.RLock()
         self.devices: Dict[str, GPIODevice] = {}
         self.previous_states: Dict[int, Optional[int]] = {}
         self.pin_to_device: Dict[int, str] = {}
+        self.pin_listeners: List[Callable[[], None]] = []
+        # Heartbeat view, updated incrementally on every state/config change.
+        self._status: Dict[str, Dict[str, Any]] = {}
+        # Bumped whenever an entry of the status view changes or disappears;
+        # changed ids are kept until a heartbeat delta drains them.
+        self.state_version = 0
+        self._changed_ids: Set[str] = set()
+        self._removed_ids: Set[str] = set()
+        self.state_listeners: List[Callable[[], None]] = []
+
+    def _notify_pins_changed(self) -> None:
+        for listener in self.pin_listeners:
+            call_on_loop(listener)
+
+    def _mark_changed(self, device_id: str, removed: bool = False) -> None:
+        self.state_version += 1
+        if removed:
+            self._changed_ids.discard(device_id)
+            self._removed_ids.add(device_id)
+        else:
+            self._removed_ids.discard(device_id)
+            self._changed_ids.add(device_id)
+        for listener in self.state_listeners:
+            call_on_loop(listener)
+
+    def drain_changes(self) -> Tuple[List[Dict[str, Any]], List[int]]:
+        """Status entries changed and device ids removed since the previous call."""
+        with self._lock:
+            changed = [self._status[device_id] for device_id in self._changed_ids if device_id in self._status]
+            removed = [int(device_id) for device_id in self._removed_ids]
+            self._changed_ids.clear()
+            self._removed_ids.clear()
+        return changed, removed
 
     @staticmethod
     def raw_to_is_on(device: GPIODevice, raw: int) -> bool:
@@ -25,69 +67,142 @@ class GPIOManager:
             return raw == GPIO.LOW
         return raw == GPIO.HIGH
 
+    def _refresh_status(self, device: GPIODevice, raw: Optional[int] = None) -> None:
+        if raw is None:
+            raw = gpio_controller.get_pin_value(device.pin_number)
+
+        entry = {
+            "device_id": device.device_id,
+            "pin": device.pin_number,
+            "is_on": self.raw_to_is_on(device, raw),
+            "mode": device.mode,
+            "threshold": device.power_threshold_kw,
+        }
+        device_id = str(device.device_id)
+        with self._lock:
+            if self._status.get(device_id) != entry:
+                self._status[device_id] = entry
+                self._mark_changed(device_id)
+
     def load_devices(self, devices: List[GPIODevice]) -> None:
-        self.devices = {str(d.device_id): d for d in devices}
-        self.previous_states = {d.pin_number: None for d in devices}
-        self.pin_to_device = {d.pin_number: str(d.device_id) for d in devices}
+        with self._lock:
+            self.devices = {str(d.device_id): d for d in devices}
+            self.previous_states = {d.pin_number: None for d in devices}
+            self.pin_to_device = {d.pin_number: str(d.device_id) for d in devices}
+
+            for device_id in set(self._status) - set(self.devices):
+                self._mark_changed(device_id, removed=True)
+            self._status = {}
+            states = self.get_states()
+            for d in devices:
+                self._refresh_status(d, states.get(d.pin_number))
+
         logging.info(f"GPIOManager: loaded {len(devices)} devices")
+        self._notify_pins_changed()
+
+    def add_device(self, device: GPIODevice) -> None:
+        with self._lock:
+            self.devices[str(device.device_id)] = device
+            self.previous_states[device.pin_number] = None
+            self.pin_to_device[device.pin_number] = str(device.device_id)
+            self._refresh_status(device)
+        self._notify_pins_changed()
+
+    def update_device(self, device: GPIODevice) -> None:
+        """Replace device settings without touching change-detection history."""
+        with self._lock:
+            self.devices[str(device.device_id)] = device
+            self._refresh_status(device)
+
+    def remove_device(self, device_id: int) -> None:
+        with self._lock:
+            device = self.devices.pop(str(device_id), None)
+            if device is None:
+                return
+            self.previous_states.pop(device.pin_number, None)
+            self.pin_to_device.pop(device.pin_number, None)
+            self._status.pop(str(device_id), None)
+            self._mark_changed(str(device_id), removed=True)
+        self._notify_pins_changed()
 
     def get_states(self) -> Dict[int, int]:
-        states: Dict[int, int] = {}
-        for device in self.devices.values():
-            pin = device.pin_number
-            val = gpio_controller.read_pin(pin)
-            states[pin] = val
-        return states
+        """Pin values from the controller's shared snapshot (shadow registers for outputs)."""
+        with self._lock:
+            pins = [d.pin_number for d in self.devices.values()]
+        return gpio_controller.snapshot(pins)
 
     def get_device(self, device_id: int) -> Optional[GPIODevice]:
         """Return GPIODevice by id or None when missing."""
         return self.devices.get(str(device_id))
 
-    def get_devices_status(self):
-        states = self.get_states()
-
-        results = []
-        for d in self.devices.values():
-            raw = states.get(d.pin_number)
-            if raw is None:
-                raw = GPIO.HIGH if d.active_low else GPIO.LOW
-            is_on = self.raw_to_is_on(d, raw)
-
-            results.append({
-                "device_id": d.device_id,
-                "pin": d.pin_number,
-                "is_on": is_on,
-                "mode": d.mode,
-                "threshold": d.power_threshold_kw,
-            })
-
-        return results
+    def get_devices_status(self) -> List[Dict[str, Any]]:
+        """Cached per-device status; no hardware access."""
+        with self._lock:
+            return list(self._status.values())
+
+    def get_status_snapshot(self, device_ids: Optional[Iterable[int]] = None) -> Dict[str, Any]:
+        """Versioned status view, optionally limited to `device_ids`; no hardware or disk access."""
+        with self._lock:
+            if device_ids is None:
+                return {"version": self.state_version, "devices": list(self._status.values())}
+
+            devices, unknown = [], []
+            for device_id in device_ids:
+                entry = self._status.get(str(device_id))
+                if entry is None:
+                    unknown.append(device_id)
+                else:
+                    devices.append(entry)
+            snapshot = {"version": self.state_version, "devices": devices}
+        if unknown:
+            snapshot["unknown"] = unknown
+        return snapshot
 
     def get_is_on(self, device_id: int) -> bool:
         device = self.devices.get(str(device_id))
         if not device:
             return False
 
-        raw = gpio_controller.read_pin(device.pin_number)
+        raw = gpio_controller.get_pin_value(device.pin_number)
         return self.raw_to_is_on(device, raw)
 
-    async def detect_changes(self) -> None:
-        current = self.get_states()
+    async def detect_changes(self) -> bool:
+        """Sample every pin from hardware; returns True when at least one change was reported."""
+        with self._lock:
+            pins = list(self.pin_to_device)
+        current = {pin: gpio_controller.read_pin(pin) for pin in pins}
 
+        changed = False
         for pin, new_raw in current.items():
+            if await self.handle_pin_sample(pin, new_raw):
+                changed = True
+        return changed
+
+    async def handle_pin_sample(self, pin: int, new_raw: int) -> bool:
+        """Compare a fresh pin reading with the last known one and report a change."""
+        with self._lock:
+            if pin not in self.pin_to_device:
+                return False
+
             old_raw = self.previous_states.get(pin)
+            self.previous_states[pin] = new_raw
 
-            if old_raw is None:
-                self.previous_states[pin] = new_raw
-                continue
+            if new_raw == old_raw:
+                return False
 
-            if new_raw != old_raw:
-                logging.info(
-                    f"GPIO change on pin {pin}: {old_raw} → {new_raw}"
-                )
-                await self.send_change_event(pin, new_raw)
+            gpio_controller.observe_pin(pin, new_raw)
+            device = self.devices.get(self.pin_to_device[pin])
+            if device is not None:
+                self._refresh_status(device, new_raw)
 
-            self.previous_states[pin] = new_raw
+        if old_raw is None:
+            return False
+
+        logging.info(
+            f"GPIO change on pin {pin}: {old_raw} → {new_raw}"
+        )
+        await self.send_change_event(pin, new_raw)
+        return True
 
     async def send_change_event(self, pin: int, raw: int) -> None:
         device_id = self.pin_to_device.get(pin)
@@ -103,7 +218,7 @@ class GPIOManager:
         }
 
         subject = f"raspberry.{settings.RASPBERRY_UUID}.gpio_change"
-        await nats_client.publish(subject, payload)
+        await nats_client.publish_raw(subject, payload)
 
         logging.info(f"Sent gpio_change event: {payload}")
 
@@ -113,14 +228,15 @@ class GPIOManager:
             logging.error(f"GPIOManager: device_id={device_id} not found")
             return False
 
-        device.is_on = is_on
-
         if device.active_low:
             raw = GPIO.LOW if is_on else GPIO.HIGH
         else:
             raw = GPIO.HIGH if is_on else GPIO.LOW
 
-        self.previous_states[device.pin_number] = raw
+        with self._lock:
+            device.is_on = is_on
+            self.previous_states[device.pin_number] = raw
+            self._refresh_status(device, raw)
 
         logging.info(
             f"GPIOManager: logical state updated "
@@ -132,16 +248,23 @@ class GPIOManager:
 
     def force_all_off(self, reason: str = "SAFETY_SHUTDOWN"):
         """Force all known devices to OFF, update state, persist config, and log event."""
-        for device in self.devices.values():
+        with self._lock:
+            devices = list(self.devices.values())
+        switched_on = [d.device_id for d in devices if self.get_is_on(d.device_id)]
+        # One bulk write for every relay that is on; fall back to per-device writes below.
+        bulk_ok = bool(switched_on) and gpio_controller.set_states({device_id: False for device_id in switched_on})
+
+        for device in devices:
             try:
-                is_on = self.get_is_on(device.device_id)
+                is_on = device.device_id in switched_on
 
                 # Only perform hardware change + log when state actually flips to OFF.
                 if is_on:
-                    ok = gpio_controller.set_state(device.device_id, False)
+                    ok = bulk_ok or gpio_controller.set_state(device.device_id, False)
                     if ok:
                         self.set_state(device.device_id, False)
-                        gpio_config_storage.update_state(device.device_id, False)
+                        gpio_config_storage.update_state(device.device_id, False, reason)
+                        event_history.record(device.device_id, False, reason)
                         backend_adapter.log_device_event(
                             device_id=device.device_id,
                             pin_state=False,
@@ -152,7 +275,7 @@ class GPIOManager:
                 else:
                     # Keep internal/config state in sync without emitting duplicate events.
                     self.set_state(device.device_id, False)
-                    gpio_config_storage.update_state(device.device_id, False)
+                    gpio_config_storage.update_state(device.device_id, False, reason)
             except Exception:
                 logging.exception(f"Failed to force OFF device_id={device.device_id} due to {reason}")
 
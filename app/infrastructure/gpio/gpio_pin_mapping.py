@@ -3,6 +3,8 @@ import json
 import logging
 from pathlib import Path
 
+from app.infrastructure.gpio.i2c_expander import PORT_NAMES, encode_expander_pin
+
 logging = logging.getLogger(__name__)
 
 
@@ -44,6 +46,9 @@ class PinMapping:
             # backward compatibility: default active_low=True when only pin is provided
             return raw, True
 
+        if isinstance(raw, dict) and "expander" in raw:
+            return self._expander_pin(device_number, raw), bool(raw.get("active_low", True))
+
         if isinstance(raw, dict):
             if "pin" not in raw:
                 raise ValueError(f"gpio_mapping.json entry for device_number {device_number} missing 'pin'")
@@ -53,6 +58,20 @@ class PinMapping:
 
         raise ValueError(f"gpio_mapping.json entry for device_number {device_number} has invalid format: {raw}")
 
+    @staticmethod
+    def _expander_pin(device_number: int, raw: dict) -> int:
+        """Virtual pin for {"expander": "mcp23017", "bus": 1, "address": "0x20", "port": "A", "bit": 0}."""
+        try:
+            address = raw["address"]
+            if isinstance(address, str):
+                address = int(address, 0)
+            port = raw.get("port", 0)
+            if isinstance(port, str):
+                port = PORT_NAMES[port.upper()]
+            return encode_expander_pin(str(raw["expander"]).lower(), int(raw.get("bus", 1)), address, port, int(raw["bit"]))
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"gpio_mapping.json expander entry for device_number {device_number} is invalid: {raw} ({e})")
+
     def get_pin(self, device_number: int) -> int:
         pin, _ = self.get_pin_config(device_number)
         return pin
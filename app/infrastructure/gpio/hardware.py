@@ -1,4 +1,14 @@
 # app/infrastructure/gpio/hardware.py
+import logging
+import random
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+
+logging = logging.getLogger(__name__)
 
 try:
     import RPi.GPIO as RPiGPIO
@@ -7,6 +17,12 @@ try:
 except (ImportError, RuntimeError):
     REAL_GPIO = False
 
+try:
+    import gpiod
+    from gpiod.line import Direction, Value
+except ImportError:
+    gpiod = None
+
 
 class MockGPIO:
     BCM = "BCM"
@@ -14,8 +30,12 @@ class MockGPIO:
     IN = "IN"
     LOW = 0
     HIGH = 1
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
 
     mock_state = {}
+    edge_callbacks = {}
 
     @staticmethod
     def setwarnings(flag):
@@ -42,5 +62,382 @@ class MockGPIO:
         print(f"[MOCK GPIO] input(pin={pin}) -> {state}")
         return state
 
+    @staticmethod
+    def add_event_detect(pin, edge, callback=None, bouncetime=None):
+        print(f"[MOCK GPIO] add_event_detect(pin={pin}, edge={edge})")
+        MockGPIO.edge_callbacks[pin] = (edge, callback)
+
+    @staticmethod
+    def remove_event_detect(pin):
+        print(f"[MOCK GPIO] remove_event_detect(pin={pin})")
+        MockGPIO.edge_callbacks.pop(pin, None)
+
+    @staticmethod
+    def simulate_edge(pin, state):
+        """Change a pin from "outside" and fire its edge callback like the real driver."""
+        old = MockGPIO.mock_state.get(pin, MockGPIO.HIGH)
+        MockGPIO.mock_state[pin] = state
+        if old == state or pin not in MockGPIO.edge_callbacks:
+            return
+
+        edge, callback = MockGPIO.edge_callbacks[pin]
+        rising = state == MockGPIO.HIGH
+        if callback and (edge == MockGPIO.BOTH or (edge == MockGPIO.RISING) == rising):
+            callback(pin)
+
 
 GPIO = RPiGPIO if REAL_GPIO else MockGPIO
+
+
+class GPIOBackend(ABC):
+    """Hardware access used by GPIOController.
+
+    Values are raw levels (GPIO.LOW / GPIO.HIGH). `read_many` / `write_many`
+    let backends that support it touch many lines in one hardware call;
+    `hw_ops` counts those calls. Backends with `supports_edges` implement
+    `add_event_detect`; pins on the others are polled.
+    """
+
+    name = "base"
+    supports_edges = False
+
+    def __init__(self):
+        self.hw_ops = 0
+
+    @abstractmethod
+    def setup_output(self, pin: int, value: int) -> None:
+        ...
+
+    def setup_outputs(self, values: Dict[int, int]) -> None:
+        """Configure several outputs at once; backends may group them in hardware."""
+        for pin, value in values.items():
+            self.setup_output(pin, value)
+
+    def release(self, pin: int) -> None:
+        pass
+
+    @abstractmethod
+    def read_many(self, pins: Iterable[int]) -> Dict[int, int]:
+        ...
+
+    @abstractmethod
+    def write_many(self, values: Dict[int, int]) -> None:
+        ...
+
+    def read(self, pin: int) -> int:
+        return self.read_many((pin,))[pin]
+
+    def write(self, pin: int, value: int) -> None:
+        self.write_many({pin: value})
+
+    def edges_supported(self, pin: int) -> bool:
+        return self.supports_edges
+
+    def add_event_detect(self, pin: int, callback: Callable[[int], None]) -> None:
+        raise RuntimeError(f"{self.name} backend does not support edge detection")
+
+    def remove_event_detect(self, pin: int) -> None:
+        pass
+
+
+class RPiGPIOBackend(GPIOBackend):
+    """RPi.GPIO-style module (RPi.GPIO or MockGPIO): one call per pin."""
+
+    supports_edges = True
+
+    def __init__(self, module):
+        super().__init__()
+        self.gpio = module
+        self.name = "rpi" if module is not MockGPIO else "mock"
+        self._configured = set()
+
+        try:
+            module.setwarnings(False)
+            module.setmode(module.BCM)
+        except Exception as e:
+            logging.error(f"GPIO init problem: {e}")
+
+    def setup_output(self, pin: int, value: int) -> None:
+        if pin not in self._configured:
+            self.gpio.setup(pin, self.gpio.OUT)
+            self.hw_ops += 1
+            self._configured.add(pin)
+        self.write(pin, value)
+
+    def release(self, pin: int) -> None:
+        self._configured.discard(pin)
+
+    def read_many(self, pins: Iterable[int]) -> Dict[int, int]:
+        values = {}
+        for pin in pins:
+            values[pin] = self.gpio.input(pin)
+            self.hw_ops += 1
+        return values
+
+    def write_many(self, values: Dict[int, int]) -> None:
+        for pin, value in values.items():
+            self.gpio.output(pin, value)
+            self.hw_ops += 1
+
+    def add_event_detect(self, pin: int, callback: Callable[[int], None]) -> None:
+        self.gpio.add_event_detect(pin, self.gpio.BOTH, callback=callback)
+
+    def remove_event_detect(self, pin: int) -> None:
+        self.gpio.remove_event_detect(pin)
+
+
+class LibgpiodBackend(GPIOBackend):
+    """libgpiod v2 character-device backend.
+
+    Lines set up together (`setup_outputs`, used at startup) share one line
+    request, so reading or writing any number of them is one GET/SET_VALUES
+    ioctl per request. A line added later gets a request of its own:
+    requests are never re-made, so lines already driving loads are not
+    released and re-requested. A released line stays held at its last level
+    until every line of its request has been released.
+    """
+
+    name = "gpiod"
+
+    def __init__(self, chip_path: str, consumer: str = "smart_energy_agent"):
+        super().__init__()
+        if gpiod is None:
+            raise RuntimeError("gpiod Python bindings are not installed")
+
+        self.chip_path = chip_path
+        self.consumer = consumer
+        # Configured lines and their last written value.
+        self._values: Dict[int, int] = {}
+        # Every requested line (configured or released) and its request.
+        self._lines: Dict[int, object] = {}
+
+    @staticmethod
+    def _to_value(raw: int):
+        return Value.ACTIVE if raw else Value.INACTIVE
+
+    def _group(self, pins: Iterable[int]) -> Dict[int, Tuple[object, List[int]]]:
+        grouped: Dict[int, Tuple[object, List[int]]] = {}
+        for pin in pins:
+            request = self._lines[pin]
+            grouped.setdefault(id(request), (request, []))[1].append(pin)
+        return grouped
+
+    def setup_outputs(self, values: Dict[int, int]) -> None:
+        held = {pin: value for pin, value in values.items() if pin in self._lines}
+        new = {pin: value for pin, value in values.items() if pin not in self._lines}
+
+        if new:
+            # Nothing is recorded until the request succeeded.
+            request = gpiod.request_lines(
+                self.chip_path,
+                consumer=self.consumer,
+                config={tuple(new): gpiod.LineSettings(direction=Direction.OUTPUT)},
+                output_values={pin: self._to_value(raw) for pin, raw in new.items()},
+            )
+            self.hw_ops += 1
+            for pin in new:
+                self._lines[pin] = request
+            self._values.update(new)
+
+        if held:
+            self.write_many(held)
+
+    def setup_output(self, pin: int, value: int) -> None:
+        self.setup_outputs({pin: value})
+
+    def release(self, pin: int) -> None:
+        if self._values.pop(pin, None) is None:
+            return
+        request = self._lines[pin]
+        siblings = [line for line, owner in self._lines.items() if owner is request]
+        if any(line in self._values for line in siblings):
+            return
+
+        request.release()
+        self.hw_ops += 1
+        for line in siblings:
+            del self._lines[line]
+
+    def read_many(self, pins: Iterable[int]) -> Dict[int, int]:
+        values: Dict[int, int] = {}
+        for request, request_pins in self._group(pins).values():
+            for pin, value in zip(request_pins, request.get_values(request_pins)):
+                values[pin] = int(value == Value.ACTIVE)
+            self.hw_ops += 1
+        return values
+
+    def write_many(self, values: Dict[int, int]) -> None:
+        for request, request_pins in self._group(values).values():
+            request.set_values({pin: self._to_value(values[pin]) for pin in request_pins})
+            self.hw_ops += 1
+        self._values.update(values)
+
+
+class SimulatedGPIOBackend(GPIOBackend):
+    """Silent in-memory GPIO for benchmarks and soak tests.
+
+    All state is per instance, so several controllers can share a process.
+    Faults can be injected per pin (stuck levels, read errors) or at random
+    (`read_error_rate`), every hardware op can be delayed by `latency`
+    seconds, and with `trace_size` > 0 the last operations are kept as
+    (monotonic_ns, op, pin, value) tuples. With `bulk=True` a multi-pin
+    read or write counts as one op, like libgpiod; otherwise one per pin.
+    """
+
+    name = "sim"
+    supports_edges = True
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        bulk: bool = True,
+        trace_size: int = 0,
+        read_error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        super().__init__()
+        self.latency = latency
+        self.bulk = bulk
+        self.read_error_rate = read_error_rate
+        self._random = random.Random(seed)
+
+        self.levels: Dict[int, int] = {}
+        self.outputs: Set[int] = set()
+        self.stuck: Dict[int, int] = {}
+        self.read_error_pins: Set[int] = set()
+        self._edge_callbacks: Dict[int, Callable[[int], None]] = {}
+        self.trace: Optional[Deque[Tuple[int, str, int, Optional[int]]]] = (
+            deque(maxlen=trace_size) if trace_size > 0 else None
+        )
+
+        self.reads = 0
+        self.writes = 0
+        self.read_errors = 0
+        self.stuck_writes = 0
+
+    def _op(self, count: int) -> None:
+        ops = 1 if self.bulk else count
+        self.hw_ops += ops
+        if self.latency > 0:
+            time.sleep(self.latency * ops)
+
+    def _record(self, op: str, pin: int, value: Optional[int]) -> None:
+        if self.trace is not None:
+            self.trace.append((time.monotonic_ns(), op, pin, value))
+
+    # ---------------------------------------------------------------
+    # Fault injection
+    # ---------------------------------------------------------------
+    def stick(self, pin: int, value: int) -> None:
+        """Hold `pin` at `value`; writes to it are ignored until `unstick`."""
+        self.stuck[pin] = value
+        self.levels[pin] = value
+
+    def unstick(self, pin: int) -> None:
+        self.stuck.pop(pin, None)
+
+    def fail_reads(self, pin: int, enabled: bool = True) -> None:
+        if enabled:
+            self.read_error_pins.add(pin)
+        else:
+            self.read_error_pins.discard(pin)
+
+    def set_external(self, pin: int, value: int) -> None:
+        """Change a level from outside the agent and fire its edge callback."""
+        if pin in self.stuck:
+            return
+        old = self.levels.get(pin, GPIO.HIGH)
+        self.levels[pin] = value
+        self._record("external", pin, value)
+        callback = self._edge_callbacks.get(pin)
+        if callback is not None and old != value:
+            callback(pin)
+
+    # ---------------------------------------------------------------
+    # GPIOBackend
+    # ---------------------------------------------------------------
+    def setup_output(self, pin: int, value: int) -> None:
+        self.outputs.add(pin)
+        self._record("setup", pin, value)
+        self.write(pin, value)
+
+    def release(self, pin: int) -> None:
+        self.outputs.discard(pin)
+        self._record("release", pin, None)
+
+    def read_many(self, pins: Iterable[int]) -> Dict[int, int]:
+        pins = list(pins)
+        if not pins:
+            return {}
+        self._op(len(pins))
+
+        values = {}
+        for pin in pins:
+            self.reads += 1
+            if pin in self.read_error_pins or (
+                self.read_error_rate and self._random.random() < self.read_error_rate
+            ):
+                self.read_errors += 1
+                self._record("read_error", pin, None)
+                raise OSError(f"simulated read error on pin {pin}")
+            values[pin] = self.levels.get(pin, GPIO.HIGH)
+            self._record("read", pin, values[pin])
+        return values
+
+    def write_many(self, values: Dict[int, int]) -> None:
+        if not values:
+            return
+        self._op(len(values))
+
+        for pin, value in values.items():
+            self.writes += 1
+            if pin in self.stuck:
+                self.stuck_writes += 1
+                self._record("stuck_write", pin, value)
+                continue
+            self.levels[pin] = value
+            self._record("write", pin, value)
+
+    def add_event_detect(self, pin: int, callback: Callable[[int], None]) -> None:
+        self._edge_callbacks[pin] = callback
+
+    def remove_event_detect(self, pin: int) -> None:
+        self._edge_callbacks.pop(pin, None)
+
+    def get_metrics(self) -> dict:
+        return {
+            "hw_ops": self.hw_ops,
+            "reads": self.reads,
+            "writes": self.writes,
+            "read_errors": self.read_errors,
+            "stuck_writes": self.stuck_writes,
+        }
+
+
+def create_backend(name: Optional[str] = None) -> GPIOBackend:
+    """Build the backend selected by GPIO_BACKEND ("auto", "rpi", "gpiod", "sim" or "mock")."""
+    name = (name or settings.GPIO_BACKEND).lower()
+
+    if name == "auto":
+        if REAL_GPIO:
+            name = "rpi"
+        elif gpiod is not None:
+            name = "gpiod"
+        else:
+            name = "mock"
+
+    if name == "gpiod":
+        return LibgpiodBackend(settings.GPIO_CHIP)
+    if name == "rpi":
+        if not REAL_GPIO:
+            raise RuntimeError("GPIO_BACKEND=rpi but RPi.GPIO is not available")
+        return RPiGPIOBackend(RPiGPIO)
+    if name == "mock":
+        return RPiGPIOBackend(MockGPIO)
+    if name == "sim":
+        return SimulatedGPIOBackend(
+            latency=settings.GPIO_SIM_LATENCY_MS / 1000.0,
+            trace_size=settings.GPIO_SIM_TRACE_SIZE,
+        )
+
+    raise ValueError(f"Unknown GPIO_BACKEND: {name}")
@@ -0,0 +1,319 @@
+# app/infrastructure/gpio/i2c_expander.py
+"""Relay outputs on I2C GPIO expanders (MCP23017, PCF8574).
+
+Expander channels are addressed as (bus, address, port, bit) and are given
+virtual pin numbers above EXPANDER_PIN_BASE, so the rest of the agent
+(controller shadow registers, manager, registry, config.json) keeps
+working with plain integer pins. The chip type is part of the encoding.
+
+    pin = EXPANDER_PIN_BASE | chip << 15 | bus << 11 | address << 4 | port << 3 | bit
+"""
+import logging
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.infrastructure.gpio.hardware import GPIOBackend
+
+logging = logging.getLogger(__name__)
+
+try:
+    from smbus2 import SMBus
+except ImportError:
+    SMBus = None
+
+EXPANDER_PIN_BASE = 1 << 16
+
+MCP23017 = "mcp23017"
+PCF8574 = "pcf8574"
+CHIP_CODES = {MCP23017: 0, PCF8574: 1}
+CHIP_NAMES = {code: name for name, code in CHIP_CODES.items()}
+PORT_NAMES = {"A": 0, "B": 1}
+
+# MCP23017 registers (IOCON.BANK = 0, sequential addressing).
+MCP_IODIRA = 0x00
+MCP_GPIOA = 0x12
+MCP_OLATA = 0x14
+
+ChipKey = Tuple[str, int, int]  # (chip, bus, address)
+
+
+def encode_expander_pin(chip: str, bus: int, address: int, port: int, bit: int) -> int:
+    if chip not in CHIP_CODES:
+        raise ValueError(f"Unsupported I2C expander '{chip}' (expected one of {sorted(CHIP_CODES)})")
+    if not 0 <= bus < 16:
+        raise ValueError(f"I2C bus {bus} out of range 0-15")
+    if not 0x03 <= address <= 0x77:
+        raise ValueError(f"I2C address {address:#x} out of range 0x03-0x77")
+    ports = 2 if chip == MCP23017 else 1
+    if not 0 <= port < ports or not 0 <= bit < 8:
+        raise ValueError(f"{chip} has no port {port} bit {bit}")
+    return EXPANDER_PIN_BASE | CHIP_CODES[chip] << 15 | bus << 11 | address << 4 | port << 3 | bit
+
+
+def decode_expander_pin(pin: int) -> Tuple[str, int, int, int, int]:
+    """(chip, bus, address, port, bit) of a virtual expander pin."""
+    return (
+        CHIP_NAMES[(pin >> 15) & 0x1],
+        (pin >> 11) & 0xF,
+        (pin >> 4) & 0x7F,
+        (pin >> 3) & 0x1,
+        pin & 0x7,
+    )
+
+
+def is_expander_pin(pin: int) -> bool:
+    return pin >= EXPANDER_PIN_BASE
+
+
+class SimulatedI2CBus:
+    """In-memory smbus2-compatible bus for tests and benchmarks.
+
+    Every address holds a 256-byte MCP23017-style register file (writes to
+    OLATA/OLATB show up on GPIOA/GPIOB) and a PCF8574-style byte latch.
+    `transactions` counts bus transfers; `latency` delays each one.
+    """
+
+    def __init__(self, bus: int = 1, latency: float = 0.0):
+        self.bus = bus
+        self.latency = latency
+        self.registers: Dict[int, bytearray] = defaultdict(self._power_on_registers)
+        self.latches: Dict[int, int] = defaultdict(lambda: 0xFF)
+        self.transactions = 0
+
+    @staticmethod
+    def _power_on_registers() -> bytearray:
+        registers = bytearray(256)
+        registers[MCP_IODIRA] = registers[MCP_IODIRA + 1] = 0xFF
+        return registers
+
+    def _transfer(self) -> None:
+        self.transactions += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def read_byte(self, address: int) -> int:
+        self._transfer()
+        return self.latches[address]
+
+    def write_byte(self, address: int, value: int) -> None:
+        self._transfer()
+        self.latches[address] = value & 0xFF
+
+    def read_i2c_block_data(self, address: int, register: int, length: int) -> List[int]:
+        self._transfer()
+        return list(self.registers[address][register:register + length])
+
+    def write_i2c_block_data(self, address: int, register: int, data: List[int]) -> None:
+        self._transfer()
+        registers = self.registers[address]
+        for offset, value in enumerate(data):
+            registers[register + offset] = value & 0xFF
+            if register + offset in (MCP_OLATA, MCP_OLATA + 1):
+                registers[MCP_GPIOA + register + offset - MCP_OLATA] = value & 0xFF
+
+    def close(self) -> None:
+        pass
+
+
+class _Chip:
+    """Cached output latches and direction registers of one expander."""
+
+    def __init__(self, chip: str, address: int):
+        self.chip = chip
+        self.address = address
+        self.ports = 2 if chip == MCP23017 else 1
+        self.latch: List[int] = [0xFF] * self.ports
+        self.iodir: List[int] = [0xFF] * self.ports
+        self.initialized = False
+
+
+class ExpanderGPIOBackend(GPIOBackend):
+    """GPIOBackend over I2C expanders with cached port registers.
+
+    Output latches are kept in memory, so writing any number of relays on
+    one chip is a single I2C transaction (both MCP23017 ports go out in one
+    sequential block write), and reading any number of pins is one
+    transaction per chip.
+    """
+
+    name = "i2c"
+
+    def __init__(self, bus_factory: Optional[Callable[[int], object]] = None):
+        super().__init__()
+        self.bus_factory = bus_factory or self._default_bus
+        self.buses: Dict[int, object] = {}
+        self.chips: Dict[ChipKey, _Chip] = {}
+
+    @staticmethod
+    def _default_bus(bus: int):
+        if settings.I2C_SIMULATE:
+            logging.warning(f"ExpanderGPIOBackend: I2C_SIMULATE set, simulating I2C bus {bus}")
+            return SimulatedI2CBus(bus)
+        if SMBus is None:
+            raise RuntimeError(
+                f"I2C bus {bus} is needed for expander pins but smbus2 is not available "
+                "(install smbus2, or set I2C_SIMULATE=true to simulate the bus)"
+            )
+        return SMBus(bus)
+
+    def _bus(self, bus: int):
+        if bus not in self.buses:
+            self.buses[bus] = self.bus_factory(bus)
+        return self.buses[bus]
+
+    def _chip(self, chip: str, bus: int, address: int) -> _Chip:
+        key = (chip, bus, address)
+        state = self.chips.get(key)
+        if state is None:
+            state = self.chips[key] = _Chip(chip, address)
+
+        if not state.initialized:
+            # Seed the cache from the chip once; later writes never read back.
+            if chip == MCP23017:
+                state.latch = self._bus(bus).read_i2c_block_data(address, MCP_OLATA, 2)
+                state.iodir = self._bus(bus).read_i2c_block_data(address, MCP_IODIRA, 2)
+            else:
+                state.latch = [self._bus(bus).read_byte(address)]
+            self.hw_ops += 1 if chip == PCF8574 else 2
+            state.initialized = True
+        return state
+
+    def _flush_latch(self, bus: int, state: _Chip) -> None:
+        if state.chip == MCP23017:
+            self._bus(bus).write_i2c_block_data(state.address, MCP_OLATA, list(state.latch))
+        else:
+            self._bus(bus).write_byte(state.address, state.latch[0])
+        self.hw_ops += 1
+
+    @staticmethod
+    def _group(pins: Iterable[int]) -> Dict[ChipKey, List[int]]:
+        grouped: Dict[ChipKey, List[int]] = defaultdict(list)
+        for pin in pins:
+            chip, bus, address, _, _ = decode_expander_pin(pin)
+            grouped[(chip, bus, address)].append(pin)
+        return grouped
+
+    # ---------------------------------------------------------------
+    # GPIOBackend
+    # ---------------------------------------------------------------
+    def setup_output(self, pin: int, value: int) -> None:
+        chip, bus, address, port, bit = decode_expander_pin(pin)
+        state = self._chip(chip, bus, address)
+
+        if chip == MCP23017 and state.iodir[port] & (1 << bit):
+            # Latch the OFF level first so the relay does not click on switch to output.
+            self.write(pin, value)
+            state.iodir[port] &= ~(1 << bit) & 0xFF
+            self._bus(bus).write_i2c_block_data(address, MCP_IODIRA, list(state.iodir))
+            self.hw_ops += 1
+            return
+        self.write(pin, value)
+
+    def release(self, pin: int) -> None:
+        chip, bus, address, port, bit = decode_expander_pin(pin)
+        state = self.chips.get((chip, bus, address))
+        if state is not None and chip == MCP23017:
+            state.iodir[port] |= 1 << bit
+            self._bus(bus).write_i2c_block_data(address, MCP_IODIRA, list(state.iodir))
+            self.hw_ops += 1
+
+    def read_many(self, pins: Iterable[int]) -> Dict[int, int]:
+        values: Dict[int, int] = {}
+        for (chip, bus, address), chip_pins in self._group(pins).items():
+            if chip == MCP23017:
+                ports = self._bus(bus).read_i2c_block_data(address, MCP_GPIOA, 2)
+            else:
+                ports = [self._bus(bus).read_byte(address)]
+            self.hw_ops += 1
+            for pin in chip_pins:
+                _, _, _, port, bit = decode_expander_pin(pin)
+                values[pin] = (ports[port] >> bit) & 1
+        return values
+
+    def write_many(self, values: Dict[int, int]) -> None:
+        for (chip, bus, address), chip_pins in self._group(values).items():
+            state = self._chip(chip, bus, address)
+            latch = list(state.latch)
+            for pin in chip_pins:
+                _, _, _, port, bit = decode_expander_pin(pin)
+                if values[pin]:
+                    latch[port] |= 1 << bit
+                else:
+                    latch[port] &= ~(1 << bit) & 0xFF
+
+            if latch != state.latch:
+                state.latch = latch
+                self._flush_latch(bus, state)
+
+
+class RoutedGPIOBackend(GPIOBackend):
+    """Sends header pins to the native backend and virtual expander pins to I2C."""
+
+    def __init__(self, native: GPIOBackend, expanders: ExpanderGPIOBackend):
+        super().__init__()
+        self.native = native
+        self.expanders = expanders
+        self.name = f"{native.name}+{expanders.name}"
+
+    @property
+    def hw_ops(self) -> int:
+        return self.native.hw_ops + self.expanders.hw_ops
+
+    @hw_ops.setter
+    def hw_ops(self, value: int) -> None:
+        # GPIOBackend.__init__ assigns the counter; the sum lives in the children.
+        pass
+
+    def _backend(self, pin: int) -> GPIOBackend:
+        return self.expanders if is_expander_pin(pin) else self.native
+
+    def setup_output(self, pin: int, value: int) -> None:
+        self._backend(pin).setup_output(pin, value)
+
+    def setup_outputs(self, values: Dict[int, int]) -> None:
+        native = {pin: value for pin, value in values.items() if not is_expander_pin(pin)}
+        expander = {pin: value for pin, value in values.items() if is_expander_pin(pin)}
+
+        if native:
+            self.native.setup_outputs(native)
+        if expander:
+            self.expanders.setup_outputs(expander)
+
+    def release(self, pin: int) -> None:
+        self._backend(pin).release(pin)
+
+    def read_many(self, pins: Iterable[int]) -> Dict[int, int]:
+        pins = list(pins)
+        native = [pin for pin in pins if not is_expander_pin(pin)]
+        expander = [pin for pin in pins if is_expander_pin(pin)]
+
+        values: Dict[int, int] = {}
+        if native:
+            values.update(self.native.read_many(native))
+        if expander:
+            values.update(self.expanders.read_many(expander))
+        return values
+
+    def write_many(self, values: Dict[int, int]) -> None:
+        native = {pin: value for pin, value in values.items() if not is_expander_pin(pin)}
+        expander = {pin: value for pin, value in values.items() if is_expander_pin(pin)}
+
+        if native:
+            self.native.write_many(native)
+        if expander:
+            self.expanders.write_many(expander)
+
+    @property
+    def supports_edges(self) -> bool:
+        return self.native.supports_edges or self.expanders.supports_edges
+
+    def edges_supported(self, pin: int) -> bool:
+        return self._backend(pin).edges_supported(pin)
+
+    def add_event_detect(self, pin: int, callback: Callable[[int], None]) -> None:
+        self._backend(pin).add_event_detect(pin, callback)
+
+    def remove_event_detect(self, pin: int) -> None:
+        self._backend(pin).remove_event_detect(pin)
@@ -0,0 +1,206 @@
+# app/infrastructure/storage/event_dedupe.py
+import logging
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Set, Tuple
+
+from app.core.config import settings
+
+logging = logging.getLogger(__name__)
+
+MSG_ID = "Nats-Msg-Id"
+
+# stream sequence (u64), crc32 (u32)
+MARK_RECORD = struct.Struct("<QI")
+
+
+def _message_keys(msg) -> Tuple[Optional[int], Optional[str], int]:
+    """(stream sequence, Nats-Msg-Id, delivery count) of a received message."""
+    msg_id = (msg.headers or {}).get(MSG_ID)
+    try:
+        metadata = msg.metadata
+    except Exception:
+        # Not a JetStream delivery.
+        return None, msg_id, 1
+    return metadata.sequence.stream, msg_id, metadata.num_delivered
+
+
+class EventDeduplicator:
+    """Recognises redelivered events that were already processed.
+
+    Processed stream sequences and Nats-Msg-Ids are kept in a bounded LRU.
+    Below that, a persisted low-water mark is the highest stream sequence
+    such that every event delivered at or below it was processed (one
+    checksummed record rewritten in place). It only advances over
+    contiguous completions: a delivered event that is still being handled,
+    or was rejected, holds it back. Redeliveries at or below the mark are
+    duplicates; anything else that is not in the LRU is handled again.
+
+    After a restart, events delivered before it may still be pending and
+    will be redelivered in any order. `resume` takes the consumer's pending
+    count and the mark stays put until all of them have been seen again.
+
+    The sequence checks only apply to redeliveries (num_delivered > 1): a
+    first delivery is never a duplicate of itself, which also keeps a
+    recreated stream with restarted sequences from being swallowed.
+    """
+
+    def __init__(self, path: Path, size: int):
+        self.path = Path(path)
+        self.size = max(1, size)
+        self._seqs: "OrderedDict[int, None]" = OrderedDict()
+        self._msg_ids: "OrderedDict[str, None]" = OrderedDict()
+        self._fd: Optional[int] = None
+
+        # Delivered in this session and not recorded yet.
+        self._outstanding: Set[int] = set()
+        # Recorded above the mark, waiting for the gaps below them to close.
+        self._done: Set[int] = set()
+        # Pending deliveries from before the restart that have not come back yet.
+        self._barrier: Optional[int] = None
+        self._awaiting = 0
+        self._redelivered: Set[int] = set()
+
+        self.lwm = 0
+        self.checked = 0
+        self.duplicates = 0
+        self.duplicates_by_sequence = 0
+        self.duplicates_by_msg_id = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._recover()
+
+    def _recover(self):
+        try:
+            with open(self.path, "rb") as f:
+                record = f.read(MARK_RECORD.size)
+        except FileNotFoundError:
+            return
+
+        if len(record) == MARK_RECORD.size:
+            seq, crc = MARK_RECORD.unpack(record)
+            if zlib.crc32(record[:8]) == crc:
+                self.lwm = seq
+                logging.info(f"EventDeduplicator: recovered low-water mark {seq}")
+                return
+        logging.warning(f"EventDeduplicator: ignoring corrupt low-water mark in {self.path}")
+
+    def _persist(self, seq: int) -> None:
+        body = struct.pack("<Q", seq)
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o644)
+            os.pwrite(self._fd, body + struct.pack("<I", zlib.crc32(body)), 0)
+        except OSError as exc:
+            logging.error(f"EventDeduplicator: failed to persist low-water mark {seq}: {exc}")
+
+    @staticmethod
+    def _remember(lru: OrderedDict, key, size: int) -> None:
+        lru[key] = None
+        lru.move_to_end(key)
+        if len(lru) > size:
+            lru.popitem(last=False)
+
+    def resume(self, consumer_info) -> None:
+        """Hold the mark until the consumer's pending deliveries have come back.
+
+        `consumer_info` is the durable's info read before consuming, None
+        when the consumer is new.
+        """
+        if consumer_info is None or not consumer_info.num_ack_pending:
+            return
+        self._barrier = consumer_info.delivered.stream_seq
+        self._awaiting = consumer_info.num_ack_pending
+        logging.info(
+            f"EventDeduplicator: waiting for {self._awaiting} pending redeliveries "
+            f"up to sequence {self._barrier} before advancing the mark"
+        )
+
+    def _see_redelivery(self, seq: int) -> None:
+        if self._barrier is None or seq > self._barrier or seq in self._redelivered:
+            return
+        self._redelivered.add(seq)
+        self._awaiting -= 1
+        if self._awaiting <= 0:
+            self._barrier = None
+            self._redelivered.clear()
+            self._advance()
+
+    def is_duplicate(self, msg) -> bool:
+        self.checked += 1
+        seq, msg_id, delivered = _message_keys(msg)
+
+        if msg_id is not None and msg_id in self._msg_ids:
+            self.duplicates += 1
+            self.duplicates_by_msg_id += 1
+            return True
+
+        if seq is None:
+            return False
+
+        if delivered > 1:
+            self._see_redelivery(seq)
+            if seq in self._seqs or seq <= self.lwm:
+                self.duplicates += 1
+                self.duplicates_by_sequence += 1
+                return True
+
+        self._outstanding.add(seq)
+        return False
+
+    def record(self, msg) -> None:
+        """Mark a message as processed; call once its side effects are done."""
+        seq, msg_id, _ = _message_keys(msg)
+        if msg_id is not None:
+            self._remember(self._msg_ids, msg_id, self.size)
+        if seq is None:
+            return
+
+        self._remember(self._seqs, seq, self.size)
+        self._outstanding.discard(seq)
+        if seq > self.lwm:
+            self._done.add(seq)
+            if len(self._done) > self.size:
+                # Held back for long (e.g. by a rejected event); forgetting
+                # the oldest completions only keeps the mark lower.
+                self._done.discard(min(self._done))
+            self._advance()
+
+    def _advance(self) -> None:
+        if self._barrier is not None or not self._done:
+            return
+
+        limit = min(self._outstanding) if self._outstanding else None
+        ready = [seq for seq in self._done if limit is None or seq < limit]
+        if not ready:
+            return
+
+        self._done.difference_update(ready)
+        self.lwm = max(ready)
+        self._persist(self.lwm)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def get_metrics(self) -> dict:
+        return {
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "by_sequence": self.duplicates_by_sequence,
+            "by_msg_id": self.duplicates_by_msg_id,
+            "low_water_mark": self.lwm,
+            "outstanding": len(self._outstanding),
+            "awaiting_redeliveries": self._awaiting if self._barrier is not None else 0,
+            "tracked": len(self._seqs),
+        }
+
+
+event_dedupe = EventDeduplicator(
+    Path(settings.LOG_DIR) / settings.EVENT_DEDUPE_FILE,
+    size=settings.EVENT_DEDUPE_SIZE,
+)
@@ -0,0 +1,215 @@
+# app/infrastructure/storage/event_history.py
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Deque, List, Optional, Tuple
+
+import aiosqlite
+
+from app.core.config import settings
+from app.core.event_loop import call_on_loop
+
+logging = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS device_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    device_id INTEGER NOT NULL,
+    is_on INTEGER NOT NULL,
+    trigger_reason TEXT NOT NULL,
+    power_kw REAL,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_device_events_device_ts ON device_events (device_id, timestamp);
+CREATE INDEX IF NOT EXISTS ix_device_events_reason ON device_events (trigger_reason);
+CREATE INDEX IF NOT EXISTS ix_device_events_ts ON device_events (timestamp);
+"""
+
+# (device_id, is_on, trigger_reason, power_kw, timestamp)
+Row = Tuple[int, int, str, Optional[float], float]
+
+
+class EventHistoryStore:
+    """Local SQLite history of relay transitions.
+
+    `record` only appends to an in-memory buffer; a background task writes
+    buffered rows in one transaction every `flush_interval` seconds or as
+    soon as `batch_size` rows are waiting.
+    """
+
+    def __init__(self, path: Path, batch_size: int, flush_interval: float, retention_days: int):
+        self.path = Path(path)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+
+        self._db: Optional[aiosqlite.Connection] = None
+        self._buffer: Deque[Row] = deque(maxlen=10_000)
+        self._wakeup = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+
+        self.written = 0
+        self.pruned = 0
+        self.dropped = 0
+
+    async def start(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = await aiosqlite.connect(self.path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.executescript(SCHEMA)
+        await self._db.commit()
+
+        self._tasks = [
+            asyncio.create_task(self._flush_loop()),
+            asyncio.create_task(self._retention_loop()),
+        ]
+        logging.info(f"EventHistoryStore: opened {self.path}")
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._db is not None:
+            await self.flush()
+            await self._db.close()
+            self._db = None
+
+    def record(self, device_id: int, is_on: bool, trigger_reason: str, power_kw: Optional[float] = None):
+        """Buffer one relay transition; never blocks the caller. Safe from worker threads."""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((int(device_id), int(bool(is_on)), trigger_reason, power_kw, time.time()))
+        if len(self._buffer) >= self.batch_size:
+            call_on_loop(self._wakeup.set)
+
+    async def flush(self):
+        if self._db is None or not self._buffer:
+            return
+
+        async with self._write_lock:
+            # popleft, not list() + clear(): records from worker threads may land in between.
+            rows = [self._buffer.popleft() for _ in range(len(self._buffer))]
+            try:
+                await self._db.executemany(
+                    "INSERT INTO device_events (device_id, is_on, trigger_reason, power_kw, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                await self._db.commit()
+                self.written += len(rows)
+            except Exception:
+                logging.exception(f"EventHistoryStore: failed to write {len(rows)} rows")
+                # Put them back in front of newer rows. extendleft on a full
+                # deque would evict from the right, i.e. the newest rows, so
+                # drop the oldest of ours to fit instead.
+                free = self._buffer.maxlen - len(self._buffer)
+                if len(rows) > free:
+                    dropped = len(rows) - free
+                    self.dropped += dropped
+                    logging.warning(f"EventHistoryStore: buffer full, dropping {dropped} oldest rows")
+                    rows = rows[dropped:]
+                self._buffer.extendleft(reversed(rows))
+
+    async def prune(self) -> int:
+        if self._db is None:
+            return 0
+
+        cutoff = time.time() - self.retention_days * 86400
+        async with self._write_lock:
+            cursor = await self._db.execute("DELETE FROM device_events WHERE timestamp < ?", (cutoff,))
+            await self._db.commit()
+        removed = cursor.rowcount or 0
+        self.pruned += removed
+        if removed:
+            logging.info(f"EventHistoryStore: pruned {removed} rows older than {self.retention_days} days")
+        return removed
+
+    async def query(
+        self,
+        device_id: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        trigger_reason: Optional[str] = None,
+        limit: int = 500,
+    ) -> List[dict]:
+        """Return transitions newest first; `since`/`until` are unix timestamps."""
+        if self._db is None:
+            return []
+
+        await self.flush()
+
+        clauses = []
+        params: list = []
+        if device_id is not None:
+            clauses.append("device_id = ?")
+            params.append(device_id)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if trigger_reason is not None:
+            clauses.append("trigger_reason = ?")
+            params.append(trigger_reason)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(max(1, min(limit, settings.HISTORY_MAX_QUERY_ROWS)))
+
+        async with self._db.execute(
+            f"SELECT device_id, is_on, trigger_reason, power_kw, timestamp FROM device_events "
+            f"{where} ORDER BY timestamp DESC LIMIT ?",
+            params,
+        ) as cursor:
+            rows = await cursor.fetchall()
+
+        return [
+            {
+                "device_id": row[0],
+                "is_on": bool(row[1]),
+                "trigger_reason": row[2],
+                "power_kw": row[3],
+                "timestamp": datetime.fromtimestamp(row[4], tz=timezone.utc).isoformat(),
+            }
+            for row in rows
+        ]
+
+    def get_metrics(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "pruned": self.pruned,
+            "dropped": self.dropped,
+        }
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def _retention_loop(self):
+        while True:
+            try:
+                await self.prune()
+            except Exception:
+                logging.exception("EventHistoryStore: retention job failed")
+            await asyncio.sleep(settings.HISTORY_PRUNE_INTERVAL)
+
+
+event_history = EventHistoryStore(
+    Path(settings.LOG_DIR) / settings.HISTORY_DB_FILE,
+    batch_size=settings.HISTORY_BATCH_SIZE,
+    flush_interval=settings.HISTORY_FLUSH_INTERVAL,
+    retention_days=settings.HISTORY_RETENTION_DAYS,
+)
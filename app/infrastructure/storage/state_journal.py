@@ -0,0 +1,174 @@
+# app/infrastructure/storage/state_journal.py
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+from app.core.config import settings
+
+logging = logging.getLogger(__name__)
+
+# device_id (u32), is_on (u8), reason code (u8), monotonic ns (i64), crc32 (u32)
+RECORD = struct.Struct("<IBBqI")
+_BODY = struct.Struct("<IBBq")
+
+REASON_CODES: Dict[str, int] = {
+    "UNKNOWN": 0,
+    "DEVICE_COMMAND": 1,
+    "AUTO_TRIGGER": 2,
+    "POWER_MISSING": 3,
+    "PIN_STATE_MISSING": 4,
+    "HEARTBEAT_FAILURE": 5,
+    "SAFETY_SHUTDOWN": 6,
+    "SNAPSHOT": 7,
+}
+REASON_NAMES = {code: name for name, code in REASON_CODES.items()}
+
+# device_id -> (is_on, reason, monotonic ns)
+StateEntry = Tuple[bool, str, int]
+
+
+def _pack(device_id: int, is_on: bool, reason_code: int, ts_ns: int) -> bytes:
+    body = _BODY.pack(device_id, int(is_on), reason_code, ts_ns)
+    return body + struct.pack("<I", zlib.crc32(body))
+
+
+def _iter_records(fh: BinaryIO) -> Iterator[Tuple[int, bool, int, int]]:
+    """Yield valid records, stopping at the first torn or corrupt one."""
+    while True:
+        chunk = fh.read(RECORD.size)
+        if len(chunk) < RECORD.size:
+            return
+        device_id, is_on, reason_code, ts_ns, crc = RECORD.unpack(chunk)
+        if zlib.crc32(chunk[:_BODY.size]) != crc:
+            return
+        yield device_id, bool(is_on), reason_code, ts_ns
+
+
+class RelayStateJournal:
+    """Append-only binary journal of relay transitions.
+
+    Each transition is one fixed-size record of RECORD.size bytes. Every
+    `compact_every` records the current state is written to a snapshot
+    file (atomic replace) and the journal is truncated, so startup replays
+    at most one snapshot plus a short tail.
+
+    Appends come from the dispatcher's worker threads; `_lock` serialises
+    writes, compaction and close.
+    """
+
+    def __init__(self, journal_path: Path, snapshot_path: Path, compact_every: int):
+        self.journal_path = Path(journal_path)
+        self.snapshot_path = Path(snapshot_path)
+        self.compact_every = max(1, compact_every)
+
+        self.states: Dict[int, StateEntry] = {}
+        self._fh: Optional[BinaryIO] = None
+        self._tail_records = 0
+        self.bytes_written = 0
+        self._lock = threading.RLock()
+
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        self._recover()
+
+    def _recover(self):
+        started = time.perf_counter()
+
+        if self.snapshot_path.exists():
+            with open(self.snapshot_path, "rb") as f:
+                for device_id, is_on, reason_code, ts_ns in _iter_records(f):
+                    self.states[device_id] = (is_on, REASON_NAMES.get(reason_code, "UNKNOWN"), ts_ns)
+
+        valid_bytes = 0
+        if self.journal_path.exists():
+            with open(self.journal_path, "rb") as f:
+                for device_id, is_on, reason_code, ts_ns in _iter_records(f):
+                    self.states[device_id] = (is_on, REASON_NAMES.get(reason_code, "UNKNOWN"), ts_ns)
+                    self._tail_records += 1
+                valid_bytes = self._tail_records * RECORD.size
+
+            if self.journal_path.stat().st_size != valid_bytes:
+                logging.warning(f"RelayStateJournal: truncating torn tail of {self.journal_path}")
+                os.truncate(self.journal_path, valid_bytes)
+
+        logging.info(
+            f"RelayStateJournal: recovered {len(self.states)} device states "
+            f"({self._tail_records} tail records) in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+
+    def _open(self) -> BinaryIO:
+        if self._fh is None:
+            self._fh = open(self.journal_path, "ab", buffering=0)
+        return self._fh
+
+    def get_state(self, device_id: int) -> Optional[bool]:
+        entry = self.states.get(device_id)
+        return entry[0] if entry is not None else None
+
+    def append(self, device_id: int, is_on: bool, reason: str = "UNKNOWN"):
+        ts_ns = time.monotonic_ns()
+        record = _pack(device_id, is_on, REASON_CODES.get(reason, 0), ts_ns)
+
+        with self._lock:
+            try:
+                self._open().write(record)
+            except Exception as exc:
+                logging.error(f"RelayStateJournal: failed to append record for device_id={device_id}: {exc}")
+                return
+
+            self.states[device_id] = (is_on, reason, ts_ns)
+            self.bytes_written += len(record)
+            self._tail_records += 1
+
+            if self._tail_records >= self.compact_every:
+                self.compact()
+
+    def forget(self, device_id: int):
+        with self._lock:
+            self.states.pop(device_id, None)
+
+    def compact(self):
+        """Write the current state as a snapshot and truncate the journal."""
+        with self._lock:
+            tmp = self.snapshot_path.with_suffix(".tmp")
+            try:
+                with open(tmp, "wb") as f:
+                    for device_id, (is_on, reason, ts_ns) in self.states.items():
+                        f.write(_pack(device_id, is_on, REASON_CODES.get(reason, 0), ts_ns))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.snapshot_path)
+
+                if self._fh is not None:
+                    self._fh.close()
+                    self._fh = None
+                with open(self.journal_path, "wb"):
+                    pass
+                self._tail_records = 0
+            except Exception:
+                logging.exception("RelayStateJournal: compaction failed")
+
+    def close(self):
+        with self._lock:
+            self.compact()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def get_metrics(self) -> dict:
+        return {
+            "devices": len(self.states),
+            "tail_records": self._tail_records,
+            "bytes_written": self.bytes_written,
+        }
+
+
+state_journal = RelayStateJournal(
+    Path(settings.LOG_DIR) / settings.STATE_JOURNAL_FILE,
+    Path(settings.LOG_DIR) / settings.STATE_SNAPSHOT_FILE,
+    compact_every=settings.STATE_JOURNAL_COMPACT_EVERY,
+)
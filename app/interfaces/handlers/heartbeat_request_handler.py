@@ -0,0 +1,20 @@
+# app/interfaces/handlers/heartbeat_request_handler.py
+import logging
+
+from app.core.heartbeat import heartbeat_publisher
+from app.core.nats_client import nats_client
+from app.infrastructure.gpio.gpio_manager import gpio_manager
+
+logging = logging.getLogger(__name__)
+
+
+async def heartbeat_snapshot_handler(msg):
+    """Schedule a full heartbeat snapshot; replies with the current state version."""
+    try:
+        heartbeat_publisher.request_snapshot()
+        logging.info("Heartbeat snapshot requested")
+
+        if msg.reply:
+            await nats_client.respond(msg, {"status": "ok", "version": gpio_manager.state_version})
+    except Exception:
+        logging.exception("Error handling heartbeat snapshot request")
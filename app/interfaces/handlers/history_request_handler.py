@@ -0,0 +1,42 @@
+# app/interfaces/handlers/history_request_handler.py
+import logging
+from datetime import datetime
+
+from app.core.nats_client import nats_client
+from app.infrastructure.storage.event_history import event_history
+
+logging = logging.getLogger(__name__)
+
+
+def _to_unix(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+async def history_request_handler(msg):
+    """Reply with stored relay transitions.
+
+    Request body (all fields optional):
+    {"device_id": 12, "since": "2025-12-01T00:00:00Z", "until": ..., "trigger_reason": "AUTO_TRIGGER", "limit": 100}
+    """
+    try:
+        request = nats_client.decode(msg)
+
+        events = await event_history.query(
+            device_id=request.get("device_id"),
+            since=_to_unix(request.get("since")),
+            until=_to_unix(request.get("until")),
+            trigger_reason=request.get("trigger_reason"),
+            limit=int(request.get("limit", 500)),
+        )
+        response = {"ok": True, "count": len(events), "events": events}
+
+    except Exception as e:
+        logging.exception("Error handling history request")
+        response = {"ok": False, "error": str(e)}
+
+    if msg.reply:
+        await nats_client.respond(msg, response)
@@ -1,60 +1,65 @@
 # app/interfaces/handlers/nats_event_handler.py
-import json
 import logging
 
+from pydantic import ValidationError
+
 from app.application.event_service import event_service
 from app.core.config import settings
 from app.core.nats_client import nats_client
-from app.domain.events.device_events import (DeviceCommandEvent, DeviceCreatedEvent, DeviceDeletedEvent,
-                                             DeviceUpdatedEvent, EventType, PowerReadingEvent)
+from app.core.outbox import PRIORITY_HIGH
+from app.domain.events.device_events import ack_fields, device_event_adapter
+from app.infrastructure.storage.event_dedupe import event_dedupe
 
 logging = logging.getLogger(__name__)
 
 
 async def nats_event_handler(msg):
-    try:
-        raw = json.loads(msg.data.decode())
-        event_type = raw.get("event_type")
+    """Push-subscription callback: process one event and ack it."""
+    if await process_event_message(msg):
+        await msg.ack()
+        logging.info("JetStream ACK sent.")
 
-        logging.info(f"Received raw event: {raw}")
 
-        match event_type:
-            case EventType.DEVICE_CREATED:
-                event = DeviceCreatedEvent(**raw)
+async def process_event_message(msg) -> bool:
+    """Decode and handle one event and send the backend ACK.
 
-            case EventType.DEVICE_UPDATED:
-                event = DeviceUpdatedEvent(**raw)
-                
-            case EventType.DEVICE_DELETED:
-                event = DeviceDeletedEvent(**raw)
-                
-            case EventType.POWER_READING:
-                event = PowerReadingEvent(**raw)
+    Returns True when the JetStream message should be acked; unknown or
+    undecodable events return False and are left for redelivery.
+    Redeliveries of already processed events are acked without side effects.
+    """
+    if event_dedupe.is_duplicate(msg):
+        logging.info(f"Skipping duplicate event delivery (subject={msg.subject})")
+        return True
 
-            case EventType.DEVICE_COMMAND:
-                event = DeviceCommandEvent(**raw)
+    try:
+        try:
+            event = nats_client.validate(msg, device_event_adapter)
+        except ValidationError as e:
+            logging.error(f"Invalid or unknown event on {msg.subject}: {e.errors()[0]['msg']}")
+            return False
 
-            case _:
-                logging.error(f"Unknown event type: {event_type}")
-                return
+        logging.info(f"Received event {event.event_type}")
 
         ok = False
         try:
-            result = await event_service.handle_event(event)
+            # Nothing above awaits, so messages handled concurrently reach
+            # their device queues in delivery order.
+            result = await event_service.dispatch(event)
             ok = bool(result) or result is None  # treat None as success for backward compatibility
         except Exception:
             logging.exception("Error while handling event")
             ok = False
+        event_dedupe.record(msg)
 
-        await msg.ack()
-        logging.info("JetStream ACK sent.")
+    except Exception:
+        logging.exception("Unhandled error while processing NATS event")
+        return False
 
+    try:
         # Backend ACK
         ack_subject = f"device_communication.raspberry.{settings.RASPBERRY_UUID}.events.ack"
-        payload_dict = event.payload.model_dump()
-
-        device_id = payload_dict.get("device_id")
-        manual_state = payload_dict.get("is_on") if "is_on" in payload_dict else payload_dict.get("manual_state")
+        # Read from the validated payload directly (no model_dump copy).
+        device_id, manual_state = ack_fields(event.payload)
 
         # Format przyjazny backendowi:
         #  - top-level device_id
@@ -71,8 +76,10 @@ async def nats_event_handler(msg):
             },
         }
 
-        await nats_client.publish_raw(ack_subject, ack_payload)
+        await nats_client.publish_raw(ack_subject, ack_payload, priority=PRIORITY_HIGH)
         logging.info(f"✔ Backend ACK subject={ack_subject} | sent: {ack_payload}")
 
     except Exception:
-        logging.exception("Unhandled error while processing NATS event")
+        logging.exception("Failed to send backend ACK")
+
+    return True
@@ -1,33 +1,27 @@
 # app/interfaces/handlers/power_reading_handler.py
-import json
 import logging
 
 from pydantic import ValidationError
 
-from app.domain.events.enums import EventType
-from app.domain.events.inverter_events import InverterProductionEvent
-from app.application.power_reading_service import power_reading_service
+from app.core.inverter_mailbox import inverter_mailbox
+from app.core.nats_client import nats_client
+from app.domain.events.inverter_events import inverter_event_adapter
 
 logging = logging.getLogger(__name__)
 
 
 async def inverter_production_handler(msg):
     try:
-        raw = json.loads(msg.data.decode())
-
-        logging.info(f"Inverter production event received: {raw}")
-
         try:
-            event = InverterProductionEvent(**raw)
+            event = nats_client.validate(msg, inverter_event_adapter)
         except ValidationError as e:
-            logging.error(f"Invalid inverter production event: {raw}")
+            logging.error(f"Invalid inverter production event on {msg.subject}: {e.errors()[0]['msg']}")
             return
 
-        if event.event_type != EventType.POWER_READING:
-            logging.error(f"Unexpected event_type for inverter event: {event.event_type}")
-            return
+        logging.debug(f"Inverter production event received: {event.payload!r}")
 
-        await power_reading_service.handle_inverter_power(event)
+        # Processing happens in the mailbox consumer; only the newest reading survives.
+        inverter_mailbox.post(event)
 
     except Exception:
         logging.exception("Error handling inverter production update")
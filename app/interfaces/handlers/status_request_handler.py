@@ -0,0 +1,42 @@
+# app/interfaces/handlers/status_request_handler.py
+import logging
+import time
+
+from app.core.config import settings
+from app.core.nats_client import nats_client
+from app.infrastructure.gpio.gpio_manager import gpio_manager
+
+logging = logging.getLogger(__name__)
+
+
+async def status_request_handler(msg):
+    """Reply with the current relay status from GPIOManager's in-memory view.
+
+    Request body (optional): {"device_id": 12} or {"device_ids": [12, 13]};
+    an empty request returns every device. Ids that are not configured are
+    listed under "unknown".
+    """
+    if not msg.reply:
+        return
+
+    try:
+        request = nats_client.decode(msg) or {}
+
+        device_ids = request.get("device_ids")
+        if request.get("device_id") is not None:
+            device_ids = [request["device_id"]]
+        if device_ids is not None:
+            device_ids = [int(device_id) for device_id in device_ids]
+
+        response = {
+            "ok": True,
+            "uuid": settings.RASPBERRY_UUID,
+            "timestamp": time.time(),
+            **gpio_manager.get_status_snapshot(device_ids),
+        }
+
+    except Exception as e:
+        logging.exception("Error handling status request")
+        response = {"ok": False, "error": str(e)}
+
+    await nats_client.respond(msg, response)
@@ -13,44 +13,76 @@ import inspect
 from app.core.config import settings
 from app.core.gpio_monitor import monitor_gpio_changes
 from app.core.heartbeat import send_heartbeat
+from app.core.inverter_mailbox import inverter_mailbox
+from app.core.jetstream_consumer import events_consumer
 from app.core.nats_client import nats_client
+from app.infrastructure.backend.backend_adapter import backend_adapter
+from app.infrastructure.gpio.device_registry import device_registry
 from app.infrastructure.gpio.gpio_config_storage import gpio_config_storage
-from app.infrastructure.gpio.gpio_controller import gpio_controller
 from app.infrastructure.gpio.gpio_manager import gpio_manager
-from app.interfaces.handlers.nats_event_handler import nats_event_handler
+from app.infrastructure.storage.event_dedupe import event_dedupe
+from app.infrastructure.storage.event_history import event_history
+from app.infrastructure.storage.state_journal import state_journal
+from app.interfaces.handlers.heartbeat_request_handler import heartbeat_snapshot_handler
+from app.interfaces.handlers.history_request_handler import history_request_handler
+from app.interfaces.handlers.nats_event_handler import nats_event_handler, process_event_message
 from app.interfaces.handlers.power_reading_handler import inverter_production_handler
+from app.interfaces.handlers.status_request_handler import status_request_handler
 
 
 async def main():
 
     try:
         await nats_client.connect()
+
+        await backend_adapter.start()
+
+        await event_history.start()
         
         logging.warning("=== LOADED CODE FOR get_devices_status() ===")
         logging.warning(inspect.getsource(gpio_manager.get_devices_status))
 
         devices = gpio_config_storage.load()
-        
-        gpio_controller.load_from_entities(devices)
 
-        gpio_manager.load_devices(devices)
-
-        gpio_controller.initialize_pins()
+        device_registry.load(devices)
 
         inverter_serial = gpio_config_storage.get_inverter_serial()
         if not inverter_serial:
             raise RuntimeError("INVERTER_SERIAL not set in config.json!")
 
+        inverter_mailbox.start()
+
         subject = f"device_communication.inverter.{inverter_serial}.production.update"
         await nats_client.subscribe(subject, inverter_production_handler)
         logging.info(f"Subscribed to inverter power updates: {subject}")
         
         subject = f"device_communication.raspberry.{settings.RASPBERRY_UUID}.events"
-        await nats_client.subscribe_js(subject, nats_event_handler)
+        # Read before consuming: deliveries pending from before a restart
+        # hold the dedupe mark until they have been seen again.
+        durable = nats_client.durable_name(subject, pull=settings.NATS_EVENTS_PULL)
+        event_dedupe.resume(await nats_client.consumer_info(durable))
+        if settings.NATS_EVENTS_PULL:
+            await events_consumer.start(subject, process_event_message)
+        else:
+            await nats_client.subscribe_js(subject, nats_event_handler)
         logging.info(f"Subscribed to Raspberry events. Subject: {subject}")
 
+        subject = f"device_communication.raspberry.{settings.RASPBERRY_UUID}.history"
+        await nats_client.subscribe(subject, history_request_handler)
+        logging.info(f"Serving device event history requests. Subject: {subject}")
+
+        subject = f"device_communication.raspberry.{settings.RASPBERRY_UUID}.heartbeat.snapshot"
+        await nats_client.subscribe(subject, heartbeat_snapshot_handler)
+        logging.info(f"Serving heartbeat snapshot requests. Subject: {subject}")
+
+        subject = f"device_communication.raspberry.{settings.RASPBERRY_UUID}.status"
+        await nats_client.subscribe(subject, status_request_handler)
+        logging.info(f"Serving device status requests. Subject: {subject}")
+
         asyncio.create_task(send_heartbeat())
 
+        asyncio.create_task(monitor_gpio_changes())
+
         logging.info("🚀 Raspberry Agent started")
 
         await asyncio.Event().wait()
@@ -62,11 +94,29 @@ async def main():
         logging.info("🛑 Agent Raspberry stopping via keyboard interrupt.")
 
     finally:
+        await events_consumer.stop()
+
         try:
             await nats_client.close()
         except Exception:
             pass
 
+        await inverter_mailbox.stop()
+
+        try:
+            await backend_adapter.close()
+        except Exception:
+            logging.exception("Failed to close backend adapter.")
+
+        try:
+            await event_history.close()
+        except Exception:
+            logging.exception("Failed to close event history store.")
+
+        gpio_config_storage.flush()
+        state_journal.close()
+        event_dedupe.close()
+
         logging.info("Closing GPIO controller.")
 
 
@@ -0,0 +1,88 @@
+# benchmarks/backend_batch_bench.py
+"""Compare single-post vs batched gzip uploads against a local fake backend.
+
+Usage: python benchmarks/backend_batch_bench.py [events] [rtt_ms]
+"""
+import asyncio
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("RASPBERRY_UUID", "bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="backend_bench_")
+
+import httpx  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.infrastructure.backend.backend_adapter import BackendAdapter  # noqa: E402
+
+
+class FakeBackend:
+    def __init__(self, rtt: float, batch_supported: bool = True):
+        self.rtt = rtt
+        self.batch_supported = batch_supported
+        self.requests = 0
+        self.bytes_received = 0
+        self.events = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.rtt)
+        self.requests += 1
+        self.bytes_received += len(request.content)
+
+        if request.url.path.endswith("/batch/"):
+            if not self.batch_supported:
+                return httpx.Response(404)
+            events = json.loads(gzip.decompress(request.content))["events"]
+            self.events += len(events)
+            results = [{"idempotency_key": e["idempotency_key"], "ok": True, "status": 201} for e in events]
+            return httpx.Response(200, json={"results": results})
+
+        self.events += 1
+        return httpx.Response(201, json={})
+
+
+async def run(label: str, events: int, rtt: float, batch: bool, concurrency: int):
+    settings.BACKEND_BATCH_ENABLED = batch
+    settings.BACKEND_MAX_CONCURRENCY = concurrency
+    settings.BACKEND_QUEUE_SIZE = events
+
+    backend = FakeBackend(rtt)
+    adapter = BackendAdapter("http://fake-backend")
+    await adapter.start(transport=httpx.MockTransport(backend.handle))
+
+    started = time.perf_counter()
+    for i in range(events):
+        adapter.log_device_event(device_id=i % 16, pin_state=bool(i % 2), trigger_reason="AUTO_TRIGGER", power_kw=1.5)
+    await adapter.shipper._queue.join()
+    elapsed = time.perf_counter() - started
+
+    await adapter.close()
+    print(
+        f"{label:<28} events={backend.events:>6} requests={backend.requests:>6} "
+        f"bytes={backend.bytes_received:>9} events/s={backend.events / elapsed:>9.0f}"
+    )
+
+
+async def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 20.0) / 1000.0
+
+    print(f"events={events} simulated_rtt={rtt * 1000:.0f}ms")
+    await run("single, sequential (legacy)", events, rtt, batch=False, concurrency=1)
+    await run("single, 4 workers", events, rtt, batch=False, concurrency=4)
+    await run("batch gzip, 1 worker", events, rtt, batch=True, concurrency=1)
+
+
+if __name__ == "__main__":
+    import logging
+
+    logging.disable(logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+# benchmarks/config_storage_bench.py
+"""Disk writes and wall time for 1000 relay state changes.
+
+"legacy" reproduces the previous storage (re-read, re-parse and rewrite
+config.json on every change); "cached" is the current GPIOConfigStorage.
+
+Usage: python benchmarks/config_storage_bench.py [changes]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("RASPBERRY_UUID", "bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="config_bench_")
+
+from app.domain.gpio.entities import GPIODevice  # noqa: E402
+from app.infrastructure.gpio.gpio_config_storage import GPIOConfigStorage  # noqa: E402
+from app.infrastructure.storage.state_journal import state_journal  # noqa: E402
+
+DEVICES = 8
+
+
+class LegacyStorage:
+    def __init__(self, path: Path):
+        self.path = path
+        self.disk_reads = 0
+        self.disk_writes = 0
+
+    def load(self):
+        with open(self.path) as f:
+            data = json.load(f)
+        self.disk_reads += 1
+        return [GPIODevice(**p) for p in data["pins"]]
+
+    def update_state(self, device_id: int, is_on: bool):
+        devices = self.load()
+        for d in devices:
+            if d.device_id == device_id:
+                d.is_on = is_on
+        with open(self.path) as f:
+            raw = json.load(f)
+        self.disk_reads += 1
+        raw["pins"] = [d.model_dump() for d in devices]
+        with open(self.path, "w") as f:
+            json.dump(raw, f, indent=2)
+        self.disk_writes += 1
+
+    def flush(self):
+        pass
+
+
+def make_config(path: Path):
+    pins = [
+        {"device_id": i, "device_number": i, "pin_number": 2 + i, "mode": "AUTO_POWER",
+         "power_threshold_kw": 1.0, "is_on": False}
+        for i in range(DEVICES)
+    ]
+    path.write_text(json.dumps({"raspberry_uuid": "bench", "pins": pins, "inverter_serial": "1"}, indent=2))
+
+
+async def run(label: str, changes: int, legacy: bool):
+    path = Path(tempfile.mkdtemp()) / "config.json"
+    make_config(path)
+    storage = LegacyStorage(path) if legacy else GPIOConfigStorage(path=path, debounce=1.0)
+    journal_before = state_journal.bytes_written
+
+    started = time.perf_counter()
+    for i in range(changes):
+        # Mirrors AutoPowerService: a load() per reading plus a state update.
+        storage.load()
+        storage.update_state(i % DEVICES, bool((i // DEVICES) % 2))
+        if i % 50 == 0:
+            await asyncio.sleep(0)
+    storage.flush()
+    elapsed = time.perf_counter() - started
+    config_bytes = storage.disk_writes * path.stat().st_size
+
+    print(
+        f"{label:<8} changes={changes} config_writes={storage.disk_writes:>5} "
+        f"config_bytes={config_bytes:>8} journal_bytes={state_journal.bytes_written - journal_before:>6} "
+        f"disk_reads={storage.disk_reads:>5} elapsed={elapsed * 1000:8.1f}ms"
+    )
+
+
+async def main():
+    changes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    await run("legacy", changes, legacy=True)
+    await run("cached", changes, legacy=False)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+# benchmarks/event_decode_bench.py
+"""Messages/sec for decoding events: per-type dispatch vs the cached TypeAdapter.
+
+"before" is the previous handler path: json.loads, a match on
+event_type, Model(**raw) and model_dump() for the ACK fields. "after" is
+NATSClient.validate with the precompiled discriminated union (validate_json
+straight from the bytes) and the ACK fields read from the validated payload
+with ack_fields, which decides once per payload class which fields exist.
+
+Usage: python benchmarks/event_decode_bench.py [iterations]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("RASPBERRY_UUID", "beebc09e-f272-4471-8c3e-4e9021775876")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="decode_bench_")
+
+from app.core.nats_client import nats_client  # noqa: E402
+from app.domain.events.device_events import (  # noqa: E402
+    DeviceCommandEvent,
+    DeviceCreatedEvent,
+    DeviceDeletedEvent,
+    DeviceUpdatedEvent,
+    PowerReadingEvent,
+    ack_fields,
+    device_event_adapter,
+)
+from app.domain.events.inverter_events import InverterProductionEvent, inverter_event_adapter  # noqa: E402
+
+MODELS = {
+    "DEVICE_CREATED": DeviceCreatedEvent,
+    "DEVICE_UPDATED": DeviceUpdatedEvent,
+    "DEVICE_DELETED": DeviceDeletedEvent,
+    "POWER_READING": PowerReadingEvent,
+    "DEVICE_COMMAND": DeviceCommandEvent,
+}
+
+SAMPLES = {
+    "DEVICE_CREATED": {"device_id": 12, "device_number": 3, "mode": "AUTO_POWER", "threshold_kw": 1.5,
+                       "priority": 2, "rated_load_kw": 2.0},
+    "DEVICE_UPDATED": {"device_id": 12, "mode": "MANUAL", "threshold_kw": None, "priority": 0},
+    "DEVICE_DELETED": {"device_id": 12},
+    "POWER_READING": {"inverter_id": 3, "power_w": 4217.0, "device_ids": [10, 11, 12, 13]},
+    "DEVICE_COMMAND": {"device_id": 12, "command": "SET_STATE", "is_on": True},
+}
+
+INVERTER = {
+    "event_type": "POWER_READING",
+    "payload": {"inverter_id": 3, "serial_number": "1000000165855382", "active_power": 4.217, "status": "OK",
+                "timestamp": "2025-06-01T12:00:00+00:00", "error_message": None},
+}
+
+
+class Msg:
+    subject = "bench"
+    headers = None
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def before(msg: Msg):
+    raw = json.loads(msg.data.decode())
+    model = MODELS.get(raw.get("event_type"))
+    event = model(**raw)
+    payload = event.payload.model_dump()
+    return payload.get("device_id"), payload.get("is_on") if "is_on" in payload else payload.get("manual_state")
+
+
+def after(msg: Msg):
+    event = nats_client.validate(msg, device_event_adapter)
+    return ack_fields(event.payload)
+
+
+def inverter_before(msg: Msg):
+    return InverterProductionEvent(**json.loads(msg.data.decode()))
+
+
+def inverter_after(msg: Msg):
+    return nats_client.validate(msg, inverter_event_adapter)
+
+
+def rates(old, new, msg: Msg, iterations: int, repeat: int = 7) -> tuple:
+    """Best of `repeat` runs each, alternating old and new so both see the same machine load."""
+    best = {old: float("inf"), new: float("inf")}
+    for _ in range(repeat):
+        for fn in (old, new):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                fn(msg)
+            best[fn] = min(best[fn], time.perf_counter() - started)
+    return iterations / best[old], iterations / best[new]
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    cases = [
+        (event_type, Msg(json.dumps({"event_type": event_type, "payload": payload}).encode()), before, after)
+        for event_type, payload in SAMPLES.items()
+    ]
+    cases.append(("INVERTER", Msg(json.dumps(INVERTER).encode()), inverter_before, inverter_after))
+
+    for label, msg, old, new in cases:
+        assert old(msg) == new(msg) or label == "INVERTER"
+        old_rate, new_rate = rates(old, new, msg, iterations)
+        print(f"{label:<15} before={old_rate:9.0f} msg/s after={new_rate:9.0f} msg/s ({new_rate / old_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/gpio_backend_bench.py
+"""Hardware operations per N-pin snapshot / bulk write, per GPIO backend.
+
+"rpi" is RPiGPIOBackend over MockGPIO (one driver call per pin); "gpiod" is
+LibgpiodBackend over a fake libgpiod module that counts GET/SET_VALUES
+ioctls, so it runs without a gpiochip. Pins are set up together, as at
+startup.
+
+Usage: python benchmarks/gpio_backend_bench.py [pins]
+"""
+import contextlib
+import enum
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("RASPBERRY_UUID", "bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="gpio_bench_")
+
+from app.infrastructure.gpio import hardware  # noqa: E402
+
+ROUNDS = 1000
+
+
+class FakeValue(enum.Enum):
+    INACTIVE = 0
+    ACTIVE = 1
+
+
+class FakeDirection(enum.Enum):
+    INPUT = 1
+    OUTPUT = 2
+
+
+class FakeLineRequest:
+    def __init__(self, offsets, output_values):
+        self.offsets = set(offsets)
+        self.values = dict(output_values)
+        self.ioctls = 0
+
+    def get_values(self, offsets):
+        self.ioctls += 1
+        return [self.values[offset] for offset in offsets]
+
+    def set_values(self, values):
+        self.ioctls += 1
+        self.values.update(values)
+
+    def release(self):
+        pass
+
+
+class FakeGpiod:
+    LineSettings = staticmethod(lambda direction: direction)
+
+    def __init__(self):
+        self.requests = []
+
+    def request_lines(self, path, consumer, config, output_values):
+        (offsets,) = config
+        request = FakeLineRequest(offsets, output_values)
+        self.requests.append(request)
+        return request
+
+
+def run(label: str, backend: hardware.GPIOBackend, pins: list):
+    backend.setup_outputs({pin: hardware.GPIO.HIGH for pin in pins})
+
+    ops_before = backend.hw_ops
+    snapshot = backend.read_many(pins)
+    snapshot_ops = backend.hw_ops - ops_before
+    assert snapshot == {pin: hardware.GPIO.HIGH for pin in pins}
+
+    ops_before = backend.hw_ops
+    backend.write_many({pin: hardware.GPIO.LOW for pin in pins})
+    write_ops = backend.hw_ops - ops_before
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        backend.read_many(pins)
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"{label:<6} pins={len(pins):>3} snapshot_ops={snapshot_ops:>3} write_ops={write_ops:>3} "
+        f"snapshot_us={elapsed / ROUNDS * 1e6:8.1f}"
+    )
+    return snapshot_ops, write_ops
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    pins = list(range(2, 2 + count))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        rpi = hardware.RPiGPIOBackend(hardware.MockGPIO)
+    # MockGPIO prints every call; keep the report readable.
+    with contextlib.redirect_stdout(io.StringIO()) as quiet:
+        rpi_ops = run("rpi", rpi, pins)
+    print(quiet.getvalue().splitlines()[-1])
+
+    fake = FakeGpiod()
+    hardware.gpiod, hardware.Value, hardware.Direction = fake, FakeValue, FakeDirection
+    gpiod_ops = run("gpiod", hardware.LibgpiodBackend("/dev/gpiochip-fake"), pins)
+
+    assert rpi_ops == (count, count), rpi_ops
+    assert gpiod_ops == (1, 1), gpiod_ops
+
+
+if __name__ == "__main__":
+    main()
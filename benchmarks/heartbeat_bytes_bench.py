@@ -0,0 +1,94 @@
+# benchmarks/heartbeat_bytes_bench.py
+"""Heartbeat bytes per hour per agent: full payload every beat vs beat/delta/snapshot.
+
+Simulates one hour of HEARTBEAT_INTERVAL=30 s beats (120 beats, time
+compressed) for an agent with 8 devices and a number of relay changes
+spread over the hour, and counts the bytes handed to JetStream.
+
+Usage: python benchmarks/heartbeat_bytes_bench.py [changes_per_hour] [devices]
+"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("RASPBERRY_UUID", "beebc09e-f272-4471-8c3e-4e9021775876")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["GPIO_BACKEND"] = "sim"
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="heartbeat_bench_")
+
+from app.core import heartbeat  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.nats_client import nats_client  # noqa: E402
+from app.domain.gpio.entities import GPIODevice  # noqa: E402
+from app.infrastructure.gpio.device_registry import device_registry  # noqa: E402
+from app.infrastructure.gpio.gpio_controller import gpio_controller  # noqa: E402
+from app.infrastructure.gpio.gpio_manager import gpio_manager  # noqa: E402
+
+BEATS_PER_HOUR = 3600 // 30
+TICK = 0.01  # one simulated heartbeat interval, in real seconds
+
+
+async def run(label: str, delta: bool, changes: int, devices: int):
+    sizes = []
+
+    async def capture(subject, data, content_type=None):
+        sizes.append(len(data))
+        acked = asyncio.get_running_loop().create_future()
+        acked.set_result(None)
+        return acked
+
+    nats_client.js_publish_bytes_nowait = capture
+    settings.HEARTBEAT_DELTA_ENABLED = delta
+    settings.HEARTBEAT_INTERVAL = TICK
+    settings.HEARTBEAT_DELTA_WINDOW_MS = 1
+
+    device_registry.load([
+        GPIODevice(device_id=100 + i, device_number=i + 1, pin_number=5 + i, mode="AUTO_POWER",
+                   power_threshold_kw=1.0 + i)
+        for i in range(devices)
+    ])
+    publisher = heartbeat.HeartbeatPublisher()
+    task = asyncio.create_task(publisher.run())
+
+    rng = random.Random(3)
+    change_at = sorted(rng.uniform(0, BEATS_PER_HOUR * TICK) for _ in range(changes))
+    elapsed = 0.0
+    for at in change_at:
+        await asyncio.sleep(at - elapsed)
+        elapsed = at
+        device_id = 100 + rng.randrange(devices)
+        is_on = not gpio_manager.get_is_on(device_id)
+        gpio_controller.set_state(device_id, is_on)
+        gpio_manager.set_state(device_id, is_on)
+    await asyncio.sleep(BEATS_PER_HOUR * TICK - elapsed)
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    gpio_manager.state_listeners.remove(publisher._on_state_changed)
+
+    frames = publisher.frames
+    print(
+        f"{label:<8} frames={len(sizes):>4} (beat={frames['beat']}, delta={frames['delta']}, "
+        f"snapshot={frames['snapshot']}) bytes/hour={sum(sizes):>7}"
+    )
+    return sum(sizes)
+
+
+async def main():
+    logging.disable(logging.CRITICAL)
+    changes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    devices = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    before = await run("before", delta=False, changes=changes, devices=devices)
+    after = await run("after", delta=True, changes=changes, devices=devices)
+    print(f"reduction: {100 * (1 - after / before):.1f}% ({changes} relay changes/hour, {devices} devices)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+# benchmarks/hysteresis_replay_bench.py
+"""Replay an inverter power trace through PowerReadingService.
+
+Compares the plain threshold rule ("before": no band, no dwell) with a
+hysteresis band and minimum on/off times ("after"), on a simulated clock,
+and reports relay switches and the downstream I/O they cause: GPIO writes,
+state journal bytes, history rows and backend events/bytes.
+
+The trace is a CSV of "seconds,power" lines. Without one, a deterministic
+noisy cloudy-day trace (5 s sampling, 8 h) is generated.
+
+Usage: python benchmarks/hysteresis_replay_bench.py [trace.csv]
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+WORKDIR = tempfile.mkdtemp(prefix="hysteresis_bench_")
+os.environ.setdefault("RASPBERRY_UUID", "bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["GPIO_BACKEND"] = "sim"
+os.environ["LOG_DIR"] = WORKDIR
+os.environ["CONFIG_FILE"] = str(Path(WORKDIR) / "config.json")
+os.environ["BACKEND_URL"] = "http://backend.invalid"
+os.environ["BACKEND_QUEUE_SIZE"] = "1000000"
+
+THRESHOLDS = [1.0, 2.0, 3.0, 4.0]
+
+Path(os.environ["CONFIG_FILE"]).write_text(json.dumps({
+    "raspberry_uuid": "bench",
+    "inverter_serial": "1",
+    "pins": [
+        {"device_id": i + 1, "device_number": i + 1, "pin_number": 5 + i, "mode": "AUTO_POWER",
+         "power_threshold_kw": threshold, "active_low": True}
+        for i, threshold in enumerate(THRESHOLDS)
+    ],
+}))
+
+from app.application.power_reading_service import PowerReadingService  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.domain.events.inverter_events import InverterProductionEvent  # noqa: E402
+from app.infrastructure.backend.backend_adapter import backend_adapter  # noqa: E402
+from app.infrastructure.gpio.device_registry import device_registry  # noqa: E402
+from app.infrastructure.gpio.gpio_config_storage import gpio_config_storage  # noqa: E402
+from app.infrastructure.gpio.gpio_controller import gpio_controller  # noqa: E402
+from app.infrastructure.storage.event_history import event_history  # noqa: E402
+from app.infrastructure.storage.state_journal import state_journal  # noqa: E402
+
+
+def synthetic_trace(hours: float = 8.0, step: float = 5.0):
+    rng = random.Random(42)
+    samples = []
+    cloud = 1.0
+    for i in range(int(hours * 3600 / step)):
+        t = i * step
+        clear_sky = 5.0 * math.sin(math.pi * t / (hours * 3600))
+        cloud = min(1.0, max(0.3, cloud + rng.gauss(0, 0.05)))
+        samples.append((t, max(0.0, clear_sky * cloud + rng.gauss(0, 0.15))))
+    return samples
+
+
+def load_trace(path: str):
+    samples = []
+    for line in Path(path).read_text().splitlines():
+        if line.strip() and not line.startswith("#"):
+            t, power = line.split(",")[:2]
+            samples.append((float(t), float(power)))
+    return samples
+
+
+async def replay(label: str, trace, band: float, min_on: float, min_off: float):
+    settings.AUTO_POWER_HYSTERESIS_KW = band
+    settings.AUTO_POWER_MIN_ON_SECONDS = min_on
+    settings.AUTO_POWER_MIN_OFF_SECONDS = min_off
+
+    device_registry.load(gpio_config_storage.load())
+    backend_adapter.shipper.drain_pending()
+    event_history._buffer.clear()
+
+    service = PowerReadingService()
+    now = [0.0]
+    service.clock = lambda: now[0]
+
+    writes_before = gpio_controller.backend.native.writes
+    journal_before = state_journal.bytes_written
+
+    for t, power in trace:
+        now[0] = t
+        event = InverterProductionEvent(
+            event_type="POWER_READING",
+            payload={
+                "inverter_id": 1,
+                "serial_number": "1",
+                "active_power": power,
+                "status": "OK",
+                "timestamp": datetime.now(timezone.utc),
+            },
+        )
+        await service.handle_inverter_power(event)
+
+    events = backend_adapter.shipper.drain_pending()
+    backend_bytes = sum(len(json.dumps(e)) for e in events)
+    print(
+        f"{label:<7} samples={len(trace)} switches={service.switches:>5} deferred={service.deferred:>5} "
+        f"gpio_writes={gpio_controller.backend.native.writes - writes_before:>5} "
+        f"journal_bytes={state_journal.bytes_written - journal_before:>6} "
+        f"history_rows={len(event_history._buffer):>5} backend_events={len(events):>5} "
+        f"backend_bytes={backend_bytes:>7}"
+    )
+
+
+async def main():
+    logging.disable(logging.CRITICAL)
+    trace = load_trace(sys.argv[1]) if len(sys.argv) > 1 else synthetic_trace()
+
+    await replay("before", trace, band=0.0, min_on=0.0, min_off=0.0)
+    await replay("after", trace, band=0.3, min_on=300.0, min_off=120.0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
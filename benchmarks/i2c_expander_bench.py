@@ -0,0 +1,84 @@
+# benchmarks/i2c_expander_bench.py
+"""Switch 64 relays on four MCP23017 expanders over a simulated I2C bus.
+
+"per-relay" switches each device with GPIOController.set_state (one bus
+transaction per relay); "bulk" uses GPIOController.set_states, which
+updates the cached port latches and writes each chip once.
+
+Usage: python benchmarks/i2c_expander_bench.py [transaction_latency_ms]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("RASPBERRY_UUID", "bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["GPIO_BACKEND"] = "sim"
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="i2c_bench_")
+
+from app.domain.gpio.entities import GPIODevice  # noqa: E402
+from app.infrastructure.gpio.gpio_controller import GPIOController  # noqa: E402
+from app.infrastructure.gpio.hardware import SimulatedGPIOBackend  # noqa: E402
+from app.infrastructure.gpio.i2c_expander import (  # noqa: E402
+    MCP23017,
+    ExpanderGPIOBackend,
+    RoutedGPIOBackend,
+    SimulatedI2CBus,
+    encode_expander_pin,
+)
+
+CHIPS = 4
+RELAYS = CHIPS * 16
+
+
+def make_controller(latency: float):
+    bus = SimulatedI2CBus(1, latency=latency)
+    expanders = ExpanderGPIOBackend(bus_factory=lambda _: bus)
+    controller = GPIOController(backend=RoutedGPIOBackend(SimulatedGPIOBackend(), expanders))
+
+    devices = [
+        GPIODevice(
+            device_id=i + 1, device_number=i + 1, mode="MANUAL", power_threshold_kw=None, active_low=True,
+            pin_number=encode_expander_pin(MCP23017, 1, 0x20 + i // 16, (i // 8) % 2, i % 8),
+        )
+        for i in range(RELAYS)
+    ]
+    controller.load_from_entities(devices)
+    controller.initialize_pins()
+    return controller, bus
+
+
+def run(label: str, latency: float, bulk: bool):
+    controller, bus = make_controller(latency)
+    before = bus.transactions
+
+    started = time.perf_counter()
+    for is_on in (True, False):
+        if bulk:
+            assert controller.set_states({device_id: is_on for device_id in range(1, RELAYS + 1)})
+        else:
+            for device_id in range(1, RELAYS + 1):
+                assert controller.set_state(device_id, is_on)
+    elapsed = (time.perf_counter() - started) / 2
+
+    transactions = (bus.transactions - before) // 2
+    print(f"{label:<10} relays={RELAYS} i2c_transactions={transactions:>3} switch_time={elapsed * 1000:7.2f}ms")
+    return transactions
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 0.3) / 1000.0
+
+    per_relay = run("per-relay", latency, bulk=False)
+    bulk = run("bulk", latency, bulk=True)
+    assert per_relay == RELAYS and bulk == CHIPS, (per_relay, bulk)
+
+
+if __name__ == "__main__":
+    main()
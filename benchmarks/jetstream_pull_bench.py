@@ -0,0 +1,119 @@
+# benchmarks/jetstream_pull_bench.py
+"""Drain a JetStream backlog with the push subscription vs the pull consumer.
+
+Needs a local nats-server with JetStream enabled (nats-server -js). A
+throwaway stream is created, N events are published while no consumer is
+running (as after a reconnect) and the time to process and ack all of
+them is measured for the push subscription (ack per message, as
+nats_event_handler does) and for JetStreamPullConsumer (batched fetch,
+acks sent as each handler finishes, up to max_ack_pending outstanding). The stream is deleted afterwards.
+
+Usage: python benchmarks/jetstream_pull_bench.py [messages] [batch]
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("RASPBERRY_UUID", "beebc09e-f272-4471-8c3e-4e9021775876")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="pull_bench_")
+if len(sys.argv) > 2:
+    os.environ["NATS_PULL_BATCH"] = sys.argv[2]
+
+import nats  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.jetstream_consumer import JetStreamPullConsumer  # noqa: E402
+from app.core.nats_client import nats_client  # noqa: E402
+
+STREAM = "pull_bench"
+PUSH_SUBJECT = "pull_bench.push.events"
+PULL_SUBJECT = "pull_bench.pull.events"
+
+
+def event(i: int) -> bytes:
+    return json.dumps({
+        "event_type": "DEVICE_COMMAND",
+        "payload": {"device_id": i % 8, "is_on": i % 2 == 0},
+    }).encode()
+
+
+async def publish_backlog(subject: str, messages: int):
+    acks = [nats_client.js.publish(subject, event(i)) for i in range(messages)]
+    await asyncio.gather(*acks)
+
+
+async def run_push(messages: int) -> float:
+    done = asyncio.Event()
+    handled = 0
+
+    async def handler(msg):
+        nonlocal handled
+        json.loads(msg.data)
+        await msg.ack()
+        handled += 1
+        if handled == messages:
+            done.set()
+
+    await publish_backlog(PUSH_SUBJECT, messages)
+    started = time.perf_counter()
+    sub = await nats_client.js.subscribe(PUSH_SUBJECT, durable="pull_bench_push", cb=handler)
+    await done.wait()
+    await nats_client.nc.flush()
+    elapsed = time.perf_counter() - started
+    await sub.unsubscribe()
+    return elapsed
+
+
+async def run_pull(messages: int) -> float:
+    consumer = JetStreamPullConsumer()
+
+    async def handler(msg):
+        json.loads(msg.data)
+        return True
+
+    # Create the durable first: new pull durables start at new messages.
+    await consumer.start(PULL_SUBJECT, handler)
+    await consumer.stop()
+    await publish_backlog(PULL_SUBJECT, messages)
+
+    started = time.perf_counter()
+    await consumer.start(PULL_SUBJECT, handler)
+    while consumer.acked < messages:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    await consumer.stop()
+
+    metrics = consumer.get_metrics()
+    print(f"         pull batches={metrics['batches']} avg_batch_size={metrics['avg_batch_size']}")
+    return elapsed
+
+
+async def main():
+    logging.disable(logging.CRITICAL)
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    # Connect directly: the agent's connect() insists on the backend's stream.
+    nats_client.nc = await nats.connect(settings.NATS_URL)
+    nats_client.js = nats_client.nc.jetstream()
+    await nats_client.js.add_stream(name=STREAM, subjects=[f"{STREAM}.>"])
+    try:
+        push = await run_push(messages)
+        print(f"push     messages={messages} elapsed={push:6.3f}s throughput={messages / push:9.0f} msg/s")
+        pull = await run_pull(messages)
+        print(f"pull     messages={messages} elapsed={pull:6.3f}s throughput={messages / pull:9.0f} msg/s")
+        print(f"speedup: {push / pull:.2f}x")
+    finally:
+        await nats_client.js.delete_stream(STREAM)
+        await nats_client.nc.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+# benchmarks/nats_codec_bench.py
+"""Encode/decode time and wire size per NATS codec.
+
+Payloads: an inverter production update and heartbeat snapshots for 8
+and 64 devices. Every codec available in this environment is measured
+with and without deflate; decoding goes through NATSClient.decode, as
+the handlers do.
+
+Usage: python benchmarks/nats_codec_bench.py [iterations]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("RASPBERRY_UUID", "beebc09e-f272-4471-8c3e-4e9021775876")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="codec_bench_")
+
+from app.core.nats_client import CODECS, NATSClient  # noqa: E402
+
+
+class Msg:
+    def __init__(self, data: bytes, headers: dict):
+        self.data = data
+        self.headers = headers
+
+
+def inverter_payload():
+    return {
+        "event_type": "POWER_READING",
+        "payload": {
+            "inverter_id": 3,
+            "serial_number": "1000000165855382",
+            "active_power": 4.217,
+            "status": "OK",
+            "timestamp": datetime(2025, 6, 1, 12, 0, tzinfo=timezone.utc).isoformat(),
+            "error_message": None,
+        },
+    }
+
+
+def heartbeat_payload(devices: int):
+    status = [
+        {"device_id": 100 + i, "pin": 5 + i, "is_on": i % 2 == 0, "mode": "AUTO_POWER", "threshold": 1.5 + i}
+        for i in range(devices)
+    ]
+    return {
+        "event_type": "HEARTBEAT",
+        "payload": {
+            "uuid": os.environ["RASPBERRY_UUID"],
+            "status": "online",
+            "kind": "snapshot",
+            "timestamp": 1748779200,
+            "version": 4182,
+            "gpio_count": devices,
+            "device_count": devices,
+            "gpio": {5 + i: i % 2 for i in range(devices)},
+            "devices": status,
+            "backend": {"queue_depth": 0, "sent": 1234, "failed": 2, "avg_latency_ms": 41.7,
+                        "offline": {"segments": 1, "pending_bytes": 0}, "circuit": {"state": "closed"}},
+        },
+    }
+
+
+def measure(client: NATSClient, codec, payload, iterations: int):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        data, headers = client.encode(payload, codec)
+    encode_us = (time.perf_counter() - started) / iterations * 1e6
+
+    msg = Msg(data, headers)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        client.decode(msg)
+    decode_us = (time.perf_counter() - started) / iterations * 1e6
+    return len(data), encode_us, decode_us
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    payloads = {
+        "inverter": inverter_payload(),
+        "heartbeat/8": heartbeat_payload(8),
+        "heartbeat/64": heartbeat_payload(64),
+    }
+
+    for label, payload in payloads.items():
+        for codec in CODECS.values():
+            for compress in (False, True):
+                client = NATSClient()
+                client.compress = compress
+                client.compress_min_bytes = 1 if compress else 0
+                size, encode_us, decode_us = measure(client, codec, payload, iterations)
+                name = codec.content_type.split("/")[1] + ("+deflate" if compress else "")
+                print(f"{label:<13} {name:<17} bytes={size:>6} encode={encode_us:7.1f}us decode={decode_us:7.1f}us")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/status_request_bench.py
+"""Latency of the status request/reply endpoint under concurrent requests.
+
+Requests are answered from GPIOManager's in-memory status view; the GPIO
+simulator is given a per-operation latency and the benchmark checks that
+no hardware read happens while serving them.
+
+By default the handler is driven in-process (decode, snapshot, encode,
+reply). With --nats it subscribes on a local nats-server and measures the
+full request/reply round trip.
+
+Usage: python benchmarks/status_request_bench.py [--nats] [devices]
+"""
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("RASPBERRY_UUID", "beebc09e-f272-4471-8c3e-4e9021775876")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["GPIO_BACKEND"] = "sim"
+os.environ["GPIO_SIM_LATENCY_MS"] = "5"
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="status_bench_")
+
+import nats  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.nats_client import nats_client  # noqa: E402
+from app.domain.gpio.entities import GPIODevice  # noqa: E402
+from app.infrastructure.gpio.device_registry import device_registry  # noqa: E402
+from app.infrastructure.gpio.gpio_controller import gpio_controller  # noqa: E402
+from app.interfaces.handlers.status_request_handler import status_request_handler  # noqa: E402
+
+SUBJECT = f"device_communication.raspberry.{settings.RASPBERRY_UUID}.status"
+CONCURRENCY = (1, 16, 64, 256)
+
+
+class Msg:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.headers = None
+        self.reply = "_INBOX.bench"
+
+
+class ReplyCapture:
+    async def publish(self, subject, data, headers=None):
+        json.loads(data)
+
+
+def request_body(i: int, devices: int) -> bytes:
+    return b"{}" if i % 2 == 0 else json.dumps({"device_id": 100 + i % devices}).encode()
+
+
+async def in_process(i: int, devices: int) -> float:
+    started = time.perf_counter()
+    await status_request_handler(Msg(request_body(i, devices)))
+    return time.perf_counter() - started
+
+
+async def over_nats(i: int, devices: int) -> float:
+    started = time.perf_counter()
+    reply = await nats_client.nc.request(SUBJECT, request_body(i, devices), timeout=5)
+    json.loads(reply.data)
+    return time.perf_counter() - started
+
+
+async def main():
+    logging.disable(logging.CRITICAL)
+    args = [a for a in sys.argv[1:] if a != "--nats"]
+    use_nats = "--nats" in sys.argv
+    devices = int(args[0]) if args else 16
+
+    device_registry.load([
+        GPIODevice(device_id=100 + i, device_number=i + 1, pin_number=5 + i, mode="MANUAL",
+                   power_threshold_kw=None)
+        for i in range(devices)
+    ])
+
+    if use_nats:
+        nats_client.nc = await nats.connect(settings.NATS_URL)
+        await nats_client.nc.subscribe(SUBJECT, cb=status_request_handler)
+        request = over_nats
+    else:
+        nats_client.nc = ReplyCapture()
+        request = in_process
+
+    hardware = gpio_controller.backend.native
+    reads_before = hardware.reads
+    for concurrency in CONCURRENCY:
+        latencies = []
+        for _ in range(max(1, 2000 // concurrency)):
+            latencies += await asyncio.gather(*(request(i, devices) for i in range(concurrency)))
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1e3
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1e3
+        print(f"{'nats' if use_nats else 'in-process'} concurrency={concurrency:>3} requests={len(latencies):>5} "
+              f"p50={p50:7.3f}ms p99={p99:7.3f}ms")
+
+    assert hardware.reads == reads_before, "status requests must not touch GPIO hardware"
+    print(f"hardware reads while serving: {hardware.reads - reads_before}")
+
+    if use_nats:
+        await nats_client.nc.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+# benchmarks/surplus_allocator_bench.py
+"""Per-reading cost of surplus allocation at 10 / 100 / 1000 devices.
+
+"naive" walks every device in priority order on each reading and switches
+on each one that still fits (O(n)); "allocator" is SurplusAllocator, the
+same greedy over a segment tree of min loads (O((on + changes) log n));
+"service" is the full PowerReadingService.handle_inverter_power
+over the simulated GPIO backend.
+
+Usage: python benchmarks/surplus_allocator_bench.py [readings]
+"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault("RASPBERRY_UUID", "bench")
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["GPIO_BACKEND"] = "sim"
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="allocator_bench_")
+
+from app.application.power_reading_service import PowerReadingService  # noqa: E402
+from app.domain.events.inverter_events import InverterProductionEvent  # noqa: E402
+from app.domain.gpio.entities import GPIODevice  # noqa: E402
+from app.domain.gpio.surplus_allocator import SurplusAllocator  # noqa: E402
+from app.infrastructure.gpio.device_registry import device_registry  # noqa: E402
+
+
+def make_devices(count: int):
+    rng = random.Random(count)
+    return [
+        GPIODevice(
+            device_id=i + 1, device_number=i + 1, pin_number=1000 + i, mode="AUTO_POWER",
+            power_threshold_kw=None, priority=rng.randrange(10), rated_load_kw=rng.choice([0.5, 1.0, 2.0]),
+        )
+        for i in range(count)
+    ]
+
+
+def power_walk(total_load: float, readings: int):
+    # Slowly drifting surplus, as from a 5 s inverter feed.
+    rng = random.Random(0)
+    power = total_load / 2
+    for _ in range(readings):
+        power = min(total_load, max(0.0, power + rng.gauss(0, total_load / 200)))
+        yield power
+
+
+def naive_allocate(devices, states, power):
+    changes = []
+    remaining = power
+    for device in sorted(devices, key=lambda d: (d.priority, d.device_id)):
+        target = device.rated_load_kw <= remaining
+        if target:
+            remaining -= device.rated_load_kw
+        if states.get(device.device_id) != target:
+            states[device.device_id] = target
+            changes.append((device.device_id, target))
+    return changes
+
+
+def reading(power: float) -> InverterProductionEvent:
+    return InverterProductionEvent(
+        event_type="POWER_READING",
+        payload={"inverter_id": 1, "serial_number": "1", "active_power": power,
+                 "status": "OK", "timestamp": datetime.now(timezone.utc)},
+    )
+
+
+async def run(count: int, readings: int):
+    devices = make_devices(count)
+    total = sum(d.rated_load_kw for d in devices)
+    powers = list(power_walk(total, readings))
+
+    states = {}
+    started = time.perf_counter()
+    naive_changes = sum(len(naive_allocate(devices, states, p)) for p in powers)
+    naive_us = (time.perf_counter() - started) / readings * 1e6
+
+    allocator = SurplusAllocator()
+    allocator.rebuild(devices)
+    started = time.perf_counter()
+    allocator_changes = sum(len(allocator.allocate(p)) for p in powers)
+    allocator_us = (time.perf_counter() - started) / readings * 1e6
+    assert naive_changes == allocator_changes, (naive_changes, allocator_changes)
+
+    device_registry.load(devices)
+    service = PowerReadingService()
+    events = [reading(p) for p in powers]
+    started = time.perf_counter()
+    for event in events:
+        await service.handle_inverter_power(event)
+    service_us = (time.perf_counter() - started) / readings * 1e6
+
+    print(
+        f"devices={count:>5} readings={readings} changes={allocator_changes:>6} "
+        f"naive={naive_us:9.1f}us allocator={allocator_us:7.1f}us service={service_us:9.1f}us"
+    )
+
+
+async def main():
+    logging.disable(logging.CRITICAL)
+    readings = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for count in (10, 100, 1000):
+        await run(count, readings)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
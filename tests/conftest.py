@@ -0,0 +1,14 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# Settings are read at import time; give them what a test run needs.
+os.environ.setdefault("RASPBERRY_UUID", "test")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("GPIO_BACKEND", "sim")
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="agent_tests_")
+os.environ["CONFIG_FILE"] = str(Path(os.environ["LOG_DIR"]) / "config.json")
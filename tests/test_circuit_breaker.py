@@ -0,0 +1,63 @@
+# tests/test_circuit_breaker.py
+import asyncio
+
+from app.infrastructure.backend.backend_adapter import BackendAdapter
+from app.infrastructure.backend.circuit_breaker import CircuitBreaker, CircuitState
+
+
+def opened_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, base_delay=0.0, jitter=0.0)
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    return breaker
+
+
+def test_only_one_probe_when_half_open():
+    breaker = opened_breaker()
+
+    assert breaker.allow_request() == (True, True)
+    assert breaker.allow_request() == (False, False)
+    assert CircuitBreaker("closed").allow_request() == (True, False)
+
+
+def run_cancelled_send(adapter, while_in_flight=None):
+    """Start a send, optionally act while it is in flight, then cancel it."""
+    async def main():
+        started = asyncio.Event()
+
+        async def transmit(payloads):
+            started.set()
+            await asyncio.sleep(10)
+
+        adapter._transmit = transmit
+        task = asyncio.create_task(adapter._send([{}]))
+        await started.wait()
+        if while_in_flight is not None:
+            while_in_flight()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(main())
+
+
+def test_cancelled_probe_is_released():
+    adapter = BackendAdapter("http://backend.invalid")
+    adapter.breaker = opened_breaker()
+
+    run_cancelled_send(adapter)
+
+    assert adapter.breaker.allow_request() == (True, True)
+
+
+def test_cancelled_non_probe_send_keeps_the_probe():
+    adapter = BackendAdapter("http://backend.invalid")
+    adapter.breaker = CircuitBreaker("test", failure_threshold=1, base_delay=0.0, jitter=0.0)
+
+    def open_and_probe():
+        # Admitted while closed; meanwhile the breaker opens and another send probes.
+        adapter.breaker.record_failure()
+        assert adapter.breaker.allow_request() == (True, True)
+
+    run_cancelled_send(adapter, open_and_probe)
+
+    assert adapter.breaker.allow_request() == (False, False)
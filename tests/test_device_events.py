@@ -0,0 +1,9 @@
+# tests/test_device_events.py
+from app.domain.events.device_events import (DeviceCommandPayload, DeviceDeletePayload, PowerReadingPayload,
+                                             ack_fields)
+
+
+def test_ack_fields_per_payload_type():
+    assert ack_fields(DeviceCommandPayload(device_id=4, command="SET_STATE", is_on=False)) == (4, False)
+    assert ack_fields(DeviceDeletePayload(device_id=4)) == (4, None)
+    assert ack_fields(PowerReadingPayload(inverter_id=1, power_w=10.0, device_ids=[4])) == (None, None)
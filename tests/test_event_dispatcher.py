@@ -0,0 +1,104 @@
+# tests/test_event_dispatcher.py
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from app.application.event_service import GLOBAL_SHARD, EventDispatcher
+
+
+def event(name, **payload):
+    return SimpleNamespace(name=name, payload=SimpleNamespace(**payload))
+
+
+class Recorder:
+    """Blocking handler that records start/end order per event."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.log = []
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, ev):
+        with self._lock:
+            self.log.append(("start", ev.name))
+            self.threads.add(threading.get_ident())
+        time.sleep(self.delays.get(ev.name, 0.01))
+        with self._lock:
+            self.log.append(("end", ev.name))
+        return ev.name
+
+    def position(self, kind, name):
+        return self.log.index((kind, name))
+
+
+def run(dispatcher, events):
+    async def main():
+        return await asyncio.gather(*(dispatcher.submit(ev) for ev in events))
+
+    return asyncio.run(main())
+
+
+def test_shard_keys():
+    assert EventDispatcher.shard_keys(event("a", device_id=3)) == ("3",)
+    assert EventDispatcher.shard_keys(event("b", device_ids=[2, 1, 2])) == ("1", "2")
+    assert EventDispatcher.shard_keys(event("c", device_ids=[])) == (GLOBAL_SHARD,)
+    assert EventDispatcher.shard_keys(event("d")) == (GLOBAL_SHARD,)
+
+
+def test_handlers_for_different_devices_overlap_off_the_loop():
+    handler = Recorder(delays={"a": 0.2, "b": 0.2})
+    dispatcher = EventDispatcher(handler, concurrency=4)
+
+    started = time.monotonic()
+    assert run(dispatcher, [event("a", device_id=1), event("b", device_id=2)]) == ["a", "b"]
+
+    assert time.monotonic() - started < 0.35
+    assert threading.get_ident() not in handler.threads
+
+
+def test_same_device_keeps_order():
+    handler = Recorder(delays={"first": 0.1})
+    dispatcher = EventDispatcher(handler, concurrency=4)
+
+    run(dispatcher, [event("first", device_id=1), event("second", device_id=1)])
+
+    assert handler.position("end", "first") < handler.position("start", "second")
+
+
+def test_multi_device_event_is_ordered_against_each_device():
+    handler = Recorder(delays={"update_1": 0.1, "update_2": 0.05})
+    dispatcher = EventDispatcher(handler, concurrency=4)
+
+    run(
+        dispatcher,
+        [
+            event("update_1", device_id=1),
+            event("update_2", device_id=2),
+            event("reading", device_ids=[1, 2]),
+            event("command_2", device_id=2),
+        ],
+    )
+
+    assert handler.position("end", "update_1") < handler.position("start", "reading")
+    assert handler.position("end", "update_2") < handler.position("start", "reading")
+    assert handler.position("end", "reading") < handler.position("start", "command_2")
+    assert dispatcher.get_metrics()["shards"]["1"]["processed"] == 2
+
+
+def test_overlapping_multi_device_events_do_not_deadlock():
+    handler = Recorder()
+    dispatcher = EventDispatcher(handler, concurrency=1)
+
+    async def main():
+        return await asyncio.wait_for(
+            asyncio.gather(
+                dispatcher.submit(event("r1", device_ids=[1, 2])),
+                dispatcher.submit(event("r2", device_ids=[2, 3])),
+                dispatcher.submit(event("r3", device_ids=[3, 1])),
+            ),
+            timeout=2,
+        )
+
+    assert asyncio.run(main()) == ["r1", "r2", "r3"]
@@ -0,0 +1,47 @@
+# tests/test_event_history.py
+import asyncio
+from collections import deque
+
+from app.infrastructure.storage.event_history import EventHistoryStore
+
+
+class FailingDB:
+    async def executemany(self, sql, rows):
+        raise OSError("disk I/O error")
+
+
+def test_failed_flush_keeps_newest_rows_and_counts_drops(tmp_path):
+    store = EventHistoryStore(tmp_path / "history.db", batch_size=100, flush_interval=60, retention_days=1)
+    store._buffer = deque(maxlen=5)
+    store._db = FailingDB()
+
+    async def main():
+        for device_id in range(1, 4):
+            store.record(device_id, True, "DEVICE_COMMAND")
+
+        original_executemany = store._db.executemany
+
+        async def fail_after_new_rows(sql, rows):
+            # Rows recorded while the write is in flight are newer than `rows`.
+            for device_id in range(4, 8):
+                store.record(device_id, True, "DEVICE_COMMAND")
+            await original_executemany(sql, rows)
+
+        store._db.executemany = fail_after_new_rows
+        await store.flush()
+
+    asyncio.run(main())
+
+    assert [row[0] for row in store._buffer] == [3, 4, 5, 6, 7]
+    assert store.get_metrics()["dropped"] == 2
+
+
+def test_record_counts_evictions(tmp_path):
+    store = EventHistoryStore(tmp_path / "history.db", batch_size=100, flush_interval=60, retention_days=1)
+    store._buffer = deque(maxlen=2)
+
+    for device_id in range(1, 5):
+        store.record(device_id, False, "AUTO_TRIGGER")
+
+    assert [row[0] for row in store._buffer] == [3, 4]
+    assert store.dropped == 2
@@ -0,0 +1,58 @@
+# tests/test_heartbeat.py
+import asyncio
+import time
+
+import pytest
+
+from app.core import heartbeat
+from app.core.config import settings
+from app.core.nats_client import CONNECTED, RECONNECTING, nats_client
+
+
+@pytest.fixture
+def publisher(monkeypatch):
+    shutdowns = []
+    monkeypatch.setattr(heartbeat.gpio_manager, "force_all_off", lambda reason: shutdowns.append(reason))
+    monkeypatch.setattr(nats_client, "state", CONNECTED)
+    monkeypatch.setattr(nats_client, "disconnected_at", None)
+
+    pub = heartbeat.HeartbeatPublisher()
+    pub._snapshot_due = False
+    pub.shutdowns = shutdowns
+    return pub
+
+
+def failed_ack():
+    loop = asyncio.new_event_loop()
+    try:
+        future = loop.create_future()
+        future.set_exception(TimeoutError("no ack"))
+        return future
+    finally:
+        loop.close()
+
+
+def test_failed_ack_while_reconnecting_only_resyncs(publisher, monkeypatch):
+    monkeypatch.setattr(nats_client, "state", RECONNECTING)
+    monkeypatch.setattr(nats_client, "disconnected_at", time.monotonic())
+
+    publisher._on_published(heartbeat.DELTA, 3, 10, failed_ack())
+
+    assert publisher._snapshot_due
+    assert publisher.shutdowns == []
+
+
+def test_failed_ack_within_grace_only_resyncs(publisher):
+    publisher._on_published(heartbeat.DELTA, 3, 10, failed_ack())
+
+    assert publisher._snapshot_due
+    assert publisher.shutdowns == []
+
+
+def test_send_past_grace_shuts_down(publisher, monkeypatch):
+    monkeypatch.setattr(nats_client, "state", RECONNECTING)
+    monkeypatch.setattr(nats_client, "disconnected_at", time.monotonic() - settings.NATS_OFFLINE_GRACE - 1)
+
+    asyncio.run(publisher._send(heartbeat.BEAT))
+
+    assert publisher.shutdowns == ["HEARTBEAT_FAILURE"]
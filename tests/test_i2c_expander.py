@@ -0,0 +1,96 @@
+# tests/test_i2c_expander.py
+import pytest
+
+from app.infrastructure.gpio import i2c_expander
+from app.infrastructure.gpio.hardware import SimulatedGPIOBackend
+from app.infrastructure.gpio.i2c_expander import (MCP23017, MCP_GPIOA, MCP_IODIRA, MCP_OLATA, PCF8574,
+                                                  ExpanderGPIOBackend, RoutedGPIOBackend, SimulatedI2CBus,
+                                                  decode_expander_pin, encode_expander_pin, is_expander_pin)
+
+
+@pytest.fixture
+def bus():
+    return SimulatedI2CBus(1)
+
+
+@pytest.fixture
+def backend(bus):
+    return ExpanderGPIOBackend(bus_factory=lambda _: bus)
+
+
+def mcp(port, bit, address=0x20):
+    return encode_expander_pin(MCP23017, 1, address, port, bit)
+
+
+def test_pin_encoding_round_trips():
+    pin = encode_expander_pin(PCF8574, 3, 0x27, 0, 5)
+
+    assert is_expander_pin(pin)
+    assert not is_expander_pin(17)
+    assert decode_expander_pin(pin) == (PCF8574, 3, 0x27, 0, 5)
+    with pytest.raises(ValueError):
+        encode_expander_pin(PCF8574, 1, 0x20, 1, 0)
+
+
+def test_setup_output_latches_off_before_switching_direction(backend, bus):
+    backend.setup_output(mcp(1, 2), 0)
+
+    registers = bus.registers[0x20]
+    assert registers[MCP_OLATA + 1] & (1 << 2) == 0
+    assert registers[MCP_IODIRA + 1] == 0xFF & ~(1 << 2)
+    assert registers[MCP_IODIRA] == 0xFF
+
+
+def test_write_many_is_one_transaction_per_chip(backend, bus):
+    pins = [mcp(port, bit) for port in (0, 1) for bit in range(8)]
+    backend.setup_outputs({pin: 0 for pin in pins})
+    before = bus.transactions
+
+    backend.write_many({pin: 1 for pin in pins})
+
+    assert bus.transactions - before == 1
+    assert list(bus.registers[0x20][MCP_GPIOA:MCP_GPIOA + 2]) == [0xFF, 0xFF]
+
+
+def test_unchanged_write_skips_the_bus(backend, bus):
+    pin = mcp(0, 0)
+    backend.setup_output(pin, 1)
+    before = bus.transactions
+
+    backend.write_many({pin: 1})
+
+    assert bus.transactions == before
+
+
+def test_read_many_is_one_transaction_per_chip(backend, bus):
+    pins = [mcp(0, bit) for bit in range(8)] + [encode_expander_pin(PCF8574, 1, 0x38, 0, bit) for bit in range(4)]
+    backend.setup_outputs({pin: bit % 2 for bit, pin in enumerate(pins)})
+    before = bus.transactions
+
+    values = backend.read_many(pins)
+
+    assert bus.transactions - before == 2
+    assert values == {pin: bit % 2 for bit, pin in enumerate(pins)}
+
+
+def test_routed_backend_splits_native_and_expander_pins(backend, bus):
+    native = SimulatedGPIOBackend()
+    routed = RoutedGPIOBackend(native, backend)
+    routed.setup_outputs({17: 0, mcp(0, 3): 0})
+
+    routed.write_many({17: 1, mcp(0, 3): 1})
+
+    assert routed.read_many([17, mcp(0, 3)]) == {17: 1, mcp(0, 3): 1}
+    assert routed.hw_ops == native.hw_ops + backend.hw_ops
+
+
+def test_default_bus_requires_smbus2_unless_simulation_is_enabled(monkeypatch):
+    monkeypatch.setattr(i2c_expander, "SMBus", None)
+    monkeypatch.setattr(i2c_expander.settings, "I2C_SIMULATE", False)
+    backend = ExpanderGPIOBackend()
+
+    with pytest.raises(RuntimeError, match="I2C_SIMULATE"):
+        backend.setup_output(mcp(0, 0), 0)
+
+    monkeypatch.setattr(i2c_expander.settings, "I2C_SIMULATE", True)
+    assert isinstance(ExpanderGPIOBackend._default_bus(1), SimulatedI2CBus)
@@ -0,0 +1,94 @@
+# tests/test_jetstream_consumer.py
+import asyncio
+
+from nats.errors import TimeoutError as NATSTimeoutError
+
+from app.core.jetstream_consumer import JetStreamPullConsumer
+
+
+class FakeMsg:
+    def __init__(self, seq):
+        self.seq = seq
+        self.acked = False
+
+    async def ack(self):
+        self.acked = True
+
+
+class FakeSub:
+    def __init__(self, count):
+        self.backlog = [FakeMsg(seq) for seq in range(count)]
+        self.requested = []
+
+    async def fetch(self, batch, timeout):
+        self.requested.append(batch)
+        if not self.backlog:
+            await asyncio.sleep(0.01)
+            raise NATSTimeoutError
+        msgs, self.backlog = self.backlog[:batch], self.backlog[batch:]
+        return msgs
+
+
+def consumer_for(sub, handler, max_ack_pending, batch):
+    consumer = JetStreamPullConsumer()
+    consumer.max_ack_pending = max_ack_pending
+    consumer.batch = batch
+    consumer._sub = sub
+    consumer._handler = handler
+    return consumer
+
+
+def test_each_message_is_acked_when_its_handler_finishes():
+    sub = FakeSub(3)
+    msgs = list(sub.backlog)
+
+    async def main():
+        slow = asyncio.Event()
+
+        async def handler(msg):
+            if msg.seq == 0:
+                await slow.wait()
+            return True
+
+        consumer = consumer_for(sub, handler, max_ack_pending=8, batch=8)
+        consumer._task = asyncio.create_task(consumer._run())
+        await asyncio.sleep(0.05)
+
+        acked = [msg.seq for msg in msgs if msg.acked]
+        slow.set()
+        await asyncio.sleep(0.05)
+        await consumer.stop()
+        return acked, consumer
+
+    acked, consumer = asyncio.run(main())
+
+    assert acked == [1, 2]
+    assert all(msg.acked for msg in msgs)
+    assert consumer.outstanding == 0
+
+
+def test_fetching_stops_at_max_ack_pending():
+    sub = FakeSub(10)
+
+    async def main():
+        gate = asyncio.Event()
+
+        async def handler(msg):
+            await gate.wait()
+            return True
+
+        consumer = consumer_for(sub, handler, max_ack_pending=4, batch=3)
+        consumer._task = asyncio.create_task(consumer._run())
+        await asyncio.sleep(0.05)
+        blocked = (consumer.fetched, consumer.outstanding, list(sub.requested))
+
+        gate.set()
+        while consumer.acked < 10:
+            await asyncio.sleep(0.01)
+        await consumer.stop()
+        return blocked
+
+    fetched, outstanding, requested = asyncio.run(main())
+
+    assert (fetched, outstanding) == (4, 4)
+    assert requested == [3, 1]
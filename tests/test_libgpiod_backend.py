@@ -0,0 +1,126 @@
+# tests/test_libgpiod_backend.py
+import enum
+
+import pytest
+
+from app.infrastructure.gpio import hardware
+
+
+class FakeValue(enum.Enum):
+    INACTIVE = 0
+    ACTIVE = 1
+
+
+class FakeDirection(enum.Enum):
+    INPUT = 1
+    OUTPUT = 2
+
+
+class FakeLineRequest:
+    def __init__(self, offsets, output_values):
+        self.offsets = set(offsets)
+        self.values = dict(output_values)
+        self.get_calls = 0
+        self.set_calls = 0
+        self.released = False
+
+    def get_values(self, offsets):
+        assert not self.released
+        self.get_calls += 1
+        return [self.values[offset] for offset in offsets]
+
+    def set_values(self, values):
+        assert not self.released
+        assert set(values) <= self.offsets
+        self.set_calls += 1
+        self.values.update(values)
+
+    def release(self):
+        self.released = True
+
+
+class FakeGpiod:
+    LineSettings = staticmethod(lambda direction: direction)
+
+    def __init__(self):
+        self.requests = []
+        self.busy = set()
+
+    def request_lines(self, path, consumer, config, output_values):
+        (offsets,) = config
+        if self.busy & set(offsets):
+            raise OSError("Device or resource busy")
+        request = FakeLineRequest(offsets, output_values)
+        self.requests.append(request)
+        return request
+
+
+@pytest.fixture
+def gpiod(monkeypatch):
+    fake = FakeGpiod()
+    monkeypatch.setattr(hardware, "gpiod", fake)
+    monkeypatch.setattr(hardware, "Value", FakeValue, raising=False)
+    monkeypatch.setattr(hardware, "Direction", FakeDirection, raising=False)
+    return fake
+
+
+@pytest.fixture
+def backend(gpiod):
+    return hardware.LibgpiodBackend("/dev/gpiochip-test")
+
+
+def test_snapshot_of_startup_pins_is_one_ioctl(gpiod, backend):
+    pins = list(range(2, 18))
+    backend.setup_outputs({pin: hardware.GPIO.HIGH for pin in pins})
+    (request,) = gpiod.requests
+
+    ops_before = backend.hw_ops
+    assert backend.read_many(pins) == {pin: hardware.GPIO.HIGH for pin in pins}
+    assert request.get_calls == 1
+    assert backend.hw_ops - ops_before == 1
+
+    backend.write_many({pin: hardware.GPIO.LOW for pin in pins})
+    assert request.set_calls == 1
+
+
+def test_adding_a_line_leaves_existing_lines_requested(gpiod, backend):
+    backend.setup_outputs({2: hardware.GPIO.HIGH, 3: hardware.GPIO.HIGH})
+    startup = gpiod.requests[0]
+
+    backend.setup_output(4, hardware.GPIO.LOW)
+
+    assert not startup.released
+    assert len(gpiod.requests) == 2
+    assert backend.read_many([2, 3, 4]) == {2: 1, 3: 1, 4: 0}
+
+
+def test_failed_request_rolls_back(gpiod, backend):
+    backend.setup_outputs({2: hardware.GPIO.HIGH})
+    gpiod.busy.add(5)
+
+    with pytest.raises(OSError):
+        backend.setup_output(5, hardware.GPIO.HIGH)
+
+    assert backend.read_many([2]) == {2: 1}
+    backend.write(2, hardware.GPIO.LOW)
+    assert backend.read(2) == 0
+    with pytest.raises(KeyError):
+        backend.read(5)
+
+
+def test_request_released_with_its_last_line(gpiod, backend):
+    backend.setup_outputs({2: hardware.GPIO.HIGH, 3: hardware.GPIO.HIGH})
+    request = gpiod.requests[0]
+
+    backend.release(2)
+    assert not request.released
+    assert backend.read(3) == 1
+
+    # A released line still held by its request is reused, not re-requested.
+    backend.setup_output(2, hardware.GPIO.LOW)
+    assert len(gpiod.requests) == 1
+    assert request.values[2] == FakeValue.INACTIVE
+
+    backend.release(2)
+    backend.release(3)
+    assert request.released
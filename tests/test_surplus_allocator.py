@@ -0,0 +1,71 @@
+# tests/test_surplus_allocator.py
+import random
+
+from app.domain.gpio.entities import GPIODevice
+from app.domain.gpio.surplus_allocator import SurplusAllocator
+
+
+def device(device_id, priority, load):
+    return GPIODevice(
+        device_id=device_id, device_number=device_id, pin_number=100 + device_id, mode="AUTO_POWER",
+        power_threshold_kw=None, priority=priority, rated_load_kw=load,
+    )
+
+
+def greedy(devices, states, power, band):
+    """Reference: walk every device by priority, switch on whatever fits."""
+    remaining = power
+    for d in sorted(devices, key=lambda d: (d.priority, d.device_id)):
+        limit = remaining + band if states.get(d.device_id) else remaining
+        states[d.device_id] = d.rated_load_kw <= limit
+        if states[d.device_id]:
+            remaining -= d.rated_load_kw
+    return dict(states)
+
+
+def test_device_that_does_not_fit_does_not_block_lower_priorities():
+    allocator = SurplusAllocator()
+    allocator.rebuild([device(1, 0, 1.0), device(2, 1, 5.0), device(3, 2, 2.0), device(4, 3, 0.5)])
+
+    changes = dict(allocator.allocate(3.0))
+
+    assert changes == {1: True, 2: False, 3: True, 4: False}
+    assert allocator.committed_load() == 3.0
+    assert allocator.allocated_count == 2
+
+
+def test_band_keeps_devices_on_through_a_dip():
+    allocator = SurplusAllocator()
+    allocator.rebuild([device(1, 0, 2.0), device(2, 1, 2.0)])
+    allocator.allocate(4.0)
+
+    assert allocator.allocate(3.5, band=0.5) == []
+    assert allocator.allocate(3.4, band=0.5) == [(2, False)]
+    assert allocator.allocate(3.9, band=0.5) == []
+    assert allocator.allocate(4.0, band=0.5) == [(2, True)]
+
+
+def test_matches_reference_greedy():
+    rng = random.Random(7)
+    devices = [device(i, rng.randrange(5), rng.choice([0.5, 1.0, 1.5, 3.0])) for i in range(1, 60)]
+    total = sum(d.rated_load_kw for d in devices)
+    allocator = SurplusAllocator()
+    allocator.rebuild(devices)
+
+    states = {}
+    for step in range(500):
+        power = rng.uniform(0, total)
+        band = 0.0 if step < 250 else 0.75
+        expected = greedy(devices, states, power, band if step else 0.0)
+        allocator.allocate(power, band)
+        assert {d.device_id: allocator.target(d.device_id) for d in devices} == expected
+
+
+def test_reset_starts_over():
+    allocator = SurplusAllocator()
+    allocator.rebuild([device(1, 0, 1.0)])
+    allocator.allocate(2.0)
+    allocator.reset()
+
+    assert allocator.target(1) is None
+    assert allocator.allocate(0.0) == [(1, False)]